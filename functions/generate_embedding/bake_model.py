@@ -0,0 +1,72 @@
+"""
+Bake a local model snapshot into the function source.
+
+Downloads the model from MODEL_PATH once, at build time, and saves it under
+./model with weights in safetensors format, so instances load it from local
+disk (memory-mapped) instead of fetching it from GCS on the first request.
+
+Usage:
+    MODEL_PATH=gs://caregiving-ml/models/caregiving-embeddings-v1 python bake_model.py
+    python bake_model.py --source /path/to/model --output ./model
+"""
+import argparse
+import glob
+import logging
+import os
+import shutil
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE = os.environ.get("MODEL_PATH", "gs://caregiving-ml/models/caregiving-embeddings-v1")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+
+
+def bake(source: str, output: str):
+    from sentence_transformers import SentenceTransformer
+
+    start = time.perf_counter()
+    model = SentenceTransformer(source)
+    logger.info(f"Loaded {source} in {time.perf_counter() - start:.1f}s")
+
+    staging = output.rstrip("/") + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    model.save(staging)
+
+    # Re-save the transformer weights as safetensors and drop the pickle checkpoint
+    transformer = model._first_module()
+    transformer_dir = staging
+    for module_dir in sorted(glob.glob(os.path.join(staging, "*_Transformer"))):
+        transformer_dir = module_dir
+    transformer.auto_model.save_pretrained(transformer_dir, safe_serialization=True)
+    for pickle_file in glob.glob(os.path.join(transformer_dir, "pytorch_model*.bin")):
+        os.remove(pickle_file)
+    if not glob.glob(os.path.join(transformer_dir, "*.safetensors")):
+        raise RuntimeError(f"No safetensors weights written to {transformer_dir}")
+
+    # Check the snapshot loads and produces the same embeddings before swapping it in
+    reference = model.encode(["verificación"], normalize_embeddings=True)
+    baked = SentenceTransformer(staging).encode(["verificación"], normalize_embeddings=True)
+    if abs(float((reference * baked).sum()) - 1.0) > 1e-4:
+        raise RuntimeError("Baked snapshot does not reproduce the source model's embeddings")
+
+    shutil.rmtree(output, ignore_errors=True)
+    os.rename(staging, output)
+    size_mb = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(output) for name in names
+    ) / 1e6
+    logger.info(f"Model snapshot written to {output} ({size_mb:.0f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Model path or gs:// URI")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Snapshot directory")
+    args = parser.parse_args()
+    bake(args.source, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Cold-start benchmark for the embedding function (CPU only).
+
+Every run starts a fresh Python process and times, separately:
+    import   importing sentence_transformers (torch, transformers)
+    load     constructing the model from the given path
+    first    the first encode call (kernel and allocator warm-up)
+    steady   a second encode call, for comparison
+
+Usage:
+    python benchmark_cold_start.py                       # local snapshot ./model
+    python benchmark_cold_start.py --model gs://caregiving-ml/models/caregiving-embeddings-v1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+PHASES = ["import", "load", "first", "steady"]
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from sentence_transformers import SentenceTransformer
+t1 = time.perf_counter()
+model = SentenceTransformer(sys.argv[1])
+t2 = time.perf_counter()
+model.encode(["Cuidador con experiencia en Alzheimer."], normalize_embeddings=True)
+t3 = time.perf_counter()
+model.encode(["Cuidadora disponible por la tarde."], normalize_embeddings=True)
+t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "load": t2 - t1, "first": t3 - t2, "steady": t4 - t3}))
+"""
+
+
+def measure(model_path: str) -> dict:
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES="")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, model_path],
+        check=True, capture_output=True, text=True, env=env,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model directory or gs:// URI")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [measure(args.model) for _ in range(args.runs)]
+
+    print(f"Cold start, {args.runs} fresh processes, model {args.model}\n")
+    print(f"{'phase':>8} | {'median s':>9} | {'min s':>7} | {'max s':>7}")
+    print("-" * 40)
+    for phase in PHASES + ["total"]:
+        if phase == "total":
+            values = [sum(r[p] for p in PHASES[:3]) for r in results]
+        else:
+            values = [r[phase] for r in results]
+        print(f"{phase:>8} | {statistics.median(values):>9.3f} | {min(values):>7.3f} | {max(values):>7.3f}")
+
+
+if __name__ == "__main__":
+    run()
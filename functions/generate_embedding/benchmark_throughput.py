@@ -0,0 +1,80 @@
+"""
+Throughput benchmark for embedding generation (CPU only).
+
+Measures texts/sec for model.encode at batch sizes 1, 8, 32 and 128, and for
+the micro-batcher serving concurrent single-text requests.
+
+Usage:
+    MODEL_PATH=/path/to/model python benchmark_throughput.py
+    EMBEDDING_BACKEND=int8 MODEL_PATH=/path/to/model python benchmark_throughput.py
+"""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmark on CPU, like the deployed function
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import main
+
+BATCH_SIZES = [1, 8, 32, 128]
+NUM_TEXTS = 512
+CONCURRENT_CLIENTS = 16
+
+SPECIALIZATIONS = [
+    "demencia vascular", "Alzheimer", "Parkinson", "diabetes", "movilidad reducida",
+    "cuidados paliativos", "administración de medicamentos", "primeros auxilios",
+]
+SHIFTS = ["mañana", "tarde", "noche"]
+
+
+def make_texts(n: int) -> list:
+    """Caregiver-style descriptions, like the ones built by seedCaregiversFromCSV.ts."""
+    rng = random.Random(42)
+    return [
+        f"Cuidador profesional con {rng.randint(0, 25)} años de experiencia. "
+        f"Especializado en {', '.join(rng.sample(SPECIALIZATIONS, 3))}. "
+        f"Disponible para cuidado {rng.choice(SHIFTS)}."
+        for _ in range(n)
+    ]
+
+
+def bench_batch_size(texts: list, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        main.encode_texts(texts[i:i + batch_size])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def bench_micro_batcher(texts: list) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENT_CLIENTS) as executor:
+        list(executor.map(main.micro_batcher.submit, texts))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def run():
+    texts = make_texts(NUM_TEXTS)
+
+    load_start = time.perf_counter()
+    main.load_model()
+    print(f"Model {main.MODEL_VERSION} ({main.EMBEDDING_BACKEND}) loaded in {time.perf_counter() - load_start:.1f}s")
+
+    # Warm up kernels before timing
+    main.encode_texts(texts[:8])
+
+    print(f"\n{'batch size':>10} | {'texts/sec':>10}")
+    print("-" * 25)
+    for batch_size in BATCH_SIZES:
+        print(f"{batch_size:>10} | {bench_batch_size(texts, batch_size):>10.1f}")
+
+    print(
+        f"\nMicro-batcher, {CONCURRENT_CLIENTS} concurrent single-text clients "
+        f"(window {main.MICRO_BATCH_WINDOW_MS}ms, max {main.MICRO_BATCH_MAX_SIZE}): "
+        f"{bench_micro_batcher(texts):.1f} texts/sec"
+    )
+
+
+if __name__ == "__main__":
+    run()
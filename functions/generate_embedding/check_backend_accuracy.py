@@ -0,0 +1,144 @@
+"""
+Accuracy guard for the quantized embedding backends.
+
+Encodes a reference set of caregiver descriptions (built from
+cuidador_processed_updated.csv the same way seedCaregiversFromCSV.ts builds
+profile bios) with the fp32 model and with each candidate backend, and fails
+when any text's cosine similarity to its fp32 embedding drops below the
+threshold. deploy.sh runs it for a non-fp32 EMBEDDING_BACKEND and deploys
+fp32 instead when it fails.
+
+Usage:
+    python check_backend_accuracy.py --backends int8,onnx
+    python check_backend_accuracy.py --backends int8 --threshold 0.995 --limit 500
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+from inference_backends import BACKENDS, load_backend
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(BASE_DIR, "..", "..", "cuidador_processed_updated.csv")
+DEFAULT_MODEL = os.environ.get("MODEL_LOCAL_PATH", os.path.join(BASE_DIR, "model"))
+DEFAULT_ONNX = os.environ.get("ONNX_MODEL_PATH", os.path.join(BASE_DIR, "model_onnx"))
+# Same mappings as scripts/seedCaregiversFromCSV.ts
+TURNO_MAP = {1: "Mañana", 2: "Tarde", 3: "Noche"}
+HEALTH_CONDITIONS = [
+    "Alzheimer", "Demencia", "Diabetes", "Hipertensión", "Artritis", "Parkinson",
+    "Enfermedades cardíacas", "Osteoporosis", "Depresión", "Ansiedad", "Incontinencia",
+    "Problemas de visión", "Problemas de audición", "Movilidad reducida",
+]
+ESPECIALIZACION_MAP = {
+    1: "Cuidado general",
+    2: "Cuidado de demencia",
+    3: "Cuidado post-operatorio",
+    4: "Cuidado de diabetes",
+    5: "Cuidado de Alzheimer",
+    6: "Cuidado de Parkinson",
+    7: "Cuidado de enfermedades cardíacas",
+    8: "Cuidado de movilidad reducida",
+}
+NEIGHBORS = 10
+
+
+def parse_int(value, default: int = 0) -> int:
+    """parseInt-like: leading integer of the value, or default."""
+    try:
+        return int(float(value)) or default
+    except (TypeError, ValueError):
+        return default
+
+
+def seed_specializations(row: dict) -> list:
+    """The caregiver's specializations, as the seed script derives them (HEALTH flags, then especializacion_val)."""
+    specializations = [
+        name for i, name in enumerate(HEALTH_CONDITIONS, start=1)
+        if row.get(f"HEALTH{i:02d}") == "1"
+    ]
+    extra = ESPECIALIZACION_MAP.get(parse_int(row.get("especializacion_val")))
+    if extra and extra not in specializations:
+        specializations.append(extra)
+    return specializations
+
+
+def reference_texts(path: str, limit: int) -> list:
+    """Caregiver bios in the format written by the seed script."""
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            shift = TURNO_MAP.get(parse_int(row.get("turno_val"), 2), "general")
+            texts.append(
+                f"Cuidador profesional con {parse_int(row.get('exp_years'))} años de experiencia. "
+                f"Especializado en {', '.join(seed_specializations(row)[:3])}. "
+                f"Disponible para cuidado {shift.lower()}."
+            )
+            if len(texts) >= limit:
+                break
+    return texts
+
+
+def neighbor_overlap(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """Mean fraction of each text's top-k neighbours (within the set) that both backends agree on."""
+    k = min(k, len(reference) - 1)
+    if k <= 0:
+        return 1.0
+    ref_sim = reference @ reference.T
+    cand_sim = candidate @ candidate.T
+    np.fill_diagonal(ref_sim, -np.inf)
+    np.fill_diagonal(cand_sim, -np.inf)
+    ref_top = np.argpartition(-ref_sim, k, axis=1)[:, :k]
+    cand_top = np.argpartition(-cand_sim, k, axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]))
+
+
+def encode(backend: str, texts: list, model_path: str, onnx_path: str):
+    encoder = load_backend(backend, model_path, onnx_path)
+    encoder.encode(texts[:8], batch_size=8, normalize_embeddings=True)
+    start = time.perf_counter()
+    embeddings = np.asarray(encoder.encode(texts, batch_size=32, normalize_embeddings=True), dtype=np.float32)
+    return embeddings, len(texts) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="int8,onnx", help="Comma-separated backends to check against fp32")
+    parser.add_argument("--threshold", type=float, default=0.99, help="Minimum per-text cosine similarity")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--onnx", default=DEFAULT_ONNX)
+    args = parser.parse_args()
+
+    texts = reference_texts(args.csv, args.limit) if os.path.exists(args.csv) else []
+    if len(texts) < 2:
+        print(f"Not enough reference texts in {args.csv}", file=sys.stderr)
+        return 1
+    reference, reference_rate = encode("fp32", texts, args.model, args.onnx)
+    print(f"{len(texts)} reference texts, fp32: {reference_rate:.1f} texts/sec\n")
+    print(f"{'backend':>8} | {'min cos':>8} | {'mean cos':>8} | {f'top{NEIGHBORS} agree':>11} | {'texts/sec':>9} | result")
+    print("-" * 68)
+
+    failed = False
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        if backend not in BACKENDS or backend == "fp32":
+            print(f"{backend:>8} | skipped (not a quantized backend)")
+            continue
+        embeddings, rate = encode(backend, texts, args.model, args.onnx)
+        cosines = np.sum(reference * embeddings, axis=1)
+        ok = bool(cosines.min() >= args.threshold)
+        failed |= not ok
+        print(
+            f"{backend:>8} | {cosines.min():>8.4f} | {cosines.mean():>8.4f} | "
+            f"{neighbor_overlap(reference, embeddings, NEIGHBORS):>11.3f} | {rate:>9.1f} | "
+            f"{'ok' if ok else 'FAIL'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
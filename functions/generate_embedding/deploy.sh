@@ -12,14 +12,39 @@ MEMORY="2Gi"
 TIMEOUT="60s"
 MIN_INSTANCES=1
 MAX_INSTANCES=10
+# Concurrent requests per instance; lets the micro-batcher merge single-text requests
+CONCURRENCY=8
 ENTRY_POINT="generate_embedding"
+# fp32 (default), int8 or onnx; non-fp32 backends must pass check_backend_accuracy.py
+EMBEDDING_BACKEND="${EMBEDDING_BACKEND:-fp32}"
+ACCURACY_THRESHOLD="${ACCURACY_THRESHOLD:-0.99}"
 
 # Colors for output
 GREEN='\033[0;32m'
 YELLOW='\033[1;33m'
 NC='\033[0m' # No Color
 
-echo -e "${GREEN}Deploying Cloud Function Gen2: ${FUNCTION_NAME}${NC}"
+# Bake the model into the source so instances don't download it on cold start
+if [ ! -d model ]; then
+  echo -e "${YELLOW}No local model snapshot found, baking one...${NC}"
+  python bake_model.py
+fi
+
+# Guard quantized backends against fp32 on the seed caregiver bios; fall back to fp32 on failure
+if [ "${EMBEDDING_BACKEND}" != "fp32" ]; then
+  EXPORTED=true
+  if [ "${EMBEDDING_BACKEND}" = "onnx" ] && [ ! -f model_onnx/model.onnx ]; then
+    python export_onnx.py --source ./model --output ./model_onnx || EXPORTED=false
+  fi
+  if ${EXPORTED} && python check_backend_accuracy.py --backends "${EMBEDDING_BACKEND}" --threshold "${ACCURACY_THRESHOLD}"; then
+    echo -e "${GREEN}${EMBEDDING_BACKEND} backend passed the accuracy check${NC}"
+  else
+    echo -e "${YELLOW}${EMBEDDING_BACKEND} backend failed the accuracy check, deploying fp32${NC}"
+    EMBEDDING_BACKEND="fp32"
+  fi
+fi
+
+echo -e "${GREEN}Deploying Cloud Function Gen2: ${FUNCTION_NAME} (${EMBEDDING_BACKEND})${NC}"
 
 # Deploy the function
 gcloud functions deploy ${FUNCTION_NAME} \
@@ -34,7 +59,8 @@ gcloud functions deploy ${FUNCTION_NAME} \
   --timeout=${TIMEOUT} \
   --min-instances=${MIN_INSTANCES} \
   --max-instances=${MAX_INSTANCES} \
-  --set-env-vars="MODEL_PATH=gs://caregiving-ml/models/caregiving-embeddings-v1" \
+  --concurrency=${CONCURRENCY} \
+  --set-env-vars="MODEL_PATH=gs://caregiving-ml/models/caregiving-embeddings-v1,EMBEDDING_BACKEND=${EMBEDDING_BACKEND}" \
   --service-account="YOUR_SERVICE_ACCOUNT@YOUR_PROJECT.iam.gserviceaccount.com"
 
 echo -e "${GREEN}Deployment complete!${NC}"
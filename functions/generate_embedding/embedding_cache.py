@@ -0,0 +1,126 @@
+"""
+Content-addressed embedding cache.
+
+Embeddings are keyed by a hash of the normalized text and the model
+version, so unchanged caregiver descriptions and senior need texts are
+never re-encoded. A bounded in-memory LRU sits in front of an optional
+SQLite file that stores vectors as raw float32 bytes.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode form and whitespace; case is kept since the model is case-sensitive."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, model_version: str) -> str:
+    """Content address for (normalized text, model version)."""
+    digest = hashlib.sha256()
+    digest.update(model_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache.
+
+    Args:
+        max_entries: Capacity of the in-memory LRU tier.
+        path: SQLite file for the on-disk tier, or None to disable it.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._disk = sqlite3.connect(path, check_same_thread=False)
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._disk.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening embedding cache at {path}, using memory only: {e}")
+                self._disk = None
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the keys that are present."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    found[key] = vector
+                    continue
+                if self._disk is not None:
+                    row = self._disk.execute(
+                        "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        vector = np.frombuffer(row[0], dtype=np.float32)
+                        self._remember(key, vector)
+                        self._stats["disk_hits"] += 1
+                        found[key] = vector
+                        continue
+                self._stats["misses"] += 1
+        return found
+
+    def put_many(self, entries: Dict[str, np.ndarray]):
+        """Store vectors (as float32) in both tiers."""
+        if not entries:
+            return
+        entries = {key: np.asarray(vector, dtype=np.float32) for key, vector in entries.items()}
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+            if self._disk is not None:
+                try:
+                    self._disk.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vector.tobytes()) for key, vector in entries.items()],
+                    )
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing embedding cache: {e}")
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the LRU tier (lock held)."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and hit rate since the instance started."""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
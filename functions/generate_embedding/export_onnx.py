@@ -0,0 +1,88 @@
+"""
+Export the embedding model's transformer to ONNX for EMBEDDING_BACKEND=onnx.
+
+Writes model.onnx, the tokenizer files and export_config.json to the output
+directory. Only models with a Transformer followed by mean Pooling (and an
+optional Normalize) are supported, since pooling is re-implemented in
+inference_backends.OnnxEncoder.
+
+Usage:
+    python export_onnx.py --source ./model --output ./model_onnx
+    python check_backend_accuracy.py --backends onnx
+"""
+import argparse
+import json
+import logging
+import os
+
+from inference_backends import ONNX_MODEL_FILE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.environ.get("MODEL_PATH", os.path.join(BASE_DIR, "model"))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "model_onnx")
+
+
+def export(source: str, output: str, opset: int = 17):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(source, device='cpu')
+    modules = [type(module).__name__ for module in model]
+    if modules[:2] != ['Transformer', 'Pooling'] or set(modules[2:]) - {'Normalize'}:
+        raise ValueError(f"Unsupported module stack for ONNX export: {modules}")
+    pooling = model[1]
+    if not pooling.pooling_mode_mean_tokens:
+        raise ValueError("Only mean pooling is supported for ONNX export")
+
+    transformer = model[0]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["Cuidador con experiencia"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, *inputs):
+            return self.wrapped(**dict(zip(input_names, inputs)))[0]
+
+    os.makedirs(output, exist_ok=True)
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(auto_model),
+            tuple(sample[name] for name in input_names),
+            os.path.join(output, ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=['token_embeddings'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(output)
+    with open(os.path.join(output, 'export_config.json'), 'w') as f:
+        json.dump({
+            'source': source,
+            'max_seq_length': model.max_seq_length,
+            'dimensions': model.get_sentence_embedding_dimension(),
+            'opset': opset,
+        }, f, indent=2)
+    logger.info(f"Exported ONNX model to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Model path or gs:// URI")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Export directory")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.source, args.output, args.opset)
+
+
+if __name__ == "__main__":
+    main()
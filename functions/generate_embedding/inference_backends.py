@@ -0,0 +1,101 @@
+"""
+CPU inference backends for the embedding model.
+
+    fp32  the sentence-transformers model as trained (default)
+    int8  the same model with torch dynamic int8 quantization of nn.Linear layers
+    onnx  an exported ONNX graph (see export_onnx.py) run with onnxruntime,
+          followed by mean pooling and L2 normalization
+
+Every backend exposes the subset of the SentenceTransformer interface used by
+main.py: encode(texts, batch_size, normalize_embeddings) and
+get_sentence_embedding_dimension(). Vectors from different backends are close
+but not identical, so each backend has its own model version.
+"""
+import json
+import os
+from typing import List
+
+import numpy as np
+
+BACKENDS = ('fp32', 'int8', 'onnx')
+ONNX_MODEL_FILE = 'model.onnx'
+
+
+def backend_model_version(base_version: str, backend: str) -> str:
+    """Model version reported for a backend; fp32 keeps the base version."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+    return base_version if backend == 'fp32' else f"{base_version}-{backend}"
+
+
+def load_backend(backend: str, model_source: str, onnx_path: str = None):
+    """Load the encoder for a backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+    if backend == 'onnx':
+        return OnnxEncoder(onnx_path)
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_source, device='cpu')
+    if backend == 'int8':
+        import torch
+
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+class OnnxEncoder:
+    """Mean-pooled sentence embeddings from an exported transformer graph."""
+
+    def __init__(self, directory: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        if not directory or not os.path.exists(os.path.join(directory, ONNX_MODEL_FILE)):
+            raise FileNotFoundError(f"No {ONNX_MODEL_FILE} in {directory!r}; run export_onnx.py first")
+
+        with open(os.path.join(directory, 'export_config.json')) as f:
+            self.config = json.load(f)
+        self.max_seq_length = self.config['max_seq_length']
+        self.dimensions = self.config['dimensions']
+
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(directory, ONNX_MODEL_FILE), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimensions
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = True, **_) -> np.ndarray:
+        batch_size = max(1, batch_size)
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                list(texts[start:start + batch_size]),
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np',
+            )
+            feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+            outputs.append(mean_pool(token_embeddings, encoded['attention_mask']))
+
+        embeddings = np.vstack(outputs) if outputs else np.zeros((0, self.dimensions), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        return embeddings.astype(np.float32, copy=False)
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token embeddings over non-padding positions, like sentence-transformers' Pooling."""
+    mask = attention_mask[..., None].astype(np.float32)
+    return (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
@@ -2,53 +2,257 @@
 import os
 import json
 import logging
-from typing import Dict, Any
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, List, Tuple
 
 import functions_framework
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+# sentence_transformers (and with it torch/transformers) is imported lazily in
+# load_model, so module import stays fast and the cost shows up as its own phase
+
+from embedding_cache import EmbeddingCache, cache_key, normalize_text
+from inference_backends import backend_model_version, load_backend
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Model configuration
-MODEL_PATH = "gs://caregiving-ml/models/caregiving-embeddings-v1"
-MODEL_VERSION = "v1"
+MODEL_PATH = os.environ.get("MODEL_PATH", "gs://caregiving-ml/models/caregiving-embeddings-v1")
+# Pre-baked snapshot shipped with the function source (see bake_model.py); preferred over MODEL_PATH
+MODEL_LOCAL_PATH = os.environ.get(
+    "MODEL_LOCAL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+)
+# Load and warm up the model in a background thread as soon as the instance starts
+# (tests import this module with WARM_START=false)
+WARM_START = os.environ.get("WARM_START", "true").lower() == "true"
+WARMUP_TEXT = "Cuidador con experiencia en cuidado de adultos mayores."
+# Inference backend: fp32 (default), int8 (dynamic quantization) or onnx (onnxruntime).
+# Non-fp32 backends report their own model version (e.g. "v1-int8") so their
+# vectors are never mixed with fp32 ones downstream.
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "fp32").lower()
+ONNX_MODEL_PATH = os.environ.get(
+    "ONNX_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_onnx")
+)
+MODEL_VERSION = backend_model_version("v1", EMBEDDING_BACKEND)
 EMBEDDING_DIMENSIONS = 384
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "128"))
+# Concurrent single-text requests arriving within this window share one encode call (0 disables)
+MICRO_BATCH_WINDOW_MS = float(os.environ.get("MICRO_BATCH_WINDOW_MS", "5"))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", "32"))
+# Embedding cache: in-memory LRU size and optional SQLite file for the on-disk tier
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "")
 
 # Global model variable (loaded once at function start)
-model: SentenceTransformer = None
+model = None
+_model_lock = threading.Lock()
+
+# Global embedding cache, keyed by (normalized text hash, MODEL_VERSION)
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH or None)
 
 
 def load_model():
-    """Load the sentence-transformer model from Cloud Storage."""
+    """Load the sentence-transformer model, preferring the local pre-baked snapshot."""
     global model
     if model is None:
-        logger.info(f"Loading model from {MODEL_PATH}")
-        try:
-            model = SentenceTransformer(MODEL_PATH)
-            logger.info(f"Model loaded successfully. Embedding dimensions: {model.get_sentence_embedding_dimension()}")
-        except Exception as e:
-            logger.error(f"Error loading model: {str(e)}")
-            raise
+        with _model_lock:
+            if model is None:
+                try:
+                    model = _load_and_warm_up()
+                except Exception as e:
+                    logger.error(f"Error loading model: {str(e)}")
+                    raise
     return model
 
 
+def _load_and_warm_up():
+    """Import, load and warm up the model, logging the time spent in each phase."""
+    phase_start = time.perf_counter()
+    if EMBEDDING_BACKEND == "onnx":
+        import onnxruntime  # noqa: F401
+        import transformers  # noqa: F401
+    else:
+        import sentence_transformers  # noqa: F401
+    import_seconds = time.perf_counter() - phase_start
+
+    # A local snapshot saved as safetensors is memory-mapped instead of downloaded
+    source = MODEL_LOCAL_PATH if os.path.isdir(MODEL_LOCAL_PATH) else MODEL_PATH
+    logger.info(f"Loading {EMBEDDING_BACKEND} model from {ONNX_MODEL_PATH if EMBEDDING_BACKEND == 'onnx' else source}")
+    phase_start = time.perf_counter()
+    loaded = load_backend(EMBEDDING_BACKEND, source, ONNX_MODEL_PATH)
+    load_seconds = time.perf_counter() - phase_start
+
+    # First forward pass initializes kernels and allocator pools; pay it here, not on a request
+    phase_start = time.perf_counter()
+    loaded.encode([WARMUP_TEXT], normalize_embeddings=True)
+    warmup_seconds = time.perf_counter() - phase_start
+
+    logger.info(
+        f"Model {MODEL_VERSION} loaded successfully. Embedding dimensions: {loaded.get_sentence_embedding_dimension()}. "
+        f"Startup phases: import={import_seconds:.2f}s load={load_seconds:.2f}s "
+        f"warmup={warmup_seconds:.2f}s"
+    )
+    return loaded
+
+
+def encode_texts(texts: List[str]) -> List[List[float]]:
+    """Encode a batch of texts with a single model.encode call."""
+    model = load_model()
+    embeddings = model.encode(
+        texts,
+        batch_size=min(len(texts), MAX_BATCH_SIZE),
+        normalize_embeddings=True,
+    )
+    return embeddings.tolist()
+
+
+class MicroBatcher:
+    """
+    Merges concurrent single-text requests into one encode call.
+
+    The first request to arrive opens a window of window_seconds; every
+    request that arrives before it closes (up to max_batch_size) is encoded
+    in the same batch by a background worker thread.
+    """
+
+    def __init__(self, encode_fn, max_batch_size: int, window_seconds: float):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_seconds
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> List[float]:
+        """Queue one text and block until its embedding is ready."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.encode_fn(texts)
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"Encoded {len(embeddings)} embeddings for {len(batch)} texts")
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+                if len(batch) > 1:
+                    logger.info(f"Micro-batched {len(batch)} concurrent requests into one encode call")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+micro_batcher = MicroBatcher(encode_texts, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_WINDOW_MS / 1000.0)
+
+
+def embed_single(text: str) -> Tuple[List[float], bool]:
+    """
+    Embed one text, returning (embedding, cache_hit).
+
+    Cache hits never touch the model; misses share an encode call with
+    concurrent requests when micro-batching is enabled.
+    """
+    key = cache_key(text, MODEL_VERSION)
+    cached = embedding_cache.get_many([key])
+    if key in cached:
+        return cached[key].tolist(), True
+
+    # Encode the normalized text so the vector matches its cache key exactly
+    normalized = normalize_text(text)
+    if MICRO_BATCH_WINDOW_MS > 0:
+        embedding = micro_batcher.submit(normalized)
+    else:
+        embedding = encode_texts([normalized])[0]
+    embedding_cache.put_many({key: embedding})
+    return embedding, False
+
+
+def embed_batch(texts: List[str]) -> Tuple[List[List[float]], int]:
+    """
+    Embed a batch of texts, returning (embeddings, cache_hits).
+
+    Only texts missing from the cache are encoded, in a single encode call.
+    """
+    keys = [cache_key(text, MODEL_VERSION) for text in texts]
+    unique_keys = list(dict.fromkeys(keys))
+    cached = embedding_cache.get_many(unique_keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in missing:
+            missing[key] = normalize_text(text)
+    if missing:
+        computed = encode_texts(list(missing.values()))
+        new_entries = {
+            key: np.asarray(embedding, dtype=np.float32)
+            for key, embedding in zip(missing.keys(), computed)
+        }
+        embedding_cache.put_many(new_entries)
+        cached.update(new_entries)
+
+    embeddings = [cached[key].tolist() for key in keys]
+    return embeddings, len(unique_keys) - len(missing)
+
+
 @functions_framework.http
 def generate_embedding(request):
     """
     HTTP Cloud Function to generate embeddings for caregiver text.
     
-    Expected request body:
+    Expected request body (single text):
     {
         "text": "Cuidador con 5 años de experiencia en demencia vascular..."
     }
     
-    Returns:
+    Or a batch of up to MAX_BATCH_SIZE texts:
+    {
+        "texts": ["Cuidador con 5 años...", "Enfermera con experiencia..."]
+    }
+    
+    Returns (single text):
     {
         "embedding": [0.123, 0.456, ...],  # 384-dim vector
         "model_version": "v1",
         "dimensions": 384,
+        "cache_hit": false,
+        "cache": {"hit_rate": 0.42, ...},
+        "success": true
+    }
+    
+    Returns (batch), embeddings in request order:
+    {
+        "embeddings": [[0.123, ...], [0.456, ...]],
+        "count": 2,
+        "model_version": "v1",
+        "dimensions": 384,
+        "cache_hits": 1,  # texts served from the embedding cache
+        "cache": {"hit_rate": 0.42, ...},
         "success": true
     }
     """
@@ -82,6 +286,46 @@ def generate_embedding(request):
                 headers,
             )
 
+        # Batch mode
+        if "texts" in request_json:
+            texts = request_json.get("texts")
+            if not isinstance(texts, list) or len(texts) == 0:
+                return (
+                    json.dumps({"error": "'texts' must be a non-empty list of strings"}),
+                    400,
+                    headers,
+                )
+            if len(texts) > MAX_BATCH_SIZE:
+                return (
+                    json.dumps({"error": f"'texts' accepts at most {MAX_BATCH_SIZE} items"}),
+                    400,
+                    headers,
+                )
+            if any(not isinstance(t, str) or len(t.strip()) == 0 for t in texts):
+                return (
+                    json.dumps({"error": "Every item in 'texts' must be a non-empty string"}),
+                    400,
+                    headers,
+                )
+
+            logger.info(f"Generating embeddings for batch of {len(texts)} texts")
+            embeddings, cache_hits = embed_batch(texts)
+            dimensions = len(embeddings[0])
+            if dimensions != EMBEDDING_DIMENSIONS:
+                logger.warning(f"Expected {EMBEDDING_DIMENSIONS} dimensions, got {dimensions}")
+
+            response = {
+                "embeddings": embeddings,
+                "count": len(embeddings),
+                "model_version": MODEL_VERSION,
+                "dimensions": dimensions,
+                "cache_hits": cache_hits,
+                "cache": embedding_cache.stats(),
+                "success": True,
+            }
+            logger.info(f"Successfully generated {len(embeddings)} embeddings")
+            return (json.dumps(response), 200, headers)
+
         # Extract text
         text = request_json.get("text")
         if not text:
@@ -98,13 +342,9 @@ def generate_embedding(request):
                 headers,
             )
 
-        # Load model (if not already loaded)
-        model = load_model()
-
-        # Generate embedding
+        # Generate embedding (model is loaded on first cache miss)
         logger.info(f"Generating embedding for text (length: {len(text)})")
-        embedding = model.encode(text, normalize_embeddings=True)
-        embedding_list = embedding.tolist()
+        embedding_list, cache_hit = embed_single(text)
 
         # Validate embedding dimensions
         if len(embedding_list) != EMBEDDING_DIMENSIONS:
@@ -117,6 +357,8 @@ def generate_embedding(request):
             "embedding": embedding_list,
             "model_version": MODEL_VERSION,
             "dimensions": len(embedding_list),
+            "cache_hit": cache_hit,
+            "cache": embedding_cache.stats(),
             "success": True,
         }
 
@@ -132,3 +374,6 @@ def generate_embedding(request):
         }
         return (json.dumps(error_response), 500, headers)
 
+
+if WARM_START:
+    threading.Thread(target=load_model, name="model-warm-start", daemon=True).start()
@@ -0,0 +1,90 @@
+"""
+Tests for the backend accuracy guard's reference texts (check_backend_accuracy.py).
+
+Checks that the reference bios are built like scripts/seedCaregiversFromCSV.ts
+builds caregiver bios (specializations from the HEALTH flags, then
+especializacion_val; afternoon shift by default), and that the guard fails
+without reference texts instead of passing. No model needed:
+
+    python test_backend_accuracy.py
+"""
+import csv
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+import check_backend_accuracy
+from check_backend_accuracy import neighbor_overlap, reference_texts, seed_specializations
+
+REPO_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "cuidador_processed_updated.csv")
+
+
+def write_csv(path, rows):
+    fields = ["exp_years", "turno_val", "especializacion_val", "skills"] + [f"HEALTH{i:02d}" for i in range(1, 15)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, restval="0")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_bios_use_seed_specializations():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "caregivers.csv")
+        write_csv(path, [
+            # Skills are not part of the bio; the first three specializations are
+            {"exp_years": "4", "turno_val": "3", "especializacion_val": "2", "skills": '["Compañía"]',
+             "HEALTH01": "1", "HEALTH03": "1"},
+            {"exp_years": "2.0", "turno_val": "0", "especializacion_val": "7",
+             "HEALTH02": "1", "HEALTH04": "1", "HEALTH14": "1"},
+            {"exp_years": "", "turno_val": "1", "especializacion_val": "1"},
+        ])
+        texts = reference_texts(path, limit=10)
+
+    assert texts == [
+        "Cuidador profesional con 4 años de experiencia. "
+        "Especializado en Alzheimer, Diabetes, Cuidado de demencia. Disponible para cuidado noche.",
+        "Cuidador profesional con 2 años de experiencia. "
+        "Especializado en Demencia, Hipertensión, Movilidad reducida. Disponible para cuidado tarde.",
+        "Cuidador profesional con 0 años de experiencia. "
+        "Especializado en Cuidado general. Disponible para cuidado mañana.",
+    ]
+
+
+def test_specializations_are_not_duplicated():
+    row = {"HEALTH02": "1", "especializacion_val": "2"}
+    assert seed_specializations(row) == ["Demencia", "Cuidado de demencia"]
+    assert seed_specializations({"especializacion_val": "9"}) == []
+
+
+def test_repository_csv_gives_reference_texts():
+    if not os.path.exists(REPO_CSV):
+        return
+    texts = reference_texts(REPO_CSV, limit=10)
+    assert len(texts) == 10
+    assert all("Especializado en " in text and "[" not in text for text in texts)
+
+
+def test_missing_reference_texts_fail_the_check():
+    argv = ["check_backend_accuracy.py", "--backends", "int8", "--csv", "/nonexistent.csv"]
+    with mock.patch.object(sys, "argv", argv), \
+            mock.patch.object(check_backend_accuracy, "encode") as encode:
+        assert check_backend_accuracy.main() == 1
+    encode.assert_not_called()
+
+
+def test_neighbor_overlap():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    assert neighbor_overlap(vectors, vectors, 5) == 1.0
+    assert neighbor_overlap(vectors, rng.normal(size=(20, 8)), 5) < 1.0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All backend accuracy tests passed")
@@ -0,0 +1,100 @@
+"""
+Tests for the content-addressed embedding cache (embedding_cache.py).
+
+Checks that texts differing only in whitespace or unicode normalization form
+share a cache key while other model versions (and case changes) do not, that
+the normalized text is what gets encoded, and that vectors survive a restart
+through the SQLite tier. The encoder is a stub (main is imported with
+WARM_START=false):
+
+    python test_embedding_cache.py
+"""
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+os.environ["WARM_START"] = "false"
+
+import main  # noqa: E402
+from embedding_cache import EmbeddingCache, cache_key, normalize_text  # noqa: E402
+
+COMPOSED = "Cuidador con 5 a\u00f1os de experiencia"     # ñ as one code point (NFC)
+DECOMPOSED = "Cuidador con 5 an\u0303os de experiencia"  # n + combining tilde (NFD)
+
+
+def stub_encoder(calls):
+    """Encodes each text as [len(text), 1.0] and records the texts it was given."""
+    def encode(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+    return encode
+
+
+def test_equivalent_texts_share_a_key():
+    assert COMPOSED != DECOMPOSED
+    assert normalize_text(DECOMPOSED) == COMPOSED
+    spaced = "  Cuidador   con 5\taños\nde  experiencia "
+
+    key = cache_key(COMPOSED, "v1")
+    assert cache_key(DECOMPOSED, "v1") == key
+    assert cache_key(spaced, "v1") == key
+    # Case is meaningful to the model
+    assert cache_key(COMPOSED.upper(), "v1") != key
+
+
+def test_model_versions_do_not_share_keys():
+    keys = {cache_key(COMPOSED, version) for version in ("v1", "v1-int8", "v1-onnx", "v2")}
+    assert len(keys) == 4
+    # The separator keeps (version, text) pairs from colliding by concatenation
+    assert cache_key("1 texto", "v") != cache_key(" texto", "v1")
+
+
+def test_normalized_text_is_encoded_once():
+    calls = []
+    with mock.patch.object(main, "embedding_cache", EmbeddingCache(max_entries=10)), \
+            mock.patch.object(main, "encode_texts", stub_encoder(calls)):
+        embeddings, cache_hits = main.embed_batch([DECOMPOSED, COMPOSED, f" {COMPOSED} "])
+        assert calls == [[COMPOSED]]
+        assert cache_hits == 0
+        assert embeddings == [[float(len(COMPOSED)), 1.0]] * 3
+
+        embedding, cache_hit = main.embed_single(f"{DECOMPOSED}\n")
+        assert cache_hit and embedding == embeddings[0]
+        assert calls == [[COMPOSED]]
+
+
+def test_other_model_version_is_a_miss():
+    calls = []
+    cache = EmbeddingCache(max_entries=10)
+    with mock.patch.object(main, "embedding_cache", cache), \
+            mock.patch.object(main, "encode_texts", stub_encoder(calls)), \
+            mock.patch.object(main, "MICRO_BATCH_WINDOW_MS", 0):
+        main.embed_single(COMPOSED)
+        with mock.patch.object(main, "MODEL_VERSION", "v1-int8"):
+            _, cache_hit = main.embed_single(COMPOSED)
+    assert not cache_hit
+    assert calls == [[COMPOSED], [COMPOSED]]
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.sqlite")
+        key = cache_key(COMPOSED, "v1")
+        EmbeddingCache(max_entries=10, path=path).put_many({key: [0.25, -0.5]})
+
+        restarted = EmbeddingCache(max_entries=10, path=path)
+        found = restarted.get_many([key, cache_key(COMPOSED, "v2")])
+        assert list(found) == [key]
+        assert found[key].dtype == np.float32 and found[key].tolist() == [0.25, -0.5]
+        assert restarted.stats()["disk_hits"] == 1 and restarted.stats()["misses"] == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All embedding cache tests passed")
@@ -0,0 +1,126 @@
+"""
+Tests for in-process micro-batching (MicroBatcher in main.py).
+
+Checks that concurrent callers each get their own vector back, that a batch
+is flushed when it reaches max_batch_size and when its window closes, and
+that an encode failure reaches every caller of the batch. The encoder is a
+stub, so no model is loaded (main is imported with WARM_START=false):
+
+    python test_micro_batcher.py
+"""
+import os
+import threading
+import time
+
+os.environ["WARM_START"] = "false"
+
+import main  # noqa: E402
+from main import MicroBatcher  # noqa: E402
+
+
+class RecordingEncoder:
+    """Encodes "text <i>" as [i, len(batch)] and records every batch it was called with."""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.error:
+            raise self.error
+        return [[float(text.split()[-1]), float(len(texts))] for text in texts]
+
+
+def submit_concurrently(batcher, count):
+    """Submit "text 0".."text <count-1>" from one thread each; returns results (or exceptions) by index."""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = batcher.submit(f"text {i}")
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+
+def test_concurrent_callers_get_their_own_vectors():
+    encoder = RecordingEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=32, window_seconds=0.2)
+
+    results = submit_concurrently(batcher, 8)
+
+    assert [result[0] for result in results] == list(range(8))
+    assert sorted(text for batch in encoder.batches for text in batch) == sorted(f"text {i}" for i in range(8))
+    # Fewer encode calls than callers: requests were merged
+    assert len(encoder.batches) < 8
+
+
+def test_full_batch_flushes_before_the_window_closes():
+    encoder = RecordingEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=3, window_seconds=30.0)
+
+    start = time.monotonic()
+    results = submit_concurrently(batcher, 6)
+
+    assert time.monotonic() - start < 10
+    assert [len(batch) for batch in encoder.batches] == [3, 3]
+    assert [result[0] for result in results] == list(range(6))
+    assert all(result[1] == 3.0 for result in results)
+
+
+def test_window_timeout_flushes_a_partial_batch():
+    encoder = RecordingEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=32, window_seconds=0.05)
+
+    start = time.monotonic()
+    assert batcher.submit("text 7") == [7.0, 1.0]
+    elapsed = time.monotonic() - start
+
+    assert 0.04 <= elapsed < 5
+    assert encoder.batches == [["text 7"]]
+
+
+def test_encode_error_reaches_every_caller():
+    error = RuntimeError("model failed")
+    encoder = RecordingEncoder(error=error)
+    batcher = MicroBatcher(encoder, max_batch_size=32, window_seconds=0.2)
+
+    results = submit_concurrently(batcher, 4)
+    assert all(result is error for result in results)
+
+    # The worker survives the failure and serves the next batch
+    encoder.error = None
+    assert batcher.submit("text 1") == [1.0, 1.0]
+
+
+def test_short_encode_result_fails_the_batch_instead_of_hanging():
+    batcher = MicroBatcher(lambda texts: [], max_batch_size=32, window_seconds=0.2)
+
+    results = submit_concurrently(batcher, 3)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_no_warm_start_thread_under_tests():
+    assert not main.WARM_START
+    assert main.model is None
+    assert "model-warm-start" not in [thread.name for thread in threading.enumerate()]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All micro-batcher tests passed")
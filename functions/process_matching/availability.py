@@ -0,0 +1,126 @@
+"""
+Compact weekly availability masks.
+
+A week is split into 15-minute slots (7 days x 96 slots = 672 bits) and
+packed into 84 bytes. Overlap between one senior and all candidates is a
+single AND over an (n_candidates, 84) uint8 array followed by a popcount,
+and measures real minutes of overlap rather than matching slot names.
+
+Masks are compiled from the Firestore availability dicts
+({'monday': {'morning': {'available', 'start', 'end'}, ...}, ...});
+csv_availability builds those dicts from the Lunes...Domingo day flags plus
+shift code of the processed CSV datasets.
+"""
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+TIME_SLOTS = ['morning', 'afternoon', 'evening']
+WEEK_SLOTS = len(DAYS) * SLOTS_PER_DAY
+MASK_BYTES = WEEK_SLOTS // 8
+
+# Day columns in cuidador_processed_updated.csv / abuelitos_processed.csv
+CSV_DAY_COLUMNS = ['Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes', 'Sabado', 'Domingo']
+
+# Shift codes (turno_val for caregivers, hour_range for seniors), as used by the seed scripts
+SHIFT_HOURS = {
+    1: ('08:00', '12:00'),  # Mañana
+    2: ('12:00', '18:00'),  # Tarde
+    3: ('18:00', '22:00'),  # Noche
+}
+# Shift for a missing or 0 code (seedCaregiversFromCSV.ts: `parseInt(row.turno_val) || 2`)
+DEFAULT_SHIFT = 2
+
+# Number of set bits for every byte value
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+
+def parse_minutes(value: str, default: int) -> int:
+    """Parse "HH:MM" into minutes since midnight; "23:59" is rounded up to end of day."""
+    try:
+        hours, minutes = str(value).split(':')
+        total = int(hours) * 60 + int(minutes)
+    except (ValueError, AttributeError):
+        return default
+    if total >= 24 * 60 - 1:
+        return 24 * 60
+    return max(0, total)
+
+
+def _set_range(bits: np.ndarray, day_idx: int, start_minute: int, end_minute: int):
+    """Mark [start, end) on a day; ranges ending before they start run past midnight."""
+    start_slot = start_minute // SLOT_MINUTES
+    end_slot = -(-end_minute // SLOT_MINUTES)  # ceil
+    offset = day_idx * SLOTS_PER_DAY
+    if end_minute > start_minute:
+        bits[offset + start_slot:offset + end_slot] = 1
+    elif end_minute < start_minute:
+        bits[offset + start_slot:offset + SLOTS_PER_DAY] = 1
+        next_offset = ((day_idx + 1) % len(DAYS)) * SLOTS_PER_DAY
+        bits[next_offset:next_offset + end_slot] = 1
+
+
+def compile_availability(availability: Optional[Mapping]) -> np.ndarray:
+    """Compile a Firestore-style availability dict into a packed weekly mask."""
+    bits = np.zeros(WEEK_SLOTS, dtype=np.uint8)
+    for day_idx, day in enumerate(DAYS):
+        day_slots = (availability or {}).get(day) or {}
+        for slot in TIME_SLOTS:
+            slot_data = day_slots.get(slot) or {}
+            if not slot_data.get('available'):
+                continue
+            start = parse_minutes(slot_data.get('start', '00:00'), 0)
+            end = parse_minutes(slot_data.get('end', '23:59'), 24 * 60)
+            _set_range(bits, day_idx, start, end)
+    return np.packbits(bits)
+
+
+def csv_availability(row: Mapping, shift_column: str) -> Dict:
+    """
+    Firestore-style availability dict for a processed-CSV row (day flags + shift code).
+
+    Decodes the columns like scripts/seedCaregiversFromCSV.ts: the shift code
+    selects one slot of SHIFT_HOURS on every flagged day, and a missing or 0
+    code defaults to the afternoon (DEFAULT_SHIFT).
+    """
+    try:
+        shift = int(float(row.get(shift_column) or 0)) or DEFAULT_SHIFT
+    except (TypeError, ValueError):
+        shift = DEFAULT_SHIFT
+    if shift not in SHIFT_HOURS:
+        return {}
+    start, end = SHIFT_HOURS[shift]
+    slot = TIME_SLOTS[shift - 1]
+    return {
+        day: {slot: {'available': True, 'start': start, 'end': end}}
+        for day, column in zip(DAYS, CSV_DAY_COLUMNS)
+        if str(row.get(column, '0')).strip() in ('1', '1.0')
+    }
+
+
+def stack_masks(masks: Sequence[np.ndarray]) -> np.ndarray:
+    """Stack packed masks into an (n, MASK_BYTES) uint8 array."""
+    if not len(masks):
+        return np.zeros((0, MASK_BYTES), dtype=np.uint8)
+    return np.vstack(masks).astype(np.uint8, copy=False)
+
+
+def available_minutes(masks: np.ndarray) -> np.ndarray:
+    """Available minutes per mask (works on one mask or an (n, MASK_BYTES) array)."""
+    return POPCOUNT_TABLE[masks].sum(axis=-1) * SLOT_MINUTES
+
+
+def overlap_minutes(senior_mask: np.ndarray, caregiver_masks: np.ndarray) -> np.ndarray:
+    """Minutes of overlap between one senior and every caregiver."""
+    return POPCOUNT_TABLE[np.bitwise_and(caregiver_masks, senior_mask)].sum(axis=-1) * SLOT_MINUTES
+
+
+def availability_overlap_scores(senior_mask: np.ndarray, caregiver_masks: np.ndarray) -> np.ndarray:
+    """Fraction of the senior's requested minutes each caregiver can cover (0-1)."""
+    requested = int(available_minutes(senior_mask))
+    if requested == 0:
+        return np.zeros(len(caregiver_masks), dtype=np.float64)
+    return overlap_minutes(senior_mask, caregiver_masks) / float(requested)
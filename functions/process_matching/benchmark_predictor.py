@@ -0,0 +1,57 @@
+"""
+Microbenchmark: Booster.predict vs the compiled NumPy predictor.
+
+Trains a LambdaRank model shaped like the production one (31 leaves, 100
+rounds), checks that both predictors agree, and reports best-of and median
+latency at 1, 50 and 1,000 rows.
+
+Usage:
+    python benchmark_predictor.py
+"""
+import time
+
+import lightgbm as lgb
+import numpy as np
+
+from benchmark_scoring import make_features, train_model
+from scoring import build_feature_matrix
+from tree_predictor import compile_booster
+
+ROW_COUNTS = [1, 50, 1000]
+REPEATS = 200
+
+
+def time_it(fn, repeats: int = REPEATS):
+    """(best, median) wall time in milliseconds."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000, float(np.median(samples)) * 1000
+
+
+def main():
+    rng = np.random.default_rng(42)
+    model: lgb.Booster = train_model(rng)
+
+    start = time.perf_counter()
+    compiled = compile_booster(model)
+    print(f"Compiled {compiled.num_trees} trees in {(time.perf_counter() - start) * 1000:.1f}ms\n")
+
+    print(f"{'rows':>6} | {'booster best':>12} | {'booster p50':>11} | "
+          f"{'compiled best':>13} | {'compiled p50':>12} | {'speedup':>7}")
+    print("-" * 78)
+
+    for n in ROW_COUNTS:
+        X = build_feature_matrix(make_features(n, rng))
+        assert np.allclose(compiled.predict(X), model.predict(X), rtol=0, atol=1e-9)
+
+        booster_best, booster_p50 = time_it(lambda: model.predict(X))
+        compiled_best, compiled_p50 = time_it(lambda: compiled.predict(X))
+        print(f"{n:>6} | {booster_best:>10.3f}ms | {booster_p50:>9.3f}ms | "
+              f"{compiled_best:>11.3f}ms | {compiled_p50:>10.3f}ms | {booster_p50 / compiled_p50:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""
+Replay benchmark: process_matching end to end on in-memory stand-ins.
+
+Builds caregiver and senior profiles from cuidador_processed_updated.csv and
+abuelitos_processed.csv (repository root), scales them up synthetically
+(resampled rows with flipped care/health/day flags, jittered experience,
+rates and Lima locations), and replays matching_queue events through the
+real process_matching function. Only the external services are replaced:
+
+    Firestore    FakeFirestore (documents, batches, list_documents,
+                 conditional updates)
+    pgvector     FakePgvector, answering main's prepared statements with an
+                 exact cosine search; metadata is stored as JSON text and
+                 decoded per row, like a jsonb column
+    Maps         FakeGmapsClient (haversine x 1.3), only with --driving
+    GCS          FakeStorage serving a LightGBM ranking model
+
+Each fake can add a fixed per-call latency (--firestore-ms, --db-ms,
+--maps-ms) to approximate network round trips; by default they are free, so
+the numbers are the pipeline's own CPU cost. Reports p50/p95/p99 latency per
+stage (load senior, vector search, enrich, score, store) and end to end,
+and throughput over the replay. The first requests (model and index
+loading) are reported as cold start and excluded from the percentiles.
+
+Embeddings are synthetic: the care, health and availability flags of a
+profile projected to 384 dimensions with a shared component and noise, so
+similar profiles are close. Conditions and specializations both use the
+HEALTHnn codes of the CSVs; availability is decoded by
+availability.csv_availability, like the seed scripts.
+
+Usage:
+    python benchmark_replay.py
+    python benchmark_replay.py --caregivers 200000 --seniors 10000 --requests 2000
+    python benchmark_replay.py --backend memory --feature-store --predictor compiled
+    python benchmark_replay.py --driving --maps-ms 40 --firestore-ms 5 --db-ms 3 --concurrency 8
+"""
+import argparse
+import csv
+import importlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from google.api_core.exceptions import FailedPrecondition
+
+from availability import CSV_DAY_COLUMNS, DEFAULT_SHIFT, SHIFT_HOURS, csv_availability
+from distance import haversine_km
+from vector_index import EMBEDDING_DIMENSIONS, normalize_rows
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CAREGIVERS_CSV = os.path.join(REPO_ROOT, "cuidador_processed_updated.csv")
+SENIORS_CSV = os.path.join(REPO_ROOT, "abuelitos_processed.csv")
+
+CARE_COLUMNS = [f"CARE{i:02d}" for i in range(1, 10)]
+HEALTH_COLUMNS = [f"HEALTH{i:02d}" for i in range(1, 15)]
+FLAG_COLUMNS = CARE_COLUMNS + HEALTH_COLUMNS + CSV_DAY_COLUMNS
+FLIP_PROBABILITY = 0.08
+
+# Caregiver payment code -> hourly rate (S/), and senior PAY_* band -> budget (band maximum)
+PAYMENT_RATES = {1: 15, 2: 25, 3: 40, 4: 60, 5: 85, 6: 110}
+BUDGET_COLUMNS = [('PAY_MENOS_20', 20), ('PAY20_50', 50), ('PAY50_80', 80), ('PAY80_100', 100), ('PAY_MORE100', 130)]
+LIMA = (-12.0464, -77.0428)
+LOCATION_SPREAD_DEG = 0.12
+
+EMBEDDING_SHARED_WEIGHT = 0.6
+EMBEDDING_NOISE = 0.25
+MODEL_PATH = "models/matching-model-replay.txt"
+STAGES = ['load_senior', 'vector_search', 'enrich', 'score', 'store', 'total']
+
+
+def read_csv(path: str) -> list:
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def _int(row: dict, column: str) -> int:
+    try:
+        return int(float(row.get(column, 0) or 0))
+    except ValueError:
+        return 0
+
+
+def scale_rows(rows: list, n: int, rng: np.random.Generator) -> list:
+    """n rows resampled from rows, each flag flipped with FLIP_PROBABILITY."""
+    scaled = []
+    for source in rng.integers(0, len(rows), n):
+        row = dict(rows[source])
+        flips = rng.random(len(FLAG_COLUMNS)) < FLIP_PROBABILITY
+        for column, flip in zip(FLAG_COLUMNS, flips):
+            if flip and column in row:
+                row[column] = '0' if _int(row, column) else '1'
+        scaled.append(row)
+    return scaled
+
+
+def lima_location(rng: np.random.Generator) -> dict:
+    lat, lng = np.array(LIMA) + rng.uniform(-LOCATION_SPREAD_DEG, LOCATION_SPREAD_DEG, 2)
+    return {'lat': float(lat), 'lng': float(lng)}
+
+
+def caregiver_metadata(row: dict, rng: np.random.Generator) -> dict:
+    """The caregiver_embeddings.metadata document for a CSV row."""
+    try:
+        certifications = json.loads(row.get('skills') or '[]')
+    except json.JSONDecodeError:
+        certifications = []
+    rate = PAYMENT_RATES.get(_int(row, 'payment'), 40)
+    return {
+        'location': lima_location(rng),
+        'availability': csv_availability(row, 'turno_val'),
+        'specializations': [column for column in HEALTH_COLUMNS if _int(row, column)],
+        'hourly_rate': float(rate * rng.uniform(0.85, 1.15)),
+        'years_of_experience': max(0, _int(row, 'exp_years') + int(rng.integers(-1, 3))),
+        'certifications': certifications,
+    }
+
+
+def senior_document(row: dict, rng: np.random.Generator) -> dict:
+    """The seniors/{id} fields process_matching reads, for a CSV row (embedding added later)."""
+    budget = next((value for column, value in BUDGET_COLUMNS if _int(row, column)), 50)
+    return {
+        'name': row.get('Name'),
+        'location': lima_location(rng),
+        'availability': csv_availability(row, 'hour_range'),
+        'conditions': [column for column in HEALTH_COLUMNS if _int(row, column)],
+        'budget': float(budget),
+    }
+
+
+def profile_vectors(rows: list, shift_column: str) -> np.ndarray:
+    """Care, health, day and shift flags of each row as a float matrix."""
+    matrix = np.zeros((len(rows), len(FLAG_COLUMNS) + len(SHIFT_HOURS)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        matrix[i, :len(FLAG_COLUMNS)] = [_int(row, column) for column in FLAG_COLUMNS]
+        shift = _int(row, shift_column) or DEFAULT_SHIFT
+        if shift in SHIFT_HOURS:
+            matrix[i, len(FLAG_COLUMNS) + shift - 1] = 1.0
+    return matrix
+
+
+def embed(vectors: np.ndarray, projection: np.ndarray, shared: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Unit embeddings: projected flags plus a shared direction (so about half the pairs clear 0.6) and noise."""
+    noise = rng.standard_normal((len(vectors), EMBEDDING_DIMENSIONS)).astype(np.float32)
+    noise *= EMBEDDING_NOISE / np.sqrt(EMBEDDING_DIMENSIONS)
+    return normalize_rows(normalize_rows(vectors @ projection) + EMBEDDING_SHARED_WEIGHT * shared + noise)
+
+
+class Latency:
+    """Sleeps a fixed time per simulated round trip."""
+
+    def __init__(self, milliseconds: float):
+        self.seconds = milliseconds / 1000
+
+    def __call__(self):
+        if self.seconds:
+            time.sleep(self.seconds)
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, db: "FakeFirestore", path: str):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._db, f"{self.path}/{name}")
+
+    def get(self) -> FakeSnapshot:
+        return self._db.rpc('get', lambda docs: FakeSnapshot(self, docs.get(self.path), self._db.versions[self.path]))
+
+    def set(self, data: dict, merge: bool = False):
+        self._db.rpc('commit', lambda docs: self._db.apply(('set', self.path, data, merge)))
+
+    def update(self, data: dict, option: dict = None):
+        def write(docs):
+            if option and self._db.versions[self.path] != option['last_update_time']:
+                raise FailedPrecondition(f"{self.path} changed since it was read")
+            self._db.apply(('update', self.path, data, True))
+
+        self._db.rpc('commit', write)
+
+    def delete(self):
+        self._db.rpc('commit', lambda docs: self._db.apply(('delete', self.path, None, False)))
+
+
+class FakeCollection:
+    def __init__(self, db: "FakeFirestore", path: str):
+        self._db = db
+        self.path = path
+
+    def document(self, document_id: str) -> FakeDocument:
+        return FakeDocument(self._db, f"{self.path}/{document_id}")
+
+    def list_documents(self):
+        prefix = f"{self.path}/"
+        paths = self._db.rpc('list_documents', lambda docs: [
+            path for path in docs if path.startswith(prefix) and '/' not in path[len(prefix):]
+        ])
+        return [FakeDocument(self._db, path) for path in paths]
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._writes = []
+
+    def set(self, ref: FakeDocument, data: dict, merge: bool = False):
+        self._writes.append(('set', ref.path, data, merge))
+
+    def update(self, ref: FakeDocument, data: dict):
+        self._writes.append(('update', ref.path, data, True))
+
+    def delete(self, ref: FakeDocument):
+        self._writes.append(('delete', ref.path, None, False))
+
+    def commit(self):
+        self._db.rpc('commit', lambda docs: [self._db.apply(write) for write in self._writes])
+
+
+class FakeFirestore:
+    """Dict-backed Firestore client: one lock, one latency and one RPC count per call."""
+
+    def __init__(self, latency: Latency):
+        self.docs = {}
+        self.latency = latency
+        self.rpcs = Counter()
+        self.versions = Counter()  # stands in for update_time
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def write_option(self, last_update_time):
+        return {'last_update_time': last_update_time}
+
+    def rpc(self, name: str, operation):
+        self.latency()
+        with self._lock:
+            self.rpcs[name] += 1
+            return operation(self.docs)
+
+    def apply(self, write):
+        kind, path, data, merge = write
+        self.versions[path] += 1
+        if kind == 'delete':
+            self.docs.pop(path, None)
+        elif kind == 'update' or merge:
+            self.docs[path] = {**self.docs.get(path, {}), **data}
+        else:
+            self.docs[path] = dict(data)
+
+
+class FakePgvector:
+    """Answers process_matching's prepared statements from in-memory arrays."""
+
+    def __init__(self, main, ids: list, embeddings: np.ndarray, metadata: list, latency: Latency):
+        self.main = main
+        self.ids = ids
+        self.embeddings = embeddings
+        self.metadata_json = [json.dumps(m) for m in metadata]
+        self.row_of = {caregiver_id: row for row, caregiver_id in enumerate(ids)}
+        self.updated_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.latency = latency
+        self.queries = Counter()
+
+    def execute_prepared(self, name, query, arg_types, params):
+        self.latency()
+        self.queries[name] += 1
+        main = self.main
+        if name in (main.SIMILAR_CAREGIVERS_STATEMENT, main.SIMILAR_CAREGIVER_IDS_STATEMENT):
+            return self.similar(np.asarray(params[0], dtype=np.float32), params[1],
+                                name == main.SIMILAR_CAREGIVERS_STATEMENT)
+        if name == main.CAREGIVER_METADATA_STATEMENT:
+            return [{'id': cid, 'metadata': json.loads(self.metadata_json[self.row_of[cid]])}
+                    for cid in params[0] if cid in self.row_of]
+        if name == main.CAREGIVER_EMBEDDING_CHANGES_STATEMENT:
+            since, after_id, limit = params
+            if since > self.updated_at:
+                return []
+            start = 0 if since < self.updated_at else int(np.searchsorted(self.ids, after_id, side='right'))
+            return [{'id': self.ids[row], 'embedding': self.embeddings[row], 'updated_at': self.updated_at}
+                    for row in range(start, min(start + limit, len(self.ids)))]
+        if name == main.CAREGIVER_EMBEDDING_DELETIONS_STATEMENT:
+            return []
+        raise ValueError(f"Statement {name} is not simulated")
+
+    def similar(self, query: np.ndarray, threshold: float, include_metadata: bool) -> list:
+        """Exact cosine top MAX_CANDIDATES, then the threshold (like the SQL)."""
+        similarities = self.embeddings @ (query / np.linalg.norm(query))
+        k = min(self.main.MAX_CANDIDATES, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        rows = []
+        for row in top:
+            if similarities[row] <= threshold:
+                continue
+            result = {'id': self.ids[row], 'similarity': float(similarities[row])}
+            if include_metadata:
+                result['metadata'] = json.loads(self.metadata_json[row])
+            else:
+                result['updated_at'] = self.updated_at
+            rows.append(result)
+        return rows
+
+
+class FakeGmapsClient:
+    """Distance Matrix stand-in: 1.3x the straight-line distance, after a fixed latency."""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.requests = 0
+
+    def distance_matrix(self, origins, destinations, mode, units):
+        self.latency()
+        self.requests += 1
+        origin = tuple(float(x) for x in origins[0].split(','))
+        points = np.array([[float(x) for x in d.split(',')] for d in destinations])
+        meters = haversine_km(origin[0], origin[1], points[:, 0], points[:, 1]) * 1300
+        return {'status': 'OK', 'rows': [{'elements': [
+            {'status': 'OK', 'distance': {'value': float(m)}} for m in np.atleast_1d(meters)
+        ]}]}
+
+
+class FakeStorage:
+    """storage.Client stand-in holding blobs in memory."""
+
+    def __init__(self, blobs: dict):
+        self.blobs = blobs
+
+    def bucket(self, name):
+        blobs = self.blobs
+        return SimpleNamespace(blob=lambda blob_name: SimpleNamespace(
+            download_as_text=lambda: blobs[blob_name],
+        ))
+
+
+class StageTimer:
+    """Wraps main's stage functions and records their latency (ms) per call."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._local = threading.local()
+
+    def wrap(self, module, function_name: str, stage: str):
+        original = getattr(module, function_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                if stage == 'vector_search':
+                    self._local.vector_search = elapsed
+                elif stage == 'load_senior':
+                    # prepare_matching = load senior + vector search
+                    elapsed -= getattr(self._local, 'vector_search', 0.0)
+                    self._local.vector_search = 0.0
+                self.samples[stage].append(elapsed)
+
+        setattr(module, function_name, timed)
+
+    def reset(self):
+        self.samples.clear()
+
+
+def load_main(predictor: str):
+    """Import main.py with GCP clients stubbed (replaced by the fakes afterwards)."""
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "demo-caregiving")
+    os.environ["MODEL_LOCAL_DIR"] = ""
+    os.environ["PREDICTOR_MODE"] = predictor
+    with mock.patch("google.cloud.firestore.Client"), \
+            mock.patch("google.cloud.tasks_v2.CloudTasksClient"), \
+            mock.patch("google.cloud.storage.Client"):
+        return importlib.import_module("main")
+
+
+def build_world(main, args, rng: np.random.Generator):
+    """Scaled profiles, embeddings and the fakes wired into main; returns (db, pgvector, maps, senior ids)."""
+    caregiver_rows = scale_rows(read_csv(CAREGIVERS_CSV), args.caregivers, rng)
+    senior_rows = scale_rows(read_csv(SENIORS_CSV), args.seniors, rng)
+
+    projection = rng.standard_normal((len(FLAG_COLUMNS) + len(SHIFT_HOURS), EMBEDDING_DIMENSIONS)).astype(np.float32)
+    shared = normalize_rows(rng.standard_normal((1, EMBEDDING_DIMENSIONS)))[0]
+    caregiver_ids = [f"caregiver_{i:07d}" for i in range(args.caregivers)]
+    caregiver_embeddings = embed(profile_vectors(caregiver_rows, 'turno_val'), projection, shared, rng)
+    senior_embeddings = embed(profile_vectors(senior_rows, 'hour_range'), projection, shared, rng)
+    metadata = [caregiver_metadata(row, rng) for row in caregiver_rows]
+
+    db = FakeFirestore(Latency(args.firestore_ms))
+    senior_ids = [f"senior_{i:06d}" for i in range(args.seniors)]
+    for senior_id, row, embedding in zip(senior_ids, senior_rows, senior_embeddings):
+        db.docs[f"seniors/{senior_id}"] = {**senior_document(row, rng), 'embedding': embedding.tolist()}
+
+    blobs = {}
+    if not args.no_model:
+        from benchmark_scoring import train_model
+
+        blobs[MODEL_PATH] = train_model(rng).model_to_string()
+        db.docs["config/matching_model"] = {
+            'model_path': MODEL_PATH, 'model_version': 'replay', 'ml_enabled': True,
+        }
+    else:
+        db.docs["config/matching_model"] = {'ml_enabled': False}
+
+    pgvector = FakePgvector(main, caregiver_ids, caregiver_embeddings, metadata, Latency(args.db_ms))
+    maps = FakeGmapsClient(Latency(args.maps_ms))
+
+    main.db = db
+    main.storage_client = FakeStorage(blobs)
+    main.execute_prepared = pgvector.execute_prepared
+    main.distance_cache = main.DistanceCache(path=None)
+    main.MATCHING_BACKEND = args.backend
+    main.SIMILARITY_THRESHOLD = args.threshold
+    if args.driving:
+        main.DISTANCE_PROVIDER = "driving"
+        main.GOOGLE_MAPS_API_KEY = "replay"
+        main.googlemaps = SimpleNamespace(Client=lambda **kwargs: maps)
+    if args.feature_store:
+        from feature_store import CaregiverFeatureStore, write_feature_store
+
+        directory = os.path.join(tempfile.mkdtemp(prefix="replay_features_"), "store")
+        write_feature_store(directory, caregiver_ids, metadata, [pgvector.updated_at] * len(caregiver_ids))
+        main.feature_store, main.feature_store_loaded = CaregiverFeatureStore(directory), True
+    else:
+        main.feature_store, main.feature_store_loaded = None, True
+    return db, pgvector, maps, senior_ids
+
+
+def queue_event(queue_id: str, senior_id: str) -> SimpleNamespace:
+    """The Firestore trigger event for a new matching_queue document."""
+    return SimpleNamespace(data={'value': {
+        'name': f"projects/demo-caregiving/databases/(default)/documents/matching_queue/{queue_id}",
+        'fields': {'seniorId': {'stringValue': senior_id}, 'status': {'stringValue': 'queued'}},
+    }})
+
+
+def replay(main, db: FakeFirestore, senior_ids: list, count: int, concurrency: int, rng, offset: int = 0) -> float:
+    """Trigger process_matching for `count` random seniors; returns wall seconds."""
+    events = []
+    for i in range(count):
+        queue_id = f"queue_{offset + i:07d}"
+        senior_id = senior_ids[int(rng.integers(0, len(senior_ids)))]
+        db.docs[f"matching_queue/{queue_id}"] = {'seniorId': senior_id, 'status': 'queued'}
+        events.append(queue_event(queue_id, senior_id))
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        for event in events:
+            main.process_matching(event)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(main.process_matching, events))
+    return time.perf_counter() - start
+
+
+def report(timer: StageTimer, wall_seconds: float, requests: int):
+    print(f"{'stage':>13} | {'calls':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'mean ms':>8}")
+    print("-" * 66)
+    for stage in STAGES:
+        samples = np.array(timer.samples.get(stage, []))
+        if not len(samples):
+            print(f"{stage:>13} | {0:>6} |        - |        - |        - |        -")
+            continue
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        print(f"{stage:>13} | {len(samples):>6} | {p50:>8.2f} | {p95:>8.2f} | {p99:>8.2f} | {samples.mean():>8.2f}")
+    print(f"\nThroughput: {requests / wall_seconds:.1f} requests/s ({requests} requests in {wall_seconds:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caregivers", type=int, default=50000)
+    parser.add_argument("--seniors", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20, help="requests run first and reported as cold start")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent invocations per instance")
+    parser.add_argument("--backend", choices=["pgvector", "memory"], default="pgvector")
+    parser.add_argument("--feature-store", action="store_true", help="enrich from a caregiver feature store")
+    parser.add_argument("--predictor", choices=["booster", "compiled"], default="booster")
+    parser.add_argument("--no-model", action="store_true", help="score with the heuristic")
+    parser.add_argument("--driving", action="store_true", help="refine the top candidates with the fake Maps client")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--firestore-ms", type=float, default=0.0)
+    parser.add_argument("--db-ms", type=float, default=0.0)
+    parser.add_argument("--maps-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+    main_module = load_main(args.predictor)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    db, pgvector, maps, senior_ids = build_world(main_module, args, rng)
+    print(f"Built {args.caregivers:,} caregivers and {args.seniors:,} seniors in {time.perf_counter() - start:.1f}s "
+          f"(backend={args.backend}, feature store={'on' if args.feature_store else 'off'}, "
+          f"predictor={args.predictor}, model={'off' if args.no_model else 'on'}, "
+          f"distance={'driving' if args.driving else 'haversine'}, concurrency={args.concurrency})")
+
+    timer = StageTimer()
+    timer.wrap(main_module, 'prepare_matching', 'load_senior')
+    timer.wrap(main_module, 'find_candidates', 'vector_search')
+    timer.wrap(main_module, 'enrich_candidates', 'enrich')
+    timer.wrap(main_module, 'score_candidates', 'score')
+    timer.wrap(main_module, 'store_matches', 'store')
+    timer.wrap(main_module, 'process_matching', 'total')
+
+    if args.warmup:
+        replay(main_module, db, senior_ids, 1, 1, rng)
+        cold_ms = timer.samples['total'][0]
+        replay(main_module, db, senior_ids, args.warmup - 1, args.concurrency, rng, offset=1)
+        print(f"Cold start (first request): {cold_ms:.1f}ms\n")
+        timer.reset()
+        db.rpcs.clear()
+        pgvector.queries.clear()
+
+    wall_seconds = replay(main_module, db, senior_ids, args.requests, args.concurrency, rng, offset=args.warmup)
+    report(timer, wall_seconds, args.requests)
+
+    stored = [db.docs.get(f"seniors/{senior_id}", {}).get('match_count') for senior_id in senior_ids]
+    stored = [count for count in stored if count is not None]
+    print(f"Matches stored: {np.mean(stored):.1f} per senior over {len(stored)} seniors" if stored else "No matches stored")
+    print(f"Per request: {dict((k, round(v / args.requests, 2)) for k, v in sorted(db.rpcs.items()))} Firestore RPCs, "
+          f"{sum(pgvector.queries.values()) / args.requests:.2f} SQL queries"
+          + (f", {maps.requests / args.requests:.2f} Maps requests" if args.driving else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Microbenchmark: per-candidate vs batched candidate scoring.
+
+Trains a small LambdaRank model on synthetic features, then times the old
+one-predict-call-per-candidate loop against a single batched predict call
+(and the scalar vs vectorized heuristic) at 50, 500 and 5,000 candidates.
+
+Usage:
+    python benchmark_scoring.py
+"""
+import time
+
+import lightgbm as lgb
+import numpy as np
+
+from scoring import (
+    FEATURE_COLUMNS,
+    build_feature_matrix,
+    calculate_heuristic_score,
+    calculate_heuristic_scores,
+    predict_scores,
+)
+
+CANDIDATE_COUNTS = [50, 500, 5000]
+REPEATS = 5
+
+
+def make_features(n: int, rng: np.random.Generator) -> list:
+    """Generate n synthetic candidate feature dicts."""
+    return [
+        {
+            'similarity': rng.uniform(0.6, 1.0),
+            'location_score': rng.uniform(0, 1),
+            'availability_score': rng.uniform(0, 1),
+            'specialization_score': rng.uniform(0, 1),
+            'price_score': rng.uniform(0, 1),
+            'years_experience': int(rng.integers(0, 25)),
+            'certification_count': int(rng.integers(0, 6)),
+        }
+        for _ in range(n)
+    ]
+
+
+def train_model(rng: np.random.Generator) -> lgb.Booster:
+    """Train a small ranking model so predict cost is realistic."""
+    X = build_feature_matrix(make_features(2000, rng))
+    y = rng.integers(1, 6, size=len(X))
+    group = [20] * (len(X) // 20)
+    train_data = lgb.Dataset(X, label=y, group=group)
+    params = {'objective': 'lambdarank', 'num_leaves': 31, 'verbose': -1}
+    return lgb.train(params, train_data, num_boost_round=100)
+
+
+def time_it(fn) -> float:
+    """Best-of-REPEATS wall time in milliseconds."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def per_candidate_ml(model, features):
+    return [float(model.predict([[f[c] for c in FEATURE_COLUMNS]])[0]) for f in features]
+
+
+def batched_ml(model, features):
+    return predict_scores(model, build_feature_matrix(features))
+
+
+def per_candidate_heuristic(features):
+    return [
+        calculate_heuristic_score(
+            f['similarity'], f['location_score'], f['availability_score'],
+            f['specialization_score'], f['price_score'], f['years_experience'],
+        )
+        for f in features
+    ]
+
+
+def batched_heuristic(features):
+    return calculate_heuristic_scores(build_feature_matrix(features))
+
+
+def main():
+    rng = np.random.default_rng(42)
+    model = train_model(rng)
+
+    print(f"{'candidates':>10} | {'ml loop':>10} | {'ml batch':>10} | {'speedup':>8} | "
+          f"{'heur loop':>10} | {'heur batch':>10} | {'speedup':>8}")
+    print("-" * 84)
+
+    for n in CANDIDATE_COUNTS:
+        features = make_features(n, rng)
+
+        # Sanity check: both paths must produce the same scores
+        assert np.allclose(per_candidate_ml(model, features), batched_ml(model, features))
+        assert np.allclose(per_candidate_heuristic(features), batched_heuristic(features))
+
+        ml_loop = time_it(lambda: per_candidate_ml(model, features))
+        ml_batch = time_it(lambda: batched_ml(model, features))
+        heur_loop = time_it(lambda: per_candidate_heuristic(features))
+        heur_batch = time_it(lambda: batched_heuristic(features))
+
+        print(f"{n:>10} | {ml_loop:>8.2f}ms | {ml_batch:>8.2f}ms | {ml_loop / ml_batch:>7.1f}x | "
+              f"{heur_loop:>8.2f}ms | {heur_batch:>8.2f}ms | {heur_loop / heur_batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
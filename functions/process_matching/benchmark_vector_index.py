@@ -0,0 +1,189 @@
+"""
+Benchmark: caregiver similarity search backends.
+
+Builds synthetic caregiver embeddings (clustered, L2-normalized, 384 dims) at
+10k, 100k and 1M caregivers and times top-50 search for:
+
+    numpy     brute force: full similarity vector + full argsort
+    exact     ExactVectorIndex (matrix-vector product + argpartition)
+    hnsw      HnswVectorIndex (only if hnswlib is installed)
+    pgvector  the process_matching ids-only query (only if DATABASE_URL is set;
+              loads the caregivers into a scratch table with the HNSW index
+              from migrations/002)
+
+recall@50 is measured against exact top-50 (no similarity threshold).
+
+Usage:
+    python benchmark_vector_index.py
+    python benchmark_vector_index.py --sizes 10000,100000 --queries 200
+    DATABASE_URL=postgresql://localhost/caregiving_test python benchmark_vector_index.py --sizes 10000
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+
+from vector_index import EMBEDDING_DIMENSIONS, ExactVectorIndex, create_index, normalize_rows
+
+K = 50
+CLUSTERS = 64
+PGVECTOR_TABLE = "benchmark_caregiver_embeddings"
+
+
+def make_embeddings(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Clustered embeddings, like profiles that share specializations and shifts."""
+    centers = normalize_rows(rng.standard_normal((CLUSTERS, EMBEDDING_DIMENSIONS)))
+    embeddings = np.empty((n, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    for start in range(0, n, 100000):
+        stop = min(n, start + 100000)
+        assignment = rng.integers(0, CLUSTERS, stop - start)
+        noise = rng.standard_normal((stop - start, EMBEDDING_DIMENSIONS)).astype(np.float32)
+        embeddings[start:stop] = normalize_rows(centers[assignment] + 0.08 * noise)
+    return embeddings
+
+
+def numpy_brute_force(matrix: np.ndarray, ids: list, query: np.ndarray, k: int) -> list:
+    similarities = matrix @ query
+    order = np.argsort(-similarities)[:k]
+    return [(ids[i], float(similarities[i])) for i in order]
+
+
+def time_queries(search, queries: np.ndarray) -> tuple:
+    """Run search for every query; returns (results, latencies in ms)."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def recall(results: list, truth: list) -> float:
+    return float(np.mean([
+        len({cid for cid, _ in got} & {cid for cid, _ in expected}) / max(1, len(expected))
+        for got, expected in zip(results, truth)
+    ]))
+
+
+def report(name: str, build_seconds: float, latencies: np.ndarray, results: list, truth: list):
+    print(
+        f"{name:>9} | {build_seconds:>8.2f} | {np.percentile(latencies, 50):>8.3f} | "
+        f"{np.percentile(latencies, 99):>8.3f} | {recall(results, truth):>9.3f}"
+    )
+
+
+def pgvector_search(database_url: str, ids: list, embeddings: np.ndarray):
+    """Load a scratch table; returns (search function, load seconds, cleanup function)."""
+    import psycopg2
+    from pgvector.psycopg2 import register_vector
+
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    cursor.execute(f"DROP TABLE IF EXISTS {PGVECTOR_TABLE}")
+    cursor.execute(
+        f"CREATE TABLE {PGVECTOR_TABLE} (id VARCHAR(255) PRIMARY KEY, "
+        f"embedding vector({EMBEDDING_DIMENSIONS}))"
+    )
+    buffer = io.StringIO()
+    for caregiver_id, vector in zip(ids, embeddings):
+        buffer.write(f"{caregiver_id}\t[{','.join(f'{x:.6f}' for x in vector)}]\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {PGVECTOR_TABLE} (id, embedding) FROM STDIN", buffer)
+    cursor.execute(
+        f"CREATE INDEX ON {PGVECTOR_TABLE} USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = 16, ef_construction = 64)"
+    )
+    cursor.execute(f"ANALYZE {PGVECTOR_TABLE}")
+    load_seconds = time.perf_counter() - start
+    register_vector(conn)
+    cursor.execute("SET hnsw.ef_search = 100")
+
+    # Same shape as SIMILAR_CAREGIVER_IDS_QUERY in main.py
+    query_sql = f"""
+        SELECT id, similarity
+        FROM (
+            SELECT id, 1 - (embedding <=> %s::vector) AS similarity
+            FROM {PGVECTOR_TABLE}
+            ORDER BY embedding <=> %s::vector
+            LIMIT {K}
+        ) nearest
+        WHERE similarity > %s
+        ORDER BY similarity DESC
+    """
+
+    def search(query: np.ndarray) -> list:
+        query = query.astype(np.float32)
+        cursor.execute(query_sql, (query, query, -1.0))
+        return cursor.fetchall()
+
+    def close():
+        cursor.execute(f"DROP TABLE IF EXISTS {PGVECTOR_TABLE}")
+        conn.close()
+
+    return search, load_seconds, close
+
+
+def run_size(n: int, num_queries: int, rng: np.random.Generator):
+    embeddings = make_embeddings(n, rng)
+    ids = [f"caregiver_{i}" for i in range(n)]
+    queries = embeddings[rng.choice(n, num_queries, replace=False)] + 0.05 * rng.standard_normal(
+        (num_queries, EMBEDDING_DIMENSIONS)
+    ).astype(np.float32)
+    queries = normalize_rows(queries)
+
+    print(f"\n{n:,} caregivers, {num_queries} queries, top {K}")
+    print(f"{'backend':>9} | {'build s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'recall@50':>9}")
+    print("-" * 56)
+
+    truth, latencies = time_queries(lambda q: numpy_brute_force(embeddings, ids, q, K), queries)
+    report("numpy", 0.0, latencies, truth, truth)
+
+    start = time.perf_counter()
+    exact = ExactVectorIndex(initial_capacity=n)
+    exact.upsert(ids, embeddings)
+    build_seconds = time.perf_counter() - start
+    results, latencies = time_queries(lambda q: exact.search(q, K), queries)
+    report("exact", build_seconds, latencies, results, truth)
+    del exact
+
+    start = time.perf_counter()
+    hnsw = create_index("hnsw", max_elements=n)
+    if hnsw.name == "hnsw":
+        hnsw.upsert(ids, embeddings)
+        build_seconds = time.perf_counter() - start
+        results, latencies = time_queries(lambda q: hnsw.search(q, K), queries)
+        report("hnsw", build_seconds, latencies, results, truth)
+    else:
+        print(f"{'hnsw':>9} | skipped (hnswlib not installed)")
+    del hnsw
+
+    database_url = os.environ.get("DATABASE_URL")
+    if database_url:
+        search, load_seconds, close = pgvector_search(database_url, ids, embeddings)
+        try:
+            results, latencies = time_queries(search, queries)
+            report("pgvector", load_seconds, latencies, results, truth)
+        finally:
+            close()
+    else:
+        print(f"{'pgvector':>9} | skipped (DATABASE_URL not set)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for n in [int(size) for size in args.sizes.split(",")]:
+        run_size(n, min(args.queries, n), rng)
+
+
+if __name__ == "__main__":
+    main()
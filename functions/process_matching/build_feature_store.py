@@ -0,0 +1,98 @@
+"""
+Build or incrementally update the caregiver feature store.
+
+Reads caregiver metadata from the caregiver_embeddings table, derives the
+typed feature columns (see feature_store.py) and optionally uploads the
+snapshot to the FEATURE_STORE_URI that process_matching loads at cold start.
+Each row records the updated_at it was read at; process_matching scores
+caregivers edited since then from their metadata, so the store only needs
+rebuilding to keep enrichment on the fast path, not for correctness.
+
+Usage:
+    # Full rebuild
+    DATABASE_URL=postgresql://... python build_feature_store.py --output ./caregiver_features \\
+        --upload gs://caregiving-ml/feature-store/caregivers
+
+    # Incremental update after caregiver profiles change
+    DATABASE_URL=postgresql://... python build_feature_store.py --output ./caregiver_features \\
+        --ids caregiver_1,caregiver_2 --upload gs://caregiving-ml/feature-store/caregivers
+"""
+import argparse
+import logging
+import os
+import time
+
+import psycopg2
+
+from feature_store import CaregiverFeatureStore, download_snapshot, upsert_caregivers, write_feature_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fetch_metadata(conn, caregiver_ids=None):
+    """Fetch ({id: metadata}, {id: updated_at}), optionally only for the given caregiver ids."""
+    cursor = conn.cursor()
+    if caregiver_ids:
+        cursor.execute(
+            "SELECT id, metadata, updated_at FROM caregiver_embeddings WHERE id = ANY(%s)",
+            (list(caregiver_ids),),
+        )
+    else:
+        cursor.execute("SELECT id, metadata, updated_at FROM caregiver_embeddings ORDER BY id")
+    rows = cursor.fetchall()
+    cursor.close()
+    return {row[0]: row[1] or {} for row in rows}, {row[0]: row[2] for row in rows}
+
+
+def upload_snapshot(directory: str, uri: str):
+    """Upload every file of a store directory to gs://bucket/prefix."""
+    from google.cloud import storage
+
+    bucket_name, _, prefix = uri[len('gs://'):].partition('/')
+    bucket = storage.Client().bucket(bucket_name)
+    for filename in sorted(os.listdir(directory)):
+        bucket.blob(f"{prefix.rstrip('/')}/{filename}").upload_from_filename(
+            os.path.join(directory, filename)
+        )
+    logger.info(f"Uploaded feature store snapshot to {uri}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="Local store directory")
+    parser.add_argument("--ids", help="Comma-separated caregiver ids to update incrementally")
+    parser.add_argument("--upload", help="gs://bucket/prefix to publish the snapshot to")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    start = time.perf_counter()
+    try:
+        if args.ids:
+            if args.upload and not os.path.exists(os.path.join(args.output, 'manifest.json')):
+                from google.cloud import storage
+                download_snapshot(args.upload, args.output, storage.Client())
+            updates, updated_at = fetch_metadata(conn, args.ids.split(','))
+            upsert_caregivers(args.output, updates, updated_at)
+            logger.info(f"Updated {len(updates)} caregivers")
+        else:
+            records, updated_at = fetch_metadata(conn)
+            write_feature_store(
+                args.output, list(records.keys()), list(records.values()),
+                [updated_at[cid] for cid in records],
+            )
+    finally:
+        conn.close()
+
+    store = CaregiverFeatureStore(args.output)
+    logger.info(
+        f"Feature store has {len(store)} caregivers, {len(store.vocabulary)} specializations "
+        f"(built in {time.perf_counter() - start:.2f}s)"
+    )
+
+    if args.upload:
+        upload_snapshot(args.output, args.upload)
+
+
+if __name__ == "__main__":
+    main()
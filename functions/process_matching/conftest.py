@@ -0,0 +1,99 @@
+"""
+Shared test helpers for process_matching.
+
+load_main() imports main.py afresh with the GCP clients stubbed (the `main`
+fixture wraps it), so module state one test sets up does not leak into the
+next. StubGmapsClient stands in for the Google Maps Distance Matrix client.
+Test modules import both directly, so they still run as `python test_x.py`.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+import pytest
+
+
+def load_main(stub_firestore: bool = True):
+    """
+    Import main.py afresh with the Tasks and Storage clients stubbed.
+
+    firestore.Client is stubbed too unless stub_firestore is False (the
+    emulator tests, which need a real client).
+    """
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "demo-caregiving")
+    sys.modules.pop("main", None)
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch("google.cloud.tasks_v2.CloudTasksClient"))
+        stack.enter_context(mock.patch("google.cloud.storage.Client"))
+        if stub_firestore:
+            stack.enter_context(mock.patch("google.cloud.firestore.Client"))
+        return importlib.import_module("main")
+
+
+@pytest.fixture
+def main():
+    """main.py with all GCP clients stubbed."""
+    return load_main()
+
+
+class StubGmapsClient:
+    """
+    Distance Matrix stand-in.
+
+    Answers each destination with its latitude x 1000 km, or distance_km for
+    every destination if given. element_status overrides the status of given
+    destinations; response_status and error reject a whole request. Requests
+    with a destination at latitude >= stall_latitude take stall_seconds, the
+    others latency_seconds. Records every request and the peak number of
+    concurrent requests.
+    """
+
+    def __init__(
+        self,
+        element_status=None,
+        response_status='OK',
+        error=None,
+        distance_km=None,
+        stall_latitude=None,
+        stall_seconds=0.0,
+        latency_seconds=0.0,
+    ):
+        self.requests = []
+        self.element_status = element_status or {}
+        self.response_status = response_status
+        self.error = error
+        self.distance_km = distance_km
+        self.stall_latitude = stall_latitude
+        self.stall_seconds = stall_seconds
+        self.latency_seconds = latency_seconds
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def distance_matrix(self, origins, destinations, mode, units):
+        latitudes = [float(destination.split(",")[0]) for destination in destinations]
+        with self._lock:
+            self.requests.append(list(destinations))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            stalls = self.stall_latitude is not None and any(lat >= self.stall_latitude for lat in latitudes)
+            time.sleep(self.stall_seconds if stalls else self.latency_seconds)
+            if self.error:
+                raise self.error
+            elements = []
+            for destination, latitude in zip(destinations, latitudes):
+                status = self.element_status.get(destination, 'OK')
+                element = {'status': status}
+                if status == 'OK':
+                    km = self.distance_km if self.distance_km is not None else latitude * 1000
+                    element['distance'] = {'value': km * 1000}
+                elements.append(element)
+            return {'status': self.response_status, 'rows': [{'elements': elements}]}
+        finally:
+            with self._lock:
+                self.active -= 1
@@ -0,0 +1,200 @@
+"""
+Connection pool for Cloud SQL PostgreSQL.
+
+The pool lives at module level so connections survive across warm
+invocations of the function. Connections are health-checked on checkout,
+closed after sitting idle too long, and replaced transparently when broken.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """A pooled DB-API connection plus the per-connection state the pool tracks."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.prepared = set()
+        self.broken = False
+
+    def prepare(self, name: str, statement: str, arg_types: Sequence[str] = ()):
+        """Create a server-side prepared statement once per connection."""
+        if name in self.prepared:
+            return
+        signature = f"{name} ({', '.join(arg_types)})" if arg_types else name
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"PREPARE {signature} AS {statement}")
+        finally:
+            cursor.close()
+        self.prepared.add(name)
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded connection pool.
+
+    Args:
+        connect: Zero-argument factory returning a new DB-API connection.
+        max_size: Maximum number of open connections.
+        idle_timeout: Seconds a connection may sit idle before it is closed.
+        checkout_timeout: Seconds to wait for a free connection before raising PoolTimeout.
+        ping_after: Connections idle for at least this many seconds are pinged
+            with ``SELECT 1`` on checkout.
+        on_connect: Optional callback run on every new connection (session setup).
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 10.0,
+        ping_after: float = 5.0,
+        on_connect: Optional[Callable] = None,
+    ):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self._on_connect = on_connect
+
+        self._idle: List[PooledConnection] = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'created': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'reconnects': 0,
+            'idle_closed': 0,
+            'discarded': 0,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of pool counters."""
+        with self._cond:
+            return {
+                **self._stats,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+            }
+
+    def _open(self) -> PooledConnection:
+        conn = self._connect()
+        if self._on_connect:
+            self._on_connect(conn)
+        with self._cond:
+            self._stats['created'] += 1
+        return PooledConnection(conn)
+
+    def _close(self, pooled: PooledConnection):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pooled: PooledConnection) -> bool:
+        if getattr(pooled.conn, 'closed', 0):
+            return False
+        if time.monotonic() - pooled.last_used < self.ping_after:
+            return True
+        try:
+            cursor = pooled.conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            return False
+
+    def _reap_idle(self):
+        """Close connections that have been idle longer than idle_timeout (lock held)."""
+        now = time.monotonic()
+        keep = []
+        for pooled in self._idle:
+            if now - pooled.last_used > self.idle_timeout:
+                self._close(pooled)
+                self._stats['idle_closed'] += 1
+            else:
+                keep.append(pooled)
+        self._idle = keep
+
+    def _checkout(self) -> PooledConnection:
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            self._stats['checkouts'] += 1
+            self._reap_idle()
+            waited = False
+            while not self._idle and self._in_use >= self.max_size:
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No connection available after {self.checkout_timeout}s")
+                self._cond.wait(remaining)
+            # Most recently used first: it is the least likely to have gone stale
+            pooled = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if pooled is not None and not self._is_healthy(pooled):
+                self._close(pooled)
+                with self._cond:
+                    self._stats['reconnects'] += 1
+                pooled = None
+            if pooled is None:
+                pooled = self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return pooled
+
+    def _checkin(self, pooled: PooledConnection):
+        with self._cond:
+            self._in_use -= 1
+            if pooled.broken or getattr(pooled.conn, 'closed', 0):
+                self._close(pooled)
+                self._stats['discarded'] += 1
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with-block."""
+        pooled = self._checkout()
+        try:
+            yield pooled
+        except Exception:
+            # Don't hand a connection in an unknown state to the next caller
+            pooled.broken = True
+            raise
+        finally:
+            self._checkin(pooled)
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._cond:
+            for pooled in self._idle:
+                self._close(pooled)
+            self._idle = []
@@ -0,0 +1,122 @@
+"""
+Time budgets for the matching pipeline.
+
+A Deadline is created when a request starts and passed through the pipeline;
+stages call check() at their boundaries so an over-budget request stops at
+the next stage instead of running into the function timeout. I/O-bound stages
+use run_bounded to fan out with a concurrency limit, a per-item timeout and
+the stage deadline.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class DeadlineExceeded(Exception):
+    """Raised by Deadline.check once the budget is spent."""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"Time budget of {budget:.1f}s exceeded before stage '{stage}'")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """
+    A monotonic time budget.
+
+    Args:
+        seconds: Budget from now; None means no deadline.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.budget = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = None if seconds is None else self.started_at + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (never negative); infinity without a deadline."""
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded if the budget is spent before `stage` starts."""
+        if self.expired:
+            raise DeadlineExceeded(stage, self.budget)
+
+
+def run_bounded(
+    fn: Callable,
+    items: Sequence,
+    max_concurrency: int,
+    item_timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[List, Dict[str, int]]:
+    """
+    Run fn(item) for every item on at most max_concurrency threads.
+
+    Returns (results, stats). results[i] is fn(items[i]), or None if the call
+    raised, ran longer than item_timeout, or had not finished when the
+    deadline expired; callers substitute their default for None. Stragglers
+    are abandoned rather than awaited (their threads finish in the
+    background), so the call returns by the deadline.
+    """
+    results = [None] * len(items)
+    stats = {'completed': 0, 'failed': 0, 'timed_out': 0, 'skipped': 0}
+    if not items:
+        return results, stats
+    deadline = deadline or Deadline(None)
+    started: Dict[int, float] = {}
+
+    def run(idx, item):
+        started[idx] = time.monotonic()
+        return fn(item)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix='bounded')
+    futures = {executor.submit(run, idx, item): idx for idx, item in enumerate(items)}
+    pending = set(futures)
+    try:
+        while pending:
+            # Wake at the deadline or the earliest per-item timeout, whichever is first
+            wake = deadline.remaining()
+            if item_timeout is not None:
+                now = time.monotonic()
+                wake = min([wake, item_timeout] + [
+                    started[futures[future]] + item_timeout - now
+                    for future in pending if futures[future] in started
+                ])
+            done, pending = wait(
+                pending, timeout=None if wake == float('inf') else max(0.0, wake), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                    stats['completed'] += 1
+                except Exception:
+                    stats['failed'] += 1
+
+            now = time.monotonic()
+            if item_timeout is not None:
+                for future in list(pending):
+                    idx = futures[future]
+                    if idx in started and now - started[idx] >= item_timeout:
+                        pending.discard(future)
+                        stats['timed_out'] += 1
+            if deadline.expired:
+                for future in pending:
+                    if future.cancel() or futures[future] not in started:
+                        stats['skipped'] += 1
+                    else:
+                        stats['timed_out'] += 1
+                pending = set()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results, stats
@@ -41,9 +41,70 @@ gcloud functions deploy ${FUNCTION_NAME} \
   --set-env-vars="ML_MODEL_BUCKET=${ML_MODEL_BUCKET:-caregiving-ml}" \
   --set-env-vars="ML_MODEL_PATH=${ML_MODEL_PATH:-models/matching-model-v1.txt}" \
   --set-env-vars="SIMILARITY_THRESHOLD=${SIMILARITY_THRESHOLD:-0.6}" \
+  --set-env-vars="FAST_PATH_BUDGET_SECONDS=${FAST_PATH_BUDGET_SECONDS:-30}" \
+  --set-env-vars="ASYNC_SERVICE_ACCOUNT=${SERVICE_ACCOUNT}" \
   --max-instances=10 \
   --min-instances=0
 
+# Async worker (HTTP, authenticated): finishes matches offloaded by the fast path via Cloud Tasks
+echo -e "${GREEN}Deploying Cloud Function: process_matching_async${NC}"
+
+gcloud functions deploy process_matching_async \
+  --gen2 \
+  --region=${REGION} \
+  --runtime=${RUNTIME} \
+  --source=. \
+  --entry-point=process_matching_async \
+  --trigger-http \
+  --no-allow-unauthenticated \
+  --memory=${MEMORY} \
+  --timeout=${TIMEOUT} \
+  --service-account=${SERVICE_ACCOUNT} \
+  --set-env-vars="CLOUD_SQL_CONNECTION_NAME=${CLOUD_SQL_CONNECTION_NAME:-YOUR_PROJECT:REGION:INSTANCE_NAME},DB_NAME=${DB_NAME:-caregiving_db},DB_USER=${DB_USER:-postgres},ML_MODEL_BUCKET=${ML_MODEL_BUCKET:-caregiving-ml},ML_MODEL_PATH=${ML_MODEL_PATH:-models/matching-model-v1.txt},SIMILARITY_THRESHOLD=${SIMILARITY_THRESHOLD:-0.6},ASYNC_BUDGET_SECONDS=${ASYNC_BUDGET_SECONDS:-480}" \
+  --set-secrets="DB_PASSWORD=DB_PASSWORD:latest" \
+  --set-secrets="GOOGLE_MAPS_API_KEY=GOOGLE_MAPS_API_KEY:latest" \
+  --max-instances=10 \
+  --min-instances=0
+
+# Batch entry point (HTTP, authenticated): drains the queue or re-matches all seniors
+echo -e "${GREEN}Deploying Cloud Function: process_matching_batch${NC}"
+
+gcloud functions deploy process_matching_batch \
+  --gen2 \
+  --region=${REGION} \
+  --runtime=${RUNTIME} \
+  --source=. \
+  --entry-point=process_matching_batch \
+  --trigger-http \
+  --no-allow-unauthenticated \
+  --memory=4Gi \
+  --timeout=${TIMEOUT} \
+  --service-account=${SERVICE_ACCOUNT} \
+  --set-env-vars="CLOUD_SQL_CONNECTION_NAME=${CLOUD_SQL_CONNECTION_NAME:-YOUR_PROJECT:REGION:INSTANCE_NAME},DB_NAME=${DB_NAME:-caregiving_db},DB_USER=${DB_USER:-postgres},ML_MODEL_BUCKET=${ML_MODEL_BUCKET:-caregiving-ml},ML_MODEL_PATH=${ML_MODEL_PATH:-models/matching-model-v1.txt},SIMILARITY_THRESHOLD=${SIMILARITY_THRESHOLD:-0.6},FEATURE_STORE_URI=${FEATURE_STORE_URI:-}" \
+  --set-secrets="DB_PASSWORD=DB_PASSWORD:latest" \
+  --max-instances=2 \
+  --min-instances=0
+
+# Reverse matching: re-rank existing seniors when a caregiver is written
+echo -e "${GREEN}Deploying Cloud Function: process_caregiver_update${NC}"
+
+gcloud functions deploy process_caregiver_update \
+  --gen2 \
+  --region=${REGION} \
+  --runtime=${RUNTIME} \
+  --source=. \
+  --entry-point=process_caregiver_update \
+  --trigger-event-filters="type=google.cloud.firestore.document.v1.written" \
+  --trigger-event-filters="database=(default)" \
+  --trigger-event-filters="document=caregivers/{caregiverId}" \
+  --memory=${MEMORY} \
+  --timeout=${TIMEOUT} \
+  --service-account=${SERVICE_ACCOUNT} \
+  --set-env-vars="CLOUD_SQL_CONNECTION_NAME=${CLOUD_SQL_CONNECTION_NAME:-YOUR_PROJECT:REGION:INSTANCE_NAME},DB_NAME=${DB_NAME:-caregiving_db},DB_USER=${DB_USER:-postgres},ML_MODEL_BUCKET=${ML_MODEL_BUCKET:-caregiving-ml},ML_MODEL_PATH=${ML_MODEL_PATH:-models/matching-model-v1.txt},SIMILARITY_THRESHOLD=${SIMILARITY_THRESHOLD:-0.6},SENIOR_MATRIX_TTL_SECONDS=${SENIOR_MATRIX_TTL_SECONDS:-300}" \
+  --set-secrets="DB_PASSWORD=DB_PASSWORD:latest" \
+  --max-instances=5 \
+  --min-instances=0
+
 echo -e "${GREEN}Deployment complete!${NC}"
 echo -e "${YELLOW}Note: Update environment variables and secrets before deploying.${NC}"
 
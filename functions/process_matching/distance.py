@@ -0,0 +1,155 @@
+"""
+Distance providers for location scoring.
+
+The default provider computes great-circle (haversine) distances from one
+senior to all candidates in a single vectorized NumPy pass. The driving
+provider uses the Google Maps Distance Matrix API and is meant as an
+optional refinement for a small, pre-ranked subset of candidates; its
+requests can run concurrently under a per-request timeout and a deadline.
+"""
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from deadline import Deadline, run_bounded
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Normalize to 0-1 score (0km = 1.0, 50km+ = 0.0)
+MAX_DISTANCE_KM = 50.0
+DEFAULT_LOCATION_SCORE = 0.5
+
+
+def haversine_km(
+    origin_lat: float,
+    origin_lng: float,
+    lats: np.ndarray,
+    lngs: np.ndarray
+) -> np.ndarray:
+    """Great-circle distance in km from one origin to many destinations."""
+    lat1 = np.radians(origin_lat)
+    lng1 = np.radians(origin_lng)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs, dtype=np.float64))
+
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_to_score(distances_km: np.ndarray) -> np.ndarray:
+    """Convert distances to 0-1 location scores; unknown (NaN) distances get the default score."""
+    distances_km = np.asarray(distances_km, dtype=np.float64)
+    scores = np.clip(1.0 - distances_km / MAX_DISTANCE_KM, 0.0, 1.0)
+    return np.where(np.isnan(distances_km), DEFAULT_LOCATION_SCORE, scores)
+
+
+def extract_coordinates(locations: Sequence[Optional[Dict]]) -> np.ndarray:
+    """Convert location dicts ({'lat', 'lng'}) to an (n, 2) array, NaN where missing."""
+    coords = np.full((len(locations), 2), np.nan, dtype=np.float64)
+    for idx, location in enumerate(locations):
+        if not location:
+            continue
+        try:
+            coords[idx, 0] = float(location['lat'])
+            coords[idx, 1] = float(location['lng'])
+        except (KeyError, TypeError, ValueError):
+            coords[idx] = np.nan
+    return coords
+
+
+class DistanceProvider:
+    """Base class: distances in km from one origin to many destinations (NaN if unknown)."""
+
+    name = "base"
+
+    def distances_km(self, origin: Tuple[float, float], destinations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HaversineDistanceProvider(DistanceProvider):
+    """Straight-line distance computed locally; no network calls."""
+
+    name = "haversine"
+
+    def distances_km(self, origin: Tuple[float, float], destinations: np.ndarray) -> np.ndarray:
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        return haversine_km(origin[0], origin[1], destinations[:, 0], destinations[:, 1])
+
+
+class DrivingDistanceProvider(DistanceProvider):
+    """
+    Driving distance from the Google Maps Distance Matrix API.
+
+    Destinations are grouped into requests of up to destinations_per_request
+    (25 is the API maximum), instead of one request per candidate. Requests
+    run on up to max_concurrency threads; one that fails, takes longer than
+    request_timeout or misses the deadline leaves its destinations NaN.
+    """
+
+    name = "driving"
+    MAX_DESTINATIONS_PER_REQUEST = 25
+
+    def __init__(
+        self,
+        gmaps_client,
+        destinations_per_request: int = MAX_DESTINATIONS_PER_REQUEST,
+        max_concurrency: int = 1,
+        request_timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        self.gmaps_client = gmaps_client
+        self.destinations_per_request = max(1, min(destinations_per_request, self.MAX_DESTINATIONS_PER_REQUEST))
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+
+    def _request(self, origin: Tuple[float, float], chunk: np.ndarray) -> Optional[np.ndarray]:
+        """Distances for one request's destinations, or None if the request failed."""
+        try:
+            result = self.gmaps_client.distance_matrix(
+                origins=[f"{origin[0]},{origin[1]}"],
+                destinations=[f"{lat},{lng}" for lat, lng in chunk],
+                mode="driving",
+                units="metric"
+            )
+        except Exception as e:
+            logger.error(f"Error calling Distance Matrix API: {e}")
+            return None
+
+        if result.get('status') != 'OK':
+            logger.warning(f"Distance Matrix API returned status {result.get('status')}")
+            return None
+
+        distances = np.full(len(chunk), np.nan, dtype=np.float64)
+        for offset, element in enumerate(result['rows'][0]['elements']):
+            if element.get('status') == 'OK':
+                distances[offset] = element['distance']['value'] / 1000
+        return distances
+
+    def distances_km(self, origin: Tuple[float, float], destinations: np.ndarray) -> np.ndarray:
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        distances = np.full(len(destinations), np.nan, dtype=np.float64)
+        starts = list(range(0, len(destinations), self.destinations_per_request))
+
+        results, stats = run_bounded(
+            lambda start: self._request(origin, destinations[start:start + self.destinations_per_request]),
+            starts,
+            self.max_concurrency,
+            self.request_timeout,
+            self.deadline,
+        )
+        for start, chunk_distances in zip(starts, results):
+            if chunk_distances is not None:
+                distances[start:start + len(chunk_distances)] = chunk_distances
+
+        if stats['timed_out'] or stats['skipped']:
+            logger.warning(
+                f"Distance Matrix requests: {stats['timed_out']} timed out, "
+                f"{stats['skipped']} skipped at the deadline, of {len(starts)}"
+            )
+        return distances
@@ -0,0 +1,230 @@
+"""
+Two-tier distance cache keyed by geohash cell pairs.
+
+Origins and destinations are quantized to geohash cells, so seniors and
+caregivers in the same neighbourhood share cache entries. Lookups hit an
+in-process LRU first, then a local SQLite file that survives across warm
+invocations (and across instances if the path is on a shared volume).
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from distance import DistanceProvider
+
+logger = logging.getLogger(__name__)
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 7) -> str:
+    """Encode a coordinate as a geohash string (precision 7 is a ~150m cell)."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+class DistanceCache:
+    """
+    In-process LRU in front of a SQLite table, both bounded and TTL-limited.
+
+    Args:
+        path: SQLite file for the on-disk tier, or None to disable it.
+        precision: Geohash precision used to quantize coordinates.
+        ttl_seconds: Entries older than this are treated as misses.
+        max_memory_entries: LRU capacity.
+        max_disk_entries: Row cap for the SQLite tier (oldest rows are evicted).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        precision: int = 7,
+        ttl_seconds: float = 30 * 24 * 3600,
+        max_memory_entries: int = 10000,
+        max_disk_entries: int = 1000000,
+    ):
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_writes = 0
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0}
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._disk = sqlite3.connect(path, check_same_thread=False)
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS distance_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " distance_km REAL NOT NULL,"
+                    " created_at REAL NOT NULL)"
+                )
+                self._disk.execute(
+                    "CREATE INDEX IF NOT EXISTS distance_cache_created_at"
+                    " ON distance_cache (created_at)"
+                )
+                self._disk.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening distance cache at {path}, using memory only: {e}")
+                self._disk = None
+
+    def make_key(self, namespace: str, origin: Tuple[float, float], destination: Tuple[float, float]) -> str:
+        return (
+            f"{namespace}:{geohash_encode(origin[0], origin[1], self.precision)}"
+            f":{geohash_encode(destination[0], destination[1], self.precision)}"
+        )
+
+    def get(self, key: str) -> Optional[float]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                distance_km, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return distance_km
+                del self._memory[key]
+                self._stats['expired'] += 1
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT distance_km, created_at FROM distance_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    distance_km, created_at = row
+                    if now - created_at <= self.ttl_seconds:
+                        self._remember(key, distance_km, created_at)
+                        self._stats['disk_hits'] += 1
+                        return distance_km
+                    self._stats['expired'] += 1
+
+            self._stats['misses'] += 1
+            return None
+
+    def put_many(self, entries: Dict[str, float]):
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            for key, distance_km in entries.items():
+                self._remember(key, distance_km, now)
+            if self._disk is not None:
+                try:
+                    self._disk.executemany(
+                        "INSERT OR REPLACE INTO distance_cache (key, distance_km, created_at)"
+                        " VALUES (?, ?, ?)",
+                        [(key, distance_km, now) for key, distance_km in entries.items()],
+                    )
+                    self._disk_writes += len(entries)
+                    if self._disk_writes >= max(1, self.max_disk_entries // 10):
+                        self._prune_disk(now)
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing distance cache: {e}")
+
+    def _remember(self, key: str, distance_km: float, created_at: float):
+        """Insert into the LRU tier (lock held)."""
+        self._memory[key] = (distance_km, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self, now: float):
+        """Drop expired rows, then the oldest rows beyond max_disk_entries (lock held)."""
+        self._disk_writes = 0
+        self._disk.execute(
+            "DELETE FROM distance_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self._disk.execute(
+            "DELETE FROM distance_cache WHERE key IN ("
+            " SELECT key FROM distance_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for tuning geohash precision against accuracy."""
+        with self._lock:
+            lookups = self._stats['memory_hits'] + self._stats['disk_hits'] + self._stats['misses']
+            hits = self._stats['memory_hits'] + self._stats['disk_hits']
+            return {
+                **self._stats,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'precision': self.precision,
+            }
+
+
+class CachedDistanceProvider(DistanceProvider):
+    """Wraps a provider so only cache misses reach it, in one batched call."""
+
+    def __init__(self, provider: DistanceProvider, cache: DistanceCache):
+        self.provider = provider
+        self.cache = cache
+        self.name = provider.name
+
+    def distances_km(self, origin: Tuple[float, float], destinations: np.ndarray) -> np.ndarray:
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        distances = np.full(len(destinations), np.nan, dtype=np.float64)
+
+        keys = [self.cache.make_key(self.name, origin, tuple(dest)) for dest in destinations]
+        missing = []
+        for idx, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(idx)
+            else:
+                distances[idx] = cached
+
+        if missing:
+            computed = self.provider.distances_km(origin, destinations[missing])
+            distances[missing] = computed
+            # Failed lookups (NaN) are not cached so they are retried next time
+            self.cache.put_many({
+                keys[idx]: float(distance)
+                for idx, distance in zip(missing, computed)
+                if not np.isnan(distance)
+            })
+
+        return distances
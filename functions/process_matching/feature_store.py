@@ -0,0 +1,319 @@
+"""
+Precomputed caregiver feature store.
+
+Caregiver-side matching features (experience, certifications, hourly rate,
+location, availability mask, specialization bitset) are derived from the
+caregiver metadata once, offline, and stored as typed columnar .npy arrays
+indexed by caregiver id. process_matching memory-maps the arrays at cold
+start, so enrichment becomes array gathers instead of JSON parsing.
+
+Each row keeps the updated_at of the caregiver_embeddings row it was derived
+from. A caregiver edited after that (its current updated_at is newer) is
+stale in the snapshot, and process_matching scores it from its metadata until
+the store is rebuilt.
+
+Layout of a store directory:
+    manifest.json          vocabulary, row count, build time
+    ids.npy                caregiver ids (unicode)
+    years_experience.npy   float32 (n,)
+    certification_count.npy int16 (n,)
+    hourly_rate.npy        float32 (n,)
+    location.npy           float64 (n, 2), NaN when unknown
+    availability.npy       uint8 (n, MASK_BYTES), packed weekly mask
+    specializations.npy    uint8 (n, ceil(len(vocabulary) / 8)), packed bitset
+    updated_at.npy         float64 (n,), source row updated_at (epoch seconds), NaN when unknown
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from availability import POPCOUNT_TABLE, compile_availability, stack_masks
+from distance import extract_coordinates
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 2
+COLUMNS = [
+    'years_experience',
+    'certification_count',
+    'hourly_rate',
+    'location',
+    'availability',
+    'specializations',
+    'updated_at',
+]
+
+
+def epoch_seconds(value) -> float:
+    """A datetime (or epoch seconds) as float epoch seconds; NaN when missing."""
+    if value is None:
+        return float('nan')
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def encode_specializations(names: Iterable[str], vocabulary_index: Mapping[str, int], width: int) -> np.ndarray:
+    """Pack a list of specialization names into a bitset over the vocabulary."""
+    bits = np.zeros(width * 8, dtype=np.uint8)
+    for name in names or []:
+        idx = vocabulary_index.get(name)
+        if idx is not None:
+            bits[idx] = 1
+    return np.packbits(bits)
+
+
+def build_columns(
+    metadatas: Sequence[Mapping],
+    vocabulary: Sequence[str],
+    updated_at: Optional[Sequence] = None
+) -> Dict[str, np.ndarray]:
+    """Derive the typed caregiver feature columns from metadata dicts (and row timestamps)."""
+    if updated_at is None:
+        updated_at = [None] * len(metadatas)
+    vocabulary_index = {name: idx for idx, name in enumerate(vocabulary)}
+    width = max(1, -(-len(vocabulary) // 8))
+    return {
+        'years_experience': np.array(
+            [float(m.get('years_of_experience') or 0) for m in metadatas], dtype=np.float32
+        ),
+        'certification_count': np.array(
+            [len(m.get('certifications') or []) for m in metadatas], dtype=np.int16
+        ),
+        'hourly_rate': np.array(
+            [float(m.get('hourly_rate') or 0) for m in metadatas], dtype=np.float32
+        ),
+        'location': extract_coordinates([m.get('location') for m in metadatas]),
+        'availability': stack_masks([compile_availability(m.get('availability')) for m in metadatas]),
+        'specializations': (
+            np.vstack([
+                encode_specializations(m.get('specializations'), vocabulary_index, width)
+                for m in metadatas
+            ])
+            if len(metadatas) else np.zeros((0, width), dtype=np.uint8)
+        ),
+        'updated_at': np.array([epoch_seconds(t) for t in updated_at], dtype=np.float64),
+    }
+
+
+def write_feature_store(
+    directory: str,
+    ids: Sequence[str],
+    metadatas: Sequence[Mapping],
+    updated_at: Optional[Sequence] = None
+):
+    """Build a complete store from (id, metadata[, updated_at]) rows and write it atomically."""
+    vocabulary = sorted({
+        name for m in metadatas for name in (m.get('specializations') or [])
+    })
+    columns = build_columns(metadatas, vocabulary, updated_at)
+    _write_columns(directory, list(ids), vocabulary, columns)
+
+
+def _write_columns(directory: str, ids: List[str], vocabulary: List[str], columns: Dict[str, np.ndarray]):
+    staging = _staging_directory(directory)
+
+    np.save(os.path.join(staging, 'ids.npy'), np.array(ids, dtype=str))
+    for name in COLUMNS:
+        np.save(os.path.join(staging, f'{name}.npy'), columns[name])
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({
+            'format_version': STORE_FORMAT_VERSION,
+            'count': len(ids),
+            'vocabulary': vocabulary,
+            'built_at': datetime.utcnow().isoformat(),
+        }, f)
+
+    _replace_directory(staging, directory)
+    logger.info(f"Wrote caregiver feature store with {len(ids)} caregivers to {directory}")
+
+
+def _staging_directory(directory: str) -> str:
+    """An empty directory next to directory, so it can be renamed into place."""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=".feature_store_", dir=parent)
+
+
+def _replace_directory(staging: str, directory: str):
+    """Swap a complete staging directory in place of directory."""
+    if os.path.exists(directory):
+        backup = directory + ".old"
+        shutil.rmtree(backup, ignore_errors=True)
+        os.rename(directory, backup)
+        os.rename(staging, directory)
+        shutil.rmtree(backup, ignore_errors=True)
+    else:
+        os.rename(staging, directory)
+
+
+class CaregiverFeatureStore:
+    """Read-side view of a store directory; arrays are memory-mapped by default."""
+
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = directory
+        mmap_mode = 'r' if mmap else None
+
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature store format: {self.manifest.get('format_version')}")
+
+        self.vocabulary: List[str] = self.manifest['vocabulary']
+        self.vocabulary_index = {name: idx for idx, name in enumerate(self.vocabulary)}
+        self.ids = np.load(os.path.join(directory, 'ids.npy'), mmap_mode=mmap_mode)
+        self.index = {str(cid): row for row, cid in enumerate(self.ids)}
+        self.columns = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, caregiver_id: str) -> bool:
+        return caregiver_id in self.index
+
+    def is_current(self, caregiver_id: str, updated_at=None) -> bool:
+        """
+        Whether the caregiver's row can be served: it is in the store and was
+        derived from the given updated_at or a later one. Without updated_at
+        any row is served; a row without its own timestamp is then stale.
+        """
+        row = self.index.get(caregiver_id)
+        if row is None:
+            return False
+        if updated_at is None:
+            return True
+        # NaN (unknown) compares False, so such rows are refetched
+        return bool(self.columns['updated_at'][row] >= epoch_seconds(updated_at))
+
+    def rows(self, caregiver_ids: Sequence[str]) -> np.ndarray:
+        """Row numbers for caregiver ids (-1 where the id is not in the store)."""
+        return np.array([self.index.get(cid, -1) for cid in caregiver_ids], dtype=np.int64)
+
+    def gather(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Gather all feature columns for the given rows."""
+        return {name: np.asarray(column[rows]) for name, column in self.columns.items()}
+
+    def specialization_counts(self, rows: np.ndarray, conditions: Sequence[str]) -> np.ndarray:
+        """How many of the given conditions each caregiver row is specialized in."""
+        width = self.columns['specializations'].shape[1]
+        senior_bits = encode_specializations(set(conditions or []), self.vocabulary_index, width)
+        gathered = np.asarray(self.columns['specializations'][rows])
+        return POPCOUNT_TABLE[np.bitwise_and(gathered, senior_bits)].sum(axis=-1)
+
+    def records(self) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """All ids and fully materialized columns (used for incremental rebuilds)."""
+        return [str(cid) for cid in self.ids], {
+            name: np.array(column) for name, column in self.columns.items()
+        }
+
+
+def upsert_caregivers(
+    directory: str,
+    updates: Mapping[str, Mapping],
+    updated_at: Optional[Mapping[str, datetime]] = None
+):
+    """
+    Incrementally apply changed caregiver profiles to an existing store.
+
+    Only the updated caregivers' features are re-derived; everything else is
+    copied from the current snapshot. New specializations extend the vocabulary.
+    updated_at maps caregiver ids to the updated_at of the rows read.
+    """
+    updated_at = updated_at or {}
+    if not os.path.exists(os.path.join(directory, 'manifest.json')):
+        write_feature_store(
+            directory, list(updates.keys()), list(updates.values()),
+            [updated_at.get(cid) for cid in updates],
+        )
+        return
+
+    store = CaregiverFeatureStore(directory, mmap=False)
+    ids, columns = store.records()
+    vocabulary = list(store.vocabulary)
+    known = set(vocabulary)
+    for metadata in updates.values():
+        for name in metadata.get('specializations') or []:
+            if name not in known:
+                vocabulary.append(name)
+                known.add(name)
+
+    # Widen the specialization bitset if the vocabulary grew
+    width = max(1, -(-len(vocabulary) // 8))
+    current = columns['specializations']
+    if current.shape[1] < width:
+        columns['specializations'] = np.hstack([
+            current, np.zeros((len(current), width - current.shape[1]), dtype=np.uint8)
+        ])
+
+    update_ids = list(updates.keys())
+    update_columns = build_columns(
+        [updates[cid] for cid in update_ids], vocabulary, [updated_at.get(cid) for cid in update_ids]
+    )
+    index = {cid: row for row, cid in enumerate(ids)}
+
+    new_rows = []
+    for pos, cid in enumerate(update_ids):
+        row = index.get(cid)
+        if row is None:
+            new_rows.append(pos)
+            continue
+        for name in COLUMNS:
+            columns[name][row] = update_columns[name][pos]
+
+    if new_rows:
+        ids.extend(update_ids[pos] for pos in new_rows)
+        for name in COLUMNS:
+            columns[name] = np.concatenate([columns[name], update_columns[name][new_rows]])
+
+    _write_columns(directory, ids, vocabulary, columns)
+
+
+def download_snapshot(uri: str, directory: str, storage_client):
+    """
+    Download a gs://bucket/prefix snapshot into directory.
+
+    Files go to a staging directory that replaces directory only once every
+    file has arrived, so a failed download never leaves a mix of two
+    snapshots (or a partial one) behind.
+    """
+    bucket_name, _, prefix = uri[len('gs://'):].partition('/')
+    bucket = storage_client.bucket(bucket_name)
+    staging = _staging_directory(directory)
+    try:
+        for blob in bucket.list_blobs(prefix=prefix.rstrip('/') + '/'):
+            filename = os.path.basename(blob.name)
+            if filename:
+                blob.download_to_filename(os.path.join(staging, filename))
+        if not os.path.exists(os.path.join(staging, 'manifest.json')):
+            raise FileNotFoundError(f"No feature store manifest under {uri}")
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _replace_directory(staging, directory)
+
+
+def load_feature_store(uri: Optional[str], local_dir: str, storage_client=None) -> Optional[CaregiverFeatureStore]:
+    """
+    Load a store from a local directory or a gs://bucket/prefix snapshot.
+
+    GCS snapshots are downloaded to local_dir once per instance, then memory-mapped.
+    """
+    if not uri:
+        return None
+    if uri.startswith('gs://'):
+        download_snapshot(uri, local_dir, storage_client)
+        directory = local_dir
+    else:
+        directory = uri
+    store = CaregiverFeatureStore(directory)
+    logger.info(f"Caregiver feature store loaded: {len(store)} caregivers from {uri}")
+    return store
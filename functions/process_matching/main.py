@@ -1,20 +1,61 @@
-
 import os
 import json
 import logging
 import time
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 import functions_framework
 from google.cloud import firestore
 from google.cloud import tasks_v2
 from google.cloud.firestore_v1 import DocumentSnapshot
+from google.cloud.firestore_v1.base_query import FieldFilter
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from pgvector.psycopg2 import register_vector
 import googlemaps
 import lightgbm as lgb
+import numpy as np
 from google.cloud import storage
+from google.api_core.exceptions import FailedPrecondition, NotFound
+
+from availability import (
+    availability_overlap_scores,
+    compile_availability,
+    stack_masks,
+)
+from db_pool import ConnectionPool, PoolTimeout
+from deadline import Deadline, DeadlineExceeded, run_bounded
+from feature_store import CaregiverFeatureStore, load_feature_store
+from model_registry import ModelRegistry
+from distance_cache import CachedDistanceProvider, DistanceCache
+from distance import (
+    DEFAULT_LOCATION_SCORE,
+    DistanceProvider,
+    DrivingDistanceProvider,
+    HaversineDistanceProvider,
+    distance_to_score,
+    extract_coordinates,
+)
+from reverse_matching import (
+    SENIOR_FIELDS,
+    SeniorMatrix,
+    caregiver_pair_features,
+    candidate_rows,
+    list_may_change,
+    match_document_writes,
+    splice_match,
+)
+from scoring import (
+    FEATURE_COLUMNS,
+    build_feature_matrix,
+    price_compatibility_scores,
+    calculate_heuristic_scores,
+    score_feature_matrix,
+)
+from task_queue import CloudTasksQueue, LocalTaskQueue, TaskQueue
+from tree_predictor import UnsupportedModel, compile_booster
+from vector_index import CaregiverIndexSync, VectorIndex, create_index, normalize_rows, parse_vector
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,32 +76,207 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD")
 GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY")
 ML_MODEL_BUCKET = os.environ.get("ML_MODEL_BUCKET", "caregiving-ml")
 ML_MODEL_PATH = os.environ.get("ML_MODEL_PATH", "models/matching-model-v1.txt")
+# How often warm instances check config/matching_model for a new model version
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", "60"))
+# Local copies of loaded model versions; empty disables them
+MODEL_LOCAL_DIR = os.environ.get("MODEL_LOCAL_DIR", "/tmp/matching_model")
+# "booster" (lgb.Booster.predict) or "compiled" (NumPy tree traversal, tree_predictor.py)
+PREDICTOR_MODE = os.environ.get("PREDICTOR_MODE", "booster")
 SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.6"))
+# "haversine" (local, default) or "driving" (haversine + Distance Matrix refinement of the top K)
+DISTANCE_PROVIDER = os.environ.get("DISTANCE_PROVIDER", "haversine")
+DRIVING_DISTANCE_TOP_K = int(os.environ.get("DRIVING_DISTANCE_TOP_K", "10"))
+# Distance Matrix requests: destinations per request (1 = one request per candidate), parallel
+# requests, per-request timeout, and the deadline of the whole driving-distance stage
+DRIVING_DISTANCE_BATCH_SIZE = int(os.environ.get("DRIVING_DISTANCE_BATCH_SIZE", "25"))
+ENRICHMENT_MAX_CONCURRENCY = int(os.environ.get("ENRICHMENT_MAX_CONCURRENCY", "4"))
+ENRICHMENT_ITEM_TIMEOUT_SECONDS = float(os.environ.get("ENRICHMENT_ITEM_TIMEOUT_SECONDS", "2"))
+ENRICHMENT_STAGE_DEADLINE_SECONDS = float(os.environ.get("ENRICHMENT_STAGE_DEADLINE_SECONDS", "5"))
+# Driving distances are cached per geohash cell pair; empty path disables the SQLite tier
+DISTANCE_CACHE_PATH = os.environ.get("DISTANCE_CACHE_PATH", "/tmp/distance_cache.sqlite")
+DISTANCE_CACHE_PRECISION = int(os.environ.get("DISTANCE_CACHE_PRECISION", "7"))
+DISTANCE_CACHE_TTL = float(os.environ.get("DISTANCE_CACHE_TTL", str(30 * 24 * 3600)))
+DISTANCE_CACHE_MAX_ENTRIES = int(os.environ.get("DISTANCE_CACHE_MAX_ENTRIES", "1000000"))
+# Precomputed caregiver features: gs://bucket/prefix or a local directory (empty disables the store)
+FEATURE_STORE_URI = os.environ.get("FEATURE_STORE_URI", "")
+FEATURE_STORE_LOCAL_DIR = os.environ.get("FEATURE_STORE_LOCAL_DIR", "/tmp/caregiver_features")
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "5"))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))
+# "pgvector" (query Cloud SQL per request) or "memory" (resident index, see vector_index.py)
+MATCHING_BACKEND = os.environ.get("MATCHING_BACKEND", "pgvector")
+VECTOR_INDEX_KIND = os.environ.get("VECTOR_INDEX_KIND", "exact")
+# HNSW search breadth: higher improves recall@50 at some latency cost
+VECTOR_INDEX_EF_SEARCH = int(os.environ.get("VECTOR_INDEX_EF_SEARCH", "200"))
+VECTOR_INDEX_REFRESH_SECONDS = float(os.environ.get("VECTOR_INDEX_REFRESH_SECONDS", "60"))
+# pgvector ANN search breadth, set per session (must be >= MAX_CANDIDATES for full HNSW results)
+PGVECTOR_EF_SEARCH = int(os.environ.get("PGVECTOR_EF_SEARCH", "100"))
+PGVECTOR_PROBES = int(os.environ.get("PGVECTOR_PROBES", "10"))
+# Seniors per process_matching_batch call
+BATCH_MAX_SENIORS = int(os.environ.get("BATCH_MAX_SENIORS", "500"))
+# Concurrent queue-document claims when a batch drains matching_queue
+BATCH_CLAIM_CONCURRENCY = 16
+# Reverse matching: how long the cached senior matrix is reused
+SENIOR_MATRIX_TTL_SECONDS = float(os.environ.get("SENIOR_MATRIX_TTL_SECONDS", "300"))
 MAX_MATCHES = 10
-PROCESSING_TIMEOUT = 30  # seconds
+MAX_CANDIDATES = 50
+# matching_queue statuses that request a match: 'queued' from onboarding, 'pending' from reverse matching
+MATCHING_REQUEST_STATUSES = ('queued', 'pending')
+# Fast path time budget; past it a partial ranking is stored and the rest is offloaded
+FAST_PATH_BUDGET_SECONDS = float(os.environ.get("FAST_PATH_BUDGET_SECONDS", "30"))
+ASYNC_BUDGET_SECONDS = float(os.environ.get("ASYNC_BUDGET_SECONDS", "480"))
+ASYNC_QUEUE_BACKEND = os.environ.get("ASYNC_QUEUE_BACKEND", "cloud_tasks")
+ASYNC_QUEUE_NAME = os.environ.get("ASYNC_QUEUE_NAME", "matching-queue")
+# The queue's --max-attempts (setup_cloud_tasks.sh); a failed last attempt marks the request 'error'
+ASYNC_MAX_ATTEMPTS = int(os.environ.get("ASYNC_MAX_ATTEMPTS", "3"))
+ASYNC_WORKER_URL = os.environ.get(
+    "ASYNC_WORKER_URL", f"https://{LOCATION}-{PROJECT_ID}.cloudfunctions.net/process_matching_async"
+)
+# Tasks carry an OIDC token for this account, so the worker can require authentication
+ASYNC_SERVICE_ACCOUNT = os.environ.get("ASYNC_SERVICE_ACCOUNT")
+
+# Server-side prepared statements for the pgvector similarity query.
+# The inner query is a plain nearest-neighbour scan (ORDER BY distance LIMIT k),
+# which the HNSW index from migrations/002 can serve; the similarity threshold is
+# applied to those k rows afterwards, giving the same result as filtering first.
+SIMILAR_CAREGIVERS_STATEMENT = "similar_caregivers"
+SIMILAR_CAREGIVERS_QUERY = f"""
+    SELECT id, metadata, similarity
+    FROM (
+        SELECT
+            id,
+            metadata,
+            1 - (embedding <=> $1) AS similarity
+        FROM caregiver_embeddings
+        ORDER BY embedding <=> $1
+        LIMIT {MAX_CANDIDATES}
+    ) nearest
+    WHERE similarity > $2
+    ORDER BY similarity DESC
+"""
+# Ids only: caregiver features come from the feature store instead of metadata
+# (updated_at tells whether the store row is still current)
+SIMILAR_CAREGIVER_IDS_STATEMENT = "similar_caregiver_ids"
+SIMILAR_CAREGIVER_IDS_QUERY = f"""
+    SELECT id, updated_at, similarity
+    FROM (
+        SELECT
+            id,
+            updated_at,
+            1 - (embedding <=> $1) AS similarity
+        FROM caregiver_embeddings
+        ORDER BY embedding <=> $1
+        LIMIT {MAX_CANDIDATES}
+    ) nearest
+    WHERE similarity > $2
+    ORDER BY similarity DESC
+"""
+# Change feed for the resident vector index (migrations/001_caregiver_embeddings_updated_at.sql)
+CAREGIVER_EMBEDDING_CHANGES_STATEMENT = "caregiver_embedding_changes"
+CAREGIVER_EMBEDDING_CHANGES_QUERY = """
+    SELECT id, embedding, updated_at
+    FROM caregiver_embeddings
+    WHERE (updated_at, id) > ($1, $2)
+    ORDER BY updated_at, id
+    LIMIT $3
+"""
+CAREGIVER_EMBEDDING_DELETIONS_STATEMENT = "caregiver_embedding_deletions"
+CAREGIVER_EMBEDDING_DELETIONS_QUERY = """
+    SELECT id, deleted_at
+    FROM caregiver_embedding_deletions
+    WHERE deleted_at > $1
+"""
+CAREGIVER_METADATA_STATEMENT = "caregiver_metadata"
+CAREGIVER_METADATA_QUERY = """
+    SELECT id, metadata
+    FROM caregiver_embeddings
+    WHERE id = ANY($1)
+"""
+CAREGIVER_EMBEDDING_STATEMENT = "caregiver_embedding"
+CAREGIVER_EMBEDDING_QUERY = """
+    SELECT id, embedding, metadata, updated_at
+    FROM caregiver_embeddings
+    WHERE id = $1
+"""
+
+# Global caregiver feature store (memory-mapped at cold start)
+feature_store: Optional[CaregiverFeatureStore] = None
+feature_store_loaded = False
+
+# Global resident vector index (MATCHING_BACKEND=memory), loaded on first use
+vector_index_sync: Optional[CaregiverIndexSync] = None
+
+# Global async task queue, created on first offload
+task_queue: Optional[TaskQueue] = None
+
+# Global senior matrix for reverse matching, reloaded after SENIOR_MATRIX_TTL_SECONDS
+senior_matrix: Optional[SeniorMatrix] = None
+
+
+def fetch_model_config() -> Optional[Dict]:
+    """The config/matching_model document written by retrain_ranking_model on deploy."""
+    config_doc = db.collection('config').document('matching_model').get()
+    return config_doc.to_dict() if config_doc.exists else None
+
+
+def download_model(model_path: str) -> Optional[str]:
+    """Model text from ML_MODEL_BUCKET (or a gs:// path), None if it does not exist."""
+    bucket_name, blob_name = ML_MODEL_BUCKET, model_path
+    if model_path.startswith('gs://'):
+        bucket_name, _, blob_name = model_path[len('gs://'):].partition('/')
+    try:
+        return storage_client.bucket(bucket_name).blob(blob_name).download_as_text()
+    except NotFound:
+        return None
+
+
+def build_predictor(booster: lgb.Booster):
+    """The object that scores with a loaded Booster, according to PREDICTOR_MODE."""
+    if PREDICTOR_MODE != 'compiled':
+        return booster
+    try:
+        return compile_booster(booster)
+    except UnsupportedModel as e:
+        logger.warning(f"Cannot compile ranking model, using Booster.predict: {e}")
+        return booster
+
 
-# Global model cache
-ml_model: Optional[lgb.Booster] = None
+# Global model registry: polls config/matching_model and hot-swaps new versions
+model_registry = ModelRegistry(
+    fetch_model_config,
+    download_model,
+    default_path=ML_MODEL_PATH,
+    local_dir=MODEL_LOCAL_DIR or None,
+    poll_interval=MODEL_POLL_SECONDS,
+    prepare=build_predictor,
+)
 
 
-def load_ml_model() -> Optional[lgb.Booster]:
-    """Load LightGBM model from Cloud Storage."""
-    global ml_model
-    if ml_model is None:
+def load_ml_model() -> Tuple[Optional[Any], Optional[str]]:
+    """
+    Current ranking model and its version, or (None, None) to use the heuristic.
+
+    The model is a Booster or a CompiledEnsemble; both are scored through
+    scoring.predict_scores.
+    """
+    loaded = model_registry.get()
+    if loaded is None:
+        return None, None
+    return loaded.predictor, loaded.version
+
+
+def get_feature_store() -> Optional[CaregiverFeatureStore]:
+    """Load the caregiver feature store once per instance (None if not configured)."""
+    global feature_store, feature_store_loaded
+    if not feature_store_loaded:
+        feature_store_loaded = True
         try:
-            bucket = storage_client.bucket(ML_MODEL_BUCKET)
-            blob = bucket.blob(ML_MODEL_PATH)
-            
-            if blob.exists():
-                model_content = blob.download_as_text()
-                ml_model = lgb.Booster(model_str=model_content)
-                logger.info("ML model loaded successfully")
-            else:
-                logger.warning(f"ML model not found at {ML_MODEL_BUCKET}/{ML_MODEL_PATH}, using heuristic")
+            feature_store = load_feature_store(
+                FEATURE_STORE_URI, FEATURE_STORE_LOCAL_DIR, storage_client
+            )
         except Exception as e:
-            logger.error(f"Error loading ML model: {e}")
-            ml_model = None
-    return ml_model
+            logger.error(f"Error loading caregiver feature store, using metadata: {e}")
+            feature_store = None
+    return feature_store
 
 
 def get_db_connection():
@@ -72,73 +288,270 @@ def get_db_connection():
             user=DB_USER,
             password=DB_PASSWORD,
         )
+        # Read-only queries; no need to hold a transaction open between calls
+        conn.autocommit = True
         return conn
     except Exception as e:
         logger.error(f"Error connecting to database: {e}")
         raise
 
 
-def query_similar_caregivers(senior_embedding: List[float], threshold: float = 0.6) -> List[Dict]:
+# Module-level distance cache, reused across warm invocations
+distance_cache = DistanceCache(
+    path=DISTANCE_CACHE_PATH or None,
+    precision=DISTANCE_CACHE_PRECISION,
+    ttl_seconds=DISTANCE_CACHE_TTL,
+    max_disk_entries=DISTANCE_CACHE_MAX_ENTRIES,
+)
+
+
+def configure_session(conn):
+    """Per-connection setup: pgvector type adapter and ANN search parameters."""
+    # Embeddings are passed as float32 NumPy arrays and come back as arrays
+    register_vector(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET hnsw.ef_search = %s", (max(PGVECTOR_EF_SEARCH, MAX_CANDIDATES),))
+        cursor.execute("SET ivfflat.probes = %s", (PGVECTOR_PROBES,))
+    finally:
+        cursor.close()
+
+
+# Module-level pool, reused across warm invocations
+db_pool = ConnectionPool(
+    get_db_connection,
+    on_connect=configure_session,
+    max_size=DB_POOL_MAX_SIZE,
+    idle_timeout=DB_POOL_IDLE_TIMEOUT,
+)
+
+
+def execute_prepared(
+    name: str,
+    query: str,
+    arg_types: Tuple[str, ...],
+    params: Tuple
+) -> List[Dict]:
+    """Run a server-side prepared statement on a pooled connection."""
+    placeholders = ", ".join(f"%s::{arg_type}" for arg_type in arg_types)
+    
+    # One retry: a connection dropped by Cloud SQL is replaced by the pool
+    for attempt in range(2):
+        try:
+            with db_pool.connection() as pooled:
+                pooled.prepare(name, query, arg_types=arg_types)
+                cursor = pooled.conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+                results = cursor.fetchall()
+                cursor.close()
+            
+            logger.debug(f"DB pool stats: {db_pool.stats()}")
+            return [dict(row) for row in results]
+        except PoolTimeout:
+            logger.warning(f"DB pool exhausted, stats: {db_pool.stats()}")
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if attempt == 0:
+                logger.warning(f"Database connection failed, reconnecting: {e} (pool stats: {db_pool.stats()})")
+                continue
+            raise
+
+
+def query_similar_caregivers(
+    senior_embedding: List[float],
+    threshold: float = 0.6,
+    include_metadata: bool = True
+) -> List[Dict]:
     """Query Cloud SQL for similar caregivers using pgvector."""
-    conn = None
+    embedding = np.asarray(senior_embedding, dtype=np.float32)
+    
+    if include_metadata:
+        name, query = SIMILAR_CAREGIVERS_STATEMENT, SIMILAR_CAREGIVERS_QUERY
+    else:
+        name, query = SIMILAR_CAREGIVER_IDS_STATEMENT, SIMILAR_CAREGIVER_IDS_QUERY
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Convert embedding to PostgreSQL array format
-        embedding_str = "[" + ",".join(map(str, senior_embedding)) + "]"
-        
-        query = """
-            SELECT 
-                id,
-                metadata,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM caregiver_embeddings
-            WHERE 1 - (embedding <=> %s::vector) > %s
-            ORDER BY similarity DESC
-            LIMIT 50;
-        """
-        
-        cursor.execute(query, (embedding_str, embedding_str, threshold))
-        results = cursor.fetchall()
-        
-        return [dict(row) for row in results]
+        return execute_prepared(name, query, ("vector", "float8"), (embedding, threshold))
     except Exception as e:
         logger.error(f"Error querying similar caregivers: {e}")
         raise
-    finally:
-        if conn:
-            conn.close()
 
 
-def calculate_location_distance(
-    senior_location: Dict[str, float],
-    caregiver_location: Dict[str, float],
-    gmaps_client: googlemaps.Client
-) -> float:
-    """Calculate distance between senior and caregiver using Google Maps Distance Matrix API."""
+def fetch_caregiver_metadata(caregiver_ids: List[str]) -> Dict[str, Dict]:
+    """Fetch metadata for caregivers missing from the feature store (e.g. newly added)."""
+    if not caregiver_ids:
+        return {}
     try:
-        origin = f"{senior_location['lat']},{senior_location['lng']}"
-        destination = f"{caregiver_location['lat']},{caregiver_location['lng']}"
-        
-        result = gmaps_client.distance_matrix(
-            origins=[origin],
-            destinations=[destination],
-            mode="driving",
-            units="metric"
+        rows = execute_prepared(
+            CAREGIVER_METADATA_STATEMENT,
+            CAREGIVER_METADATA_QUERY,
+            ("text[]",),
+            (list(caregiver_ids),),
         )
-        
-        if result['status'] == 'OK' and result['rows'][0]['elements'][0]['status'] == 'OK':
-            distance_km = result['rows'][0]['elements'][0]['distance']['value'] / 1000
-            # Normalize to 0-1 score (0km = 1.0, 50km+ = 0.0)
-            location_score = max(0, 1 - (distance_km / 50))
-            return location_score
-        else:
-            logger.warning("Distance Matrix API returned error, using default score")
-            return 0.5
+        return {row['id']: row['metadata'] or {} for row in rows}
     except Exception as e:
-        logger.error(f"Error calculating location distance: {e}")
-        return 0.5
+        logger.error(f"Error fetching caregiver metadata: {e}")
+        raise
+
+
+def fetch_caregiver_embedding(caregiver_id: str) -> Optional[Dict]:
+    """Embedding and metadata of one caregiver, or None if it has no embedding yet."""
+    rows = execute_prepared(
+        CAREGIVER_EMBEDDING_STATEMENT,
+        CAREGIVER_EMBEDDING_QUERY,
+        ("text",),
+        (caregiver_id,),
+    )
+    return rows[0] if rows else None
+
+
+def fetch_embedding_changes(since: datetime, after_id: str, limit: int) -> List[Dict]:
+    """Page of caregiver embeddings written after (since, after_id)."""
+    return execute_prepared(
+        CAREGIVER_EMBEDDING_CHANGES_STATEMENT,
+        CAREGIVER_EMBEDDING_CHANGES_QUERY,
+        ("timestamptz", "text", "int"),
+        (since, after_id, limit),
+    )
+
+
+def fetch_embedding_deletions(since: datetime) -> List[Dict]:
+    """Caregivers deleted after since."""
+    return execute_prepared(
+        CAREGIVER_EMBEDDING_DELETIONS_STATEMENT,
+        CAREGIVER_EMBEDDING_DELETIONS_QUERY,
+        ("timestamptz",),
+        (since,),
+    )
+
+
+def get_vector_index() -> VectorIndex:
+    """Load the resident index once per instance, then refresh it incrementally."""
+    global vector_index_sync
+    if vector_index_sync is None:
+        vector_index_sync = CaregiverIndexSync(
+            create_index(VECTOR_INDEX_KIND, ef_search=VECTOR_INDEX_EF_SEARCH),
+            fetch_embedding_changes,
+            fetch_embedding_deletions,
+            refresh_interval=VECTOR_INDEX_REFRESH_SECONDS,
+        )
+    try:
+        vector_index_sync.maybe_refresh()
+    except Exception as e:
+        if not vector_index_sync.loaded:
+            raise
+        # A stale index is better than failing the request
+        logger.error(f"Error refreshing vector index, serving last snapshot: {e}")
+    return vector_index_sync.index
+
+
+def get_senior_matrix() -> SeniorMatrix:
+    """All seniors with an embedding, loaded with one projected query and cached per instance."""
+    global senior_matrix
+    if senior_matrix is None or time.monotonic() - senior_matrix.loaded_at > SENIOR_MATRIX_TTL_SECONDS:
+        start = time.perf_counter()
+        snapshots = db.collection('seniors').select(SENIOR_FIELDS).stream()
+        senior_matrix = SeniorMatrix([(snapshot.id, snapshot.to_dict() or {}) for snapshot in snapshots])
+        logger.info(f"Loaded senior matrix: {len(senior_matrix)} seniors in {time.perf_counter() - start:.2f}s")
+    return senior_matrix
+
+
+def search_vector_index(senior_embedding: List[float], threshold: float) -> List[Dict]:
+    """Top candidates from the resident index, in the same shape as the pgvector ids-only query."""
+    index = get_vector_index()
+    start = time.perf_counter()
+    matches = index.search(senior_embedding, MAX_CANDIDATES, threshold)
+    logger.info(f"Vector index search: {len(matches)} candidates in {(time.perf_counter() - start) * 1e3:.2f}ms")
+    return [index_candidate(caregiver_id, similarity) for caregiver_id, similarity in matches]
+
+
+def index_candidate(caregiver_id: str, similarity: float) -> Dict:
+    """A vector index match with the caregiver's updated_at as last seen in the change feed."""
+    return {
+        'id': caregiver_id,
+        'similarity': similarity,
+        'updated_at': vector_index_sync.updated_at.get(caregiver_id) if vector_index_sync else None,
+    }
+
+
+def find_candidates(senior_embedding: List[float], threshold: float) -> List[Dict]:
+    """
+    Find similar caregivers; when the feature store is loaded, only ids are
+    queried and metadata is fetched just for caregivers the store doesn't have.
+    """
+    store = get_feature_store()
+    
+    candidates = None
+    if MATCHING_BACKEND == "memory":
+        try:
+            candidates = search_vector_index(senior_embedding, threshold)
+        except Exception as e:
+            logger.error(f"Vector index unavailable, querying pgvector: {e}")
+    
+    if candidates is None:
+        if store is None:
+            return query_similar_caregivers(senior_embedding, threshold)
+        candidates = query_similar_caregivers(senior_embedding, threshold, include_metadata=False)
+    
+    attach_missing_metadata(candidates, store)
+    return candidates
+
+
+def served_from_store(candidate: Dict, store: Optional[CaregiverFeatureStore]) -> bool:
+    """
+    Whether a candidate's features come from the feature store: it has a row
+    there, derived from the caregiver's current updated_at. Caregivers edited
+    after the snapshot was built are scored from their (fresh) metadata.
+    """
+    return store is not None and store.is_current(candidate['id'], candidate.get('updated_at'))
+
+
+def attach_missing_metadata(candidates: List[Dict], store: Optional[CaregiverFeatureStore]):
+    """Fetch metadata, in one query, for id-only candidates the feature store doesn't cover."""
+    missing = sorted({c['id'] for c in candidates if not served_from_store(c, store)})
+    if not missing:
+        return
+    logger.info(f"{len(missing)} candidates missing or stale in feature store, fetching metadata")
+    metadata = fetch_caregiver_metadata(missing)
+    for candidate in candidates:
+        if candidate['id'] in metadata:
+            candidate['metadata'] = metadata[candidate['id']]
+
+
+def calculate_location_scores(
+    senior_location: Dict[str, float],
+    caregiver_locations: List[Dict],
+    provider: DistanceProvider
+) -> np.ndarray:
+    """
+    Calculate location scores from one senior to all caregivers in one provider call.
+    
+    Caregivers without coordinates (or when the senior has none) get the default score.
+    """
+    return calculate_location_scores_from_coordinates(
+        senior_location, extract_coordinates(caregiver_locations), provider
+    )
+
+
+def calculate_location_scores_from_coordinates(
+    senior_location: Dict[str, float],
+    destinations: np.ndarray,
+    provider: DistanceProvider
+) -> np.ndarray:
+    """Calculate location scores for an (n, 2) array of caregiver coordinates (NaN if unknown)."""
+    scores = np.full(len(destinations), DEFAULT_LOCATION_SCORE, dtype=np.float64)
+    if not senior_location or not len(destinations):
+        return scores
+    
+    origin = extract_coordinates([senior_location])[0]
+    if np.isnan(origin).any():
+        return scores
+    
+    valid = ~np.isnan(destinations).any(axis=1)
+    if valid.any():
+        distances = provider.distances_km(tuple(origin), destinations[valid])
+        scores[valid] = distance_to_score(distances)
+    return scores
 
 
 def calculate_availability_overlap(
@@ -147,37 +560,28 @@ def calculate_availability_overlap(
 ) -> float:
     """Calculate availability overlap score between senior and caregiver schedules."""
     try:
-        total_slots = 0
-        matching_slots = 0
-        
-        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        time_slots = ['morning', 'afternoon', 'evening']
-        
-        for day in days:
-            for slot in time_slots:
-                senior_slot = senior_availability.get(day, {}).get(slot, {})
-                caregiver_slot = caregiver_availability.get(day, {}).get(slot, {})
-                
-                if senior_slot.get('available') and caregiver_slot.get('available'):
-                    # Check time overlap
-                    senior_start = senior_slot.get('start', '00:00')
-                    senior_end = senior_slot.get('end', '23:59')
-                    caregiver_start = caregiver_slot.get('start', '00:00')
-                    caregiver_end = caregiver_slot.get('end', '23:59')
-                    
-                    # Simple overlap check (can be improved)
-                    if senior_start <= caregiver_end and caregiver_start <= senior_end:
-                        matching_slots += 1
-                    total_slots += 1
-                elif senior_slot.get('available'):
-                    total_slots += 1
-        
-        return matching_slots / total_slots if total_slots > 0 else 0.0
+        scores = calculate_availability_scores(senior_availability, [caregiver_availability])
+        return float(scores[0])
     except Exception as e:
         logger.error(f"Error calculating availability overlap: {e}")
         return 0.0
 
 
+def calculate_availability_scores(
+    senior_availability: Dict,
+    caregiver_availabilities: List[Dict]
+) -> np.ndarray:
+    """
+    Calculate availability overlap for one senior against all caregivers.
+    
+    Schedules are compiled to weekly bitmasks, so the score is the fraction of
+    the senior's requested minutes that each caregiver actually covers.
+    """
+    senior_mask = compile_availability(senior_availability)
+    caregiver_masks = stack_masks([compile_availability(a) for a in caregiver_availabilities])
+    return availability_overlap_scores(senior_mask, caregiver_masks)
+
+
 def calculate_specialization_match(
     senior_conditions: List[str],
     caregiver_specializations: List[str]
@@ -218,79 +622,33 @@ def calculate_price_compatibility(
         return 0.5
 
 
-def calculate_heuristic_score(
-    similarity: float,
-    location_score: float,
-    availability_score: float,
-    specialization_score: float,
-    price_score: float,
-    years_experience: int
-) -> float:
-    """Calculate heuristic matching score."""
-    # Normalize experience (0-20 years -> 0-1)
-    experience_score = min(1.0, years_experience / 20.0)
-    
-    # Critical skills match (weighted specialization)
-    critical_skills_match = specialization_score
-    
-    score = (
-        0.35 * similarity +
-        0.30 * critical_skills_match +
-        0.20 * location_score +
-        0.10 * availability_score +
-        0.05 * experience_score
-    )
-    
-    return score
+def calculate_price_scores(senior_budget: float, caregiver_rates: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_price_compatibility for one senior against many rates."""
+    return price_compatibility_scores(senior_budget or 0, caregiver_rates)
 
 
-def calculate_ml_score(features: Dict) -> float:
-    """Calculate ML-based matching score using LightGBM."""
-    model = load_ml_model()
-    if model is None:
-        return None
-    
-    try:
-        # Prepare feature vector (order must match training)
-        feature_vector = [
-            features['similarity'],
-            features['location_score'],
-            features['availability_score'],
-            features['specialization_score'],
-            features['price_score'],
-            features['years_experience'],
-            features['certification_count'],
-        ]
-        
-        score = model.predict([feature_vector])[0]
-        return float(score)
-    except Exception as e:
-        logger.error(f"Error calculating ML score: {e}")
-        return None
+def calculate_ml_scores(feature_matrix: np.ndarray) -> Tuple[np.ndarray, str, Optional[str]]:
+    """
+    Score all candidates at once with the LightGBM model (one predict call).
+
+    Falls back to the vectorized heuristic on the same matrix when the model
+    is unavailable or prediction fails. Returns (scores, score_type, model
+    version), the version being None for heuristic scores.
+    """
+    model, model_version = load_ml_model()
+    scores, score_type = score_feature_matrix(model, feature_matrix)
+    return scores, score_type, model_version if score_type == 'ml' else None
 
 
 def enrich_candidate(
     candidate: Dict,
     senior_data: Dict,
-    gmaps_client: googlemaps.Client
+    location_score: float,
+    availability_score: float
 ) -> Dict:
     """Enrich candidate with additional features."""
     caregiver_metadata = candidate.get('metadata', {})
     
-    # Location distance
-    senior_location = senior_data.get('location', {})
-    caregiver_location = caregiver_metadata.get('location', {})
-    location_score = calculate_location_distance(
-        senior_location, caregiver_location, gmaps_client
-    ) if senior_location and caregiver_location else 0.5
-    
-    # Availability overlap
-    senior_availability = senior_data.get('availability', {})
-    caregiver_availability = caregiver_metadata.get('availability', {})
-    availability_score = calculate_availability_overlap(
-        senior_availability, caregiver_availability
-    )
-    
     # Specialization match
     senior_conditions = senior_data.get('conditions', [])
     caregiver_specializations = caregiver_metadata.get('specializations', [])
@@ -300,80 +658,313 @@ def enrich_candidate(
     
     # Price compatibility
     senior_budget = senior_data.get('budget', 0)
-    caregiver_rate = caregiver_metadata.get('hourly_rate', 0)
+    caregiver_rate = float(caregiver_metadata.get('hourly_rate') or 0)
     price_score = calculate_price_compatibility(senior_budget, caregiver_rate)
     
-    # Additional features
-    years_experience = caregiver_metadata.get('years_of_experience', 0)
-    certification_count = len(caregiver_metadata.get('certifications', []))
+    # Additional features, typed like the feature store columns
+    years_experience = float(caregiver_metadata.get('years_of_experience') or 0)
+    certification_count = len(caregiver_metadata.get('certifications') or [])
     
-    # Calculate scores
     features = {
         'similarity': candidate['similarity'],
-        'location_score': location_score,
-        'availability_score': availability_score,
-        'specialization_score': specialization_score,
-        'price_score': price_score,
+        'location_score': float(location_score),
+        'availability_score': float(availability_score),
+        'specialization_score': float(specialization_score),
+        'price_score': float(price_score),
         'years_experience': years_experience,
         'certification_count': certification_count,
     }
     
-    # Try ML model first, fallback to heuristic
-    ml_score = calculate_ml_score(features)
-    if ml_score is not None:
-        final_score = ml_score
-        score_type = 'ml'
-    else:
-        final_score = calculate_heuristic_score(
-            features['similarity'],
-            features['location_score'],
-            features['availability_score'],
-            features['specialization_score'],
-            features['price_score'],
-            years_experience
-        )
-        score_type = 'heuristic'
-    
     return {
         'caregiver_id': candidate['id'],
         'similarity': candidate['similarity'],
-        'final_score': final_score,
-        'score_type': score_type,
         'features': features,
         'metadata': caregiver_metadata,
+        'location': caregiver_metadata.get('location'),
     }
 
 
-def store_matches(senior_id: str, matches: List[Dict]):
-    """Store top matches in Firestore."""
+def enrich_candidates_from_store(
+    candidates: List[Dict],
+    senior_data: Dict,
+    store: CaregiverFeatureStore
+) -> List[Dict]:
+    """Enrich candidates with array gathers from the feature store (no metadata parsing)."""
+    if not candidates:
+        return []
+    
+    rows = store.rows([c['id'] for c in candidates])
+    columns = store.gather(rows)
+    
+    location_scores = calculate_location_scores_from_coordinates(
+        senior_data.get('location', {}), columns['location'], HaversineDistanceProvider()
+    )
+    availability_scores = availability_overlap_scores(
+        compile_availability(senior_data.get('availability', {})), columns['availability']
+    )
+    senior_conditions = senior_data.get('conditions', [])
+    if senior_conditions:
+        specialization_scores = store.specialization_counts(rows, senior_conditions) / len(senior_conditions)
+    else:
+        specialization_scores = np.zeros(len(candidates), dtype=np.float64)
+    price_scores = calculate_price_scores(senior_data.get('budget', 0), columns['hourly_rate'])
+    
+    enriched_candidates = []
+    for idx, candidate in enumerate(candidates):
+        lat, lng = columns['location'][idx]
+        enriched_candidates.append({
+            'caregiver_id': candidate['id'],
+            'similarity': candidate['similarity'],
+            'features': {
+                'similarity': candidate['similarity'],
+                'location_score': float(location_scores[idx]),
+                'availability_score': float(availability_scores[idx]),
+                'specialization_score': float(specialization_scores[idx]),
+                'price_score': float(price_scores[idx]),
+                'years_experience': float(columns['years_experience'][idx]),
+                'certification_count': int(columns['certification_count'][idx]),
+            },
+            'metadata': {},
+            'location': None if np.isnan(lat) else {'lat': float(lat), 'lng': float(lng)},
+        })
+    return enriched_candidates
+
+
+def refine_with_driving_distance(
+    enriched_candidates: List[Dict],
+    senior_location: Dict[str, float],
+    provider: DistanceProvider,
+    top_k: int
+):
+    """
+    Replace straight-line location scores with driving-distance scores for the top K.
+    
+    Candidates are pre-ranked with the heuristic on haversine features, so only
+    the K most promising ones are sent to the (slow, paid) driving provider.
+    Candidates whose driving distance is unavailable keep their haversine score.
+    """
+    if not enriched_candidates or top_k <= 0:
+        return
+    
+    feature_matrix = build_feature_matrix([c['features'] for c in enriched_candidates])
+    prerank = calculate_heuristic_scores(feature_matrix)
+    top = [enriched_candidates[i] for i in np.argsort(-prerank, kind='stable')[:top_k]]
+    
+    origin = extract_coordinates([senior_location])[0]
+    if np.isnan(origin).any():
+        return
+    
+    destinations = extract_coordinates([c.get('location') for c in top])
+    valid = np.flatnonzero(~np.isnan(destinations).any(axis=1))
+    if not len(valid):
+        return
+    
+    distances = provider.distances_km(tuple(origin), destinations[valid])
+    driving_scores = distance_to_score(distances)
+    for idx, distance, score in zip(valid, distances, driving_scores):
+        if not np.isnan(distance):
+            top[idx]['features']['location_score'] = float(score)
+
+
+def enrich_candidates_from_metadata(candidates: List[Dict], senior_data: Dict) -> List[Dict]:
+    """Enrich candidates by parsing the metadata returned with the pgvector query."""
+    if not candidates:
+        return []
+    
+    location_scores = calculate_location_scores(
+        senior_data.get('location', {}),
+        [c.get('metadata', {}).get('location', {}) for c in candidates],
+        HaversineDistanceProvider(),
+    )
+    
     try:
-        matches_ref = db.collection('seniors').document(senior_id).collection('matches')
-        
-        # Delete old matches
-        old_matches = matches_ref.stream()
-        for match in old_matches:
-            match.reference.delete()
-        
-        # Store new matches
-        for idx, match in enumerate(matches[:MAX_MATCHES]):
-            match_doc = {
-                'caregiver_id': match['caregiver_id'],
-                'rank': idx + 1,
-                'score': match['final_score'],
-                'score_type': match['score_type'],
-                'similarity': match['similarity'],
-                'features': match['features'],
-                'created_at': firestore.SERVER_TIMESTAMP,
-            }
-            matches_ref.add(match_doc)
+        availability_scores = calculate_availability_scores(
+            senior_data.get('availability', {}),
+            [c.get('metadata', {}).get('availability', {}) for c in candidates],
+        )
+    except Exception as e:
+        logger.error(f"Error calculating availability overlap: {e}")
+        availability_scores = np.zeros(len(candidates), dtype=np.float64)
+    
+    enriched_candidates = []
+    for candidate, location_score, availability_score in zip(
+        candidates, location_scores, availability_scores
+    ):
+        try:
+            enriched_candidates.append(
+                enrich_candidate(candidate, senior_data, location_score, availability_score)
+            )
+        except Exception as e:
+            logger.error(f"Error enriching candidate {candidate.get('id')}: {e}")
+            continue
+    return enriched_candidates
+
+
+def enrich_candidates(
+    candidates: List[Dict],
+    senior_data: Dict,
+    gmaps_client: Optional[googlemaps.Client],
+    deadline: Optional[Deadline] = None
+) -> List[Dict]:
+    """
+    Enrich all candidates, computing location scores for the whole batch at once.
+    
+    With a deadline, the budget is checked again before the driving-distance
+    stage. That stage's requests run concurrently (ENRICHMENT_MAX_CONCURRENCY)
+    with a per-request timeout, and the stage ends after
+    ENRICHMENT_STAGE_DEADLINE_SECONDS or when the request deadline expires,
+    whichever is first. Candidates whose driving distance is missing then keep
+    their haversine location score.
+    """
+    senior_location = senior_data.get('location', {})
+    store = get_feature_store()
+    
+    # Local stage: haversine location plus all other features
+    stage_start = time.perf_counter()
+    from_store = [c for c in candidates if served_from_store(c, store)]
+    from_metadata = [c for c in candidates if not served_from_store(c, store)]
+    enriched_candidates = (
+        enrich_candidates_from_store(from_store, senior_data, store) +
+        enrich_candidates_from_metadata(from_metadata, senior_data)
+    )
+    local_ms = (time.perf_counter() - stage_start) * 1000
+    
+    driving_ms = 0.0
+    if DISTANCE_PROVIDER == "driving" and gmaps_client is not None:
+        if deadline is not None:
+            deadline.check('driving_distance')
+        stage_start = time.perf_counter()
+        stage_deadline = Deadline(min(
+            ENRICHMENT_STAGE_DEADLINE_SECONDS,
+            deadline.remaining() if deadline is not None else float('inf'),
+        ))
+        driving_provider = DrivingDistanceProvider(
+            gmaps_client,
+            destinations_per_request=DRIVING_DISTANCE_BATCH_SIZE,
+            max_concurrency=ENRICHMENT_MAX_CONCURRENCY,
+            request_timeout=ENRICHMENT_ITEM_TIMEOUT_SECONDS,
+            deadline=stage_deadline,
+        )
+        refine_with_driving_distance(
+            enriched_candidates,
+            senior_location,
+            CachedDistanceProvider(driving_provider, distance_cache),
+            DRIVING_DISTANCE_TOP_K,
+        )
+        driving_ms = (time.perf_counter() - stage_start) * 1000
+        logger.info(f"Distance cache stats: {distance_cache.stats()}")
+    
+    logger.info(
+        f"Enrichment latency: local={local_ms:.1f}ms "
+        f"({len(candidates)} candidates, {len(from_store)} from feature store), "
+        f"driving={driving_ms:.1f}ms "
+        f"(top {DRIVING_DISTANCE_TOP_K if driving_ms else 0})"
+    )
+    return enriched_candidates
+
+
+def score_candidates(enriched_candidates: List[Dict]) -> List[Dict]:
+    """Score all enriched candidates in one batch and attach final_score/score_type/model_version."""
+    if not enriched_candidates:
+        return enriched_candidates
+    
+    feature_matrix = build_feature_matrix([c['features'] for c in enriched_candidates])
+    scores, score_type, model_version = calculate_ml_scores(feature_matrix)
+    
+    for candidate, score in zip(enriched_candidates, scores):
+        candidate['final_score'] = float(score)
+        candidate['score_type'] = score_type
+        candidate['model_version'] = model_version
+    
+    return enriched_candidates
+
+
+def _match_document(senior_id: str, rank: int, match: Dict) -> Dict:
+    """Firestore fields of one stored match."""
+    return {
+        'caregiver_id': match['caregiver_id'],
+        'senior_id': senior_id,
+        'rank': rank,
+        'score': match['final_score'],
+        'score_type': match['score_type'],
+        # Which model version scored this match (None for heuristic/similarity scores)
+        'model_version': match.get('model_version'),
+        'similarity': match['similarity'],
+        'features': match['features'],
+        'created_at': firestore.SERVER_TIMESTAMP,
+    }
+
+
+def _match_summary(top_matches: List[Dict], match_status: str = 'ready') -> Dict:
+    """Senior document fields describing the stored match list."""
+    return {
+        'match_status': match_status,
+        'match_count': len(top_matches),
+        # Lets incremental updates decide whether a caregiver can enter the list
+        'match_caregiver_ids': [match['caregiver_id'] for match in top_matches],
+        'match_min_score': top_matches[-1]['final_score'] if top_matches else None,
+        'matches_updated_at': firestore.SERVER_TIMESTAMP,
+    }
+
+
+def previous_match_ids(senior_id: str, senior_data: Optional[Dict]) -> List[str]:
+    """
+    Caregiver ids of a senior's stored match documents.
+    
+    Read from match_caregiver_ids on the senior document; seniors stored
+    before that field existed get their match documents listed once.
+    """
+    if senior_data is not None and 'match_caregiver_ids' in senior_data:
+        return list(senior_data['match_caregiver_ids'] or [])
+    matches_ref = db.collection('seniors').document(senior_id).collection('matches')
+    return [ref.id for ref in matches_ref.list_documents()]
+
+
+def _write_matches(writer, senior_id: str, matches: List[Dict], previous_ids=(), match_status: str = 'ready'):
+    """
+    Queue the full replacement of a senior's matches on a WriteBatch or BulkWriter.
+    
+    Match documents are keyed by caregiver id (seniors/{id}/matches/{caregiverId},
+    as the dashboard addresses them). Listed caregivers are written with merge,
+    so fields clients add to a match (status, rating, ...) survive a re-match;
+    previously listed caregivers that dropped out are deleted, and the senior
+    document is updated in the same writer.
+    """
+    senior_ref = db.collection('seniors').document(senior_id)
+    matches_ref = senior_ref.collection('matches')
+    top_matches = matches[:MAX_MATCHES]
+    
+    for rank, match in enumerate(top_matches, start=1):
+        writer.set(
+            matches_ref.document(match['caregiver_id']), _match_document(senior_id, rank, match), merge=True
+        )
+    
+    listed = {match['caregiver_id'] for match in top_matches}
+    for caregiver_id in previous_ids:
+        if caregiver_id not in listed:
+            writer.delete(matches_ref.document(caregiver_id))
+    
+    writer.update(senior_ref, _match_summary(top_matches, match_status))
+
+
+def store_matches(
+    senior_id: str,
+    matches: List[Dict],
+    senior_data: Optional[Dict] = None,
+    match_status: str = 'ready'
+):
+    """
+    Store top matches in Firestore with a single atomic batch commit.
+    
+    The documents to delete come from match_caregiver_ids on the senior
+    document, so no read of the old matches is needed (see previous_match_ids).
+    """
+    try:
+        previous_ids = previous_match_ids(senior_id, senior_data)
         
-        # Update senior document
-        senior_ref = db.collection('seniors').document(senior_id)
-        senior_ref.update({
-            'match_status': 'ready',
-            'match_count': len(matches[:MAX_MATCHES]),
-            'matches_updated_at': firestore.SERVER_TIMESTAMP,
-        })
+        batch = db.batch()
+        _write_matches(batch, senior_id, matches, previous_ids, match_status)
+        batch.commit()
         
         logger.info(f"Stored {len(matches[:MAX_MATCHES])} matches for senior {senior_id}")
     except Exception as e:
@@ -409,35 +1000,190 @@ def send_push_notification(senior_id: str, match_count: int):
         # Don't raise - notification failure shouldn't fail the function
 
 
+def get_task_queue() -> TaskQueue:
+    """Queue that feeds process_matching_async (Cloud Tasks, or in-process when ASYNC_QUEUE_BACKEND=local)."""
+    global task_queue
+    if task_queue is None:
+        if ASYNC_QUEUE_BACKEND == "local":
+            task_queue = LocalTaskQueue(run_async_matching, background=True)
+        else:
+            task_queue = CloudTasksQueue(
+                tasks_client, PROJECT_ID, LOCATION, ASYNC_QUEUE_NAME, ASYNC_WORKER_URL, ASYNC_SERVICE_ACCOUNT
+            )
+    return task_queue
+
+
 def create_async_task(queue_id: str, senior_id: str):
-    """Create Cloud Task for async processing if needed."""
+    """Hand the full enrichment of a senior to the async worker."""
     try:
-        queue_path = tasks_client.queue_path(PROJECT_ID, LOCATION, "matching-queue")
-        
-        task = {
-            'http_request': {
-                'http_method': tasks_v2.HttpMethod.POST,
-                'url': f'https://{LOCATION}-{PROJECT_ID}.cloudfunctions.net/process_matching_async',
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
-                    'queue_id': queue_id,
-                    'senior_id': senior_id,
-                }).encode(),
-            }
-        }
-        
-        response = tasks_client.create_task(request={'parent': queue_path, 'task': task})
-        logger.info(f"Created async task: {response.name}")
-        return response
+        name = get_task_queue().enqueue({
+            'queue_id': queue_id,
+            'senior_id': senior_id,
+        })
+        logger.info(f"Created async task: {name}")
+        return name
     except Exception as e:
         logger.error(f"Error creating async task: {e}")
         raise
 
 
+def embedding_only_ranking(candidates: List[Dict]) -> List[Dict]:
+    """Provisional ranking by similarity alone: no enrichment and no model call."""
+    ranked = sorted(candidates, key=lambda c: c['similarity'], reverse=True)
+    return [
+        {
+            'caregiver_id': candidate['id'],
+            'similarity': float(candidate['similarity']),
+            'final_score': float(candidate['similarity']),
+            'score_type': 'similarity',
+            'features': {'similarity': float(candidate['similarity'])},
+        }
+        for candidate in ranked
+    ]
+
+
+def fail_queue_document(queue_id: Optional[str], message: str):
+    """Mark a claimed matching_queue document 'error', so it is neither left in 'processing' nor retried."""
+    if queue_id:
+        db.collection('matching_queue').document(queue_id).update({
+            'status': 'error',
+            'error_message': message,
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        })
+
+
+def fail_queue_documents(queue_ids: List[str], message: str):
+    """fail_queue_document for many requests; the ones already retired (deleted) are left alone."""
+    def fail(queue_id):
+        try:
+            fail_queue_document(queue_id, message)
+        except NotFound:
+            pass
+        return True
+    
+    _, stats = run_bounded(fail, queue_ids, BATCH_CLAIM_CONCURRENCY)
+    if stats['failed'] or stats['timed_out']:
+        logger.error(f"Could not mark {stats['failed'] + stats['timed_out']} matching queue documents as failed")
+
+
+def prepare_matching(senior_id: str, queue_id: Optional[str] = None) -> Optional[Tuple[Dict, List[Dict]]]:
+    """
+    Load a senior and find similar caregivers.
+    
+    Returns (senior data, candidates), or None when there is nothing to rank.
+    The queue document is then settled here: marked 'error' when the senior
+    or its embedding is missing, deleted when there are no candidates (the
+    senior is marked 'no_matches').
+    """
+    senior_ref = db.collection('seniors').document(senior_id)
+    senior_doc = senior_ref.get()
+    
+    if not senior_doc.exists:
+        logger.error(f"Senior {senior_id} not found")
+        fail_queue_document(queue_id, 'Senior not found')
+        return None
+    
+    senior_data = senior_doc.to_dict()
+    senior_embedding = senior_data.get('embedding')
+    
+    if not senior_embedding:
+        logger.error(f"No embedding found for senior {senior_id}")
+        fail_queue_document(queue_id, 'No embedding found for senior')
+        return None
+    
+    candidates = find_candidates(senior_embedding, SIMILARITY_THRESHOLD)
+    
+    if not candidates:
+        logger.info(f"No candidates found for senior {senior_id}")
+        senior_ref.update({
+            'match_status': 'no_matches',
+            'match_count': 0,
+        })
+        if queue_id:
+            db.collection('matching_queue').document(queue_id).delete()
+        return None
+    
+    return senior_data, candidates
+
+
+def rank_candidates(candidates: List[Dict], senior_data: Dict, deadline: Deadline) -> List[Dict]:
+    """
+    Full ranking after similarity search: enrichment, driving-distance
+    refinement and model scoring, best first. Raises DeadlineExceeded at the
+    first stage boundary reached after the budget is spent.
+    """
+    deadline.check('enrich')
+    
+    # Initialize Google Maps client (only needed for driving-distance refinement)
+    gmaps_client = (
+        # Retries must not outlive the driving-distance stage
+        googlemaps.Client(
+            key=GOOGLE_MAPS_API_KEY,
+            timeout=ENRICHMENT_ITEM_TIMEOUT_SECONDS,
+            retry_timeout=ENRICHMENT_STAGE_DEADLINE_SECONDS,
+        )
+        if GOOGLE_MAPS_API_KEY and DISTANCE_PROVIDER == "driving" else None
+    )
+    
+    enriched_candidates = enrich_candidates(candidates, senior_data, gmaps_client, deadline)
+    
+    deadline.check('score')
+    score_candidates(enriched_candidates)
+    enriched_candidates.sort(key=lambda x: x['final_score'], reverse=True)
+    return enriched_candidates
+
+
+def complete_matching(queue_id: Optional[str], senior_id: str, senior_data: Dict, enriched_candidates: List[Dict]):
+    """Store the final matches, notify, and retire the queue document."""
+    store_matches(senior_id, enriched_candidates, senior_data)
+    send_push_notification(senior_id, len(enriched_candidates[:MAX_MATCHES]))
+    if queue_id:
+        db.collection('matching_queue').document(queue_id).delete()
+
+
+def claim_queue_document(snapshot: DocumentSnapshot, claimant: str) -> bool:
+    """
+    Flip a matching_queue document from a request status to 'processing'.
+    
+    The update is conditional on the document not having changed since
+    `snapshot` was read, so when the trigger and a batch drain pick up the
+    same request, exactly one of them wins and the other skips it.
+    """
+    if not snapshot.exists:
+        return False
+    status = (snapshot.to_dict() or {}).get('status')
+    if status and status not in MATCHING_REQUEST_STATUSES:
+        return False
+    try:
+        snapshot.reference.update({
+            'status': 'processing',
+            'claimed_by': claimant,
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        }, option=db.write_option(last_update_time=snapshot.update_time))
+    except (FailedPrecondition, NotFound):
+        return False
+    return True
+
+
+def _string_field(fields: Dict, name: str) -> Optional[str]:
+    """A string value from an event's Firestore document fields."""
+    value = fields.get(name)
+    if isinstance(value, dict):
+        return value.get('stringValue') or value.get('value')
+    return value
+
+
 @functions_framework.cloud_event
 def process_matching(cloud_event):
-    """Main function triggered by Firestore onCreate."""
-    start_time = time.time()
+    """
+    Fast path, triggered by a matching_queue write.
+    
+    Runs the full pipeline under a FAST_PATH_BUDGET_SECONDS time budget. If
+    the budget runs out after similarity search, an embedding-only ranking is
+    stored (match_status 'partial') and the same pipeline is finished by
+    process_matching_async through the task queue.
+    """
+    deadline = Deadline(FAST_PATH_BUDGET_SECONDS)
     queue_id = None
     
     try:
@@ -459,93 +1205,468 @@ def process_matching(cloud_event):
             logger.error("Could not extract queue_id from event")
             return
         
-        logger.info(f"Processing matching queue: {queue_id}")
+        # The trigger fires on every write; status updates on the queue document are not new requests
+        status = _string_field(queue_doc, 'status')
+        if status and status not in MATCHING_REQUEST_STATUSES:
+            logger.info(f"Ignoring matching queue {queue_id} with status {status}")
+            return
         
-        # Extract senior ID
-        senior_id = None
-        if 'seniorId' in queue_doc:
-            senior_id_field = queue_doc.get('seniorId', {})
-            if isinstance(senior_id_field, dict):
-                senior_id = senior_id_field.get('stringValue') or senior_id_field.get('value')
-            else:
-                senior_id = senior_id_field
+        logger.info(f"Processing matching queue: {queue_id}")
         
+        senior_id = _string_field(queue_doc, 'seniorId')
         if not senior_id:
             logger.error("No seniorId found in queue document")
             return
         
-        # Check if we should use async processing
-        elapsed = time.time() - start_time
-        if elapsed > PROCESSING_TIMEOUT:
-            logger.info("Processing taking too long, creating async task")
-            create_async_task(queue_id, senior_id)
+        if not claim_queue_document(db.collection('matching_queue').document(queue_id).get(), 'trigger'):
+            logger.info(f"Matching queue {queue_id} was already claimed")
             return
         
-        # Load senior data
-        senior_ref = db.collection('seniors').document(senior_id)
-        senior_doc = senior_ref.get()
-        
-        if not senior_doc.exists:
-            logger.error(f"Senior {senior_id} not found")
+        prepared = prepare_matching(senior_id, queue_id)
+        if prepared is None:
             return
+        senior_data, candidates = prepared
         
-        senior_data = senior_doc.to_dict()
-        senior_embedding = senior_data.get('embedding')
-        
-        if not senior_embedding:
-            logger.error(f"No embedding found for senior {senior_id}")
-            return
-        
-        # Query similar caregivers
-        candidates = query_similar_caregivers(senior_embedding, SIMILARITY_THRESHOLD)
-        
-        if not candidates:
-            logger.info(f"No candidates found for senior {senior_id}")
-            senior_ref.update({
-                'match_status': 'no_matches',
-                'match_count': 0,
-            })
+        try:
+            enriched_candidates = rank_candidates(candidates, senior_data, deadline)
+        except DeadlineExceeded as e:
+            logger.info(f"{e}; storing embedding-only ranking for senior {senior_id} and offloading")
+            store_matches(senior_id, embedding_only_ranking(candidates), senior_data, match_status='partial')
+            create_async_task(queue_id, senior_id)
             return
         
-        # Initialize Google Maps client
-        gmaps_client = googlemaps.Client(key=GOOGLE_MAPS_API_KEY) if GOOGLE_MAPS_API_KEY else None
-        
-        # Enrich candidates
-        enriched_candidates = []
-        for candidate in candidates:
-            try:
-                enriched = enrich_candidate(candidate, senior_data, gmaps_client)
-                enriched_candidates.append(enriched)
-            except Exception as e:
-                logger.error(f"Error enriching candidate {candidate.get('id')}: {e}")
-                continue
-        
-        # Sort by final score
-        enriched_candidates.sort(key=lambda x: x['final_score'], reverse=True)
-        
-        # Store matches
-        store_matches(senior_id, enriched_candidates)
-        
-        # Send notification
-        send_push_notification(senior_id, len(enriched_candidates))
-        
-        # Delete queue document
-        queue_ref = db.collection('matching_queue').document(queue_id)
-        queue_ref.delete()
-        
-        logger.info(f"Successfully processed matching for senior {senior_id}")
+        complete_matching(queue_id, senior_id, senior_data, enriched_candidates)
+        logger.info(f"Successfully processed matching for senior {senior_id} in {deadline.elapsed():.2f}s")
         
     except Exception as e:
         logger.error(f"Error processing matching: {e}", exc_info=True)
         # Update queue document with error
         try:
-            queue_ref = db.collection('matching_queue').document(queue_id)
-            queue_ref.update({
-                'status': 'error',
-                'error_message': str(e),
-                'updated_at': firestore.SERVER_TIMESTAMP,
-            })
+            fail_queue_document(queue_id, str(e))
         except:
             pass
         raise
 
+
+def run_async_matching(payload: Dict) -> Dict:
+    """Worker body: the same pipeline as the fast path, under ASYNC_BUDGET_SECONDS."""
+    deadline = Deadline(ASYNC_BUDGET_SECONDS)
+    queue_id, senior_id = payload.get('queue_id'), payload['senior_id']
+    
+    prepared = prepare_matching(senior_id, queue_id)
+    if prepared is None:
+        return {'senior_id': senior_id, 'matches': 0}
+    senior_data, candidates = prepared
+    
+    enriched_candidates = rank_candidates(candidates, senior_data, deadline)
+    complete_matching(queue_id, senior_id, senior_data, enriched_candidates)
+    
+    logger.info(f"Async matching for senior {senior_id} finished in {deadline.elapsed():.2f}s")
+    return {
+        'senior_id': senior_id,
+        'matches': len(enriched_candidates[:MAX_MATCHES]),
+        'seconds': round(deadline.elapsed(), 3),
+    }
+
+
+@functions_framework.http
+def process_matching_async(request):
+    """
+    Async worker, called by Cloud Tasks with {"queue_id": ..., "senior_id": ...}.
+    
+    Replaces the senior's partial ranking with fully enriched, model-scored
+    matches. Failures return 500 so Cloud Tasks retries them per the queue's
+    retry settings (see setup_cloud_tasks.sh); when the last of
+    ASYNC_MAX_ATTEMPTS fails, the queue document is marked 'error' instead of
+    being left in 'processing'.
+    """
+    payload = request.get_json(silent=True) or {}
+    if not payload.get('senior_id'):
+        return ('Missing senior_id', 400)
+    
+    try:
+        report = run_async_matching(payload)
+    except Exception as e:
+        logger.error(f"Error in async matching for senior {payload['senior_id']}: {e}", exc_info=True)
+        retry_count = int(request.headers.get('X-CloudTasks-TaskRetryCount', 0))
+        if retry_count + 1 >= ASYNC_MAX_ATTEMPTS:
+            try:
+                fail_queue_document(payload.get('queue_id'), str(e))
+            except Exception:
+                logger.error(f"Could not mark matching queue {payload.get('queue_id')} as failed", exc_info=True)
+        return (str(e), 500)
+    return (json.dumps(report), 200, {'Content-Type': 'application/json'})
+
+
+def load_batch_seniors(body: Dict) -> Tuple[List[DocumentSnapshot], Dict[str, str], Optional[str]]:
+    """
+    Resolve the seniors for a batch run.
+    
+    Returns (senior snapshots, queue doc id by senior id, cursor for the next page).
+    Seniors come from explicit senior_ids, a page of all seniors (all_seniors),
+    or by default the matching_queue documents still waiting for a match
+    (MATCHING_REQUEST_STATUSES). Queue documents are claimed first (see
+    claim_queue_document), so a request the trigger is already running is skipped.
+    Snapshots of seniors that do not exist are returned too (exists False);
+    if the read fails, the claimed queue documents are marked 'error'.
+    """
+    limit = min(int(body.get('limit', BATCH_MAX_SENIORS)), BATCH_MAX_SENIORS)
+    queue_ids: Dict[str, str] = {}
+    next_cursor = None
+    
+    if body.get('senior_ids'):
+        senior_ids = list(dict.fromkeys(body['senior_ids']))[:limit]
+    elif body.get('all_seniors'):
+        query = db.collection('seniors').order_by('__name__').select([]).limit(limit)
+        if body.get('start_after'):
+            query = query.start_after(db.collection('seniors').document(body['start_after']))
+        senior_ids = [doc.id for doc in query.stream()]
+        if len(senior_ids) == limit:
+            next_cursor = senior_ids[-1]
+    else:
+        queue_query = (
+            db.collection('matching_queue')
+            .where(filter=FieldFilter('status', 'in', list(MATCHING_REQUEST_STATUSES)))
+            .limit(limit)
+        )
+        # One queue document per senior; later duplicates wait for the next run
+        queue_docs: Dict[str, DocumentSnapshot] = {}
+        for queue_doc in queue_query.stream():
+            senior_id = queue_doc.to_dict().get('seniorId')
+            if senior_id:
+                queue_docs.setdefault(senior_id, queue_doc)
+        claimed, _ = run_bounded(
+            lambda doc: claim_queue_document(doc, 'batch'), list(queue_docs.values()), BATCH_CLAIM_CONCURRENCY
+        )
+        queue_ids = {senior_id: doc.id for (senior_id, doc), won in zip(queue_docs.items(), claimed) if won}
+        senior_ids = list(queue_ids)
+    
+    # One batched read for all seniors
+    refs = [db.collection('seniors').document(senior_id) for senior_id in senior_ids]
+    try:
+        snapshots = list(db.get_all(refs))
+    except Exception as e:
+        fail_queue_documents(list(queue_ids.values()), str(e))
+        raise
+    return snapshots, queue_ids, next_cursor
+
+
+def find_candidates_batch(embeddings: np.ndarray, threshold: float) -> List[List[Dict]]:
+    """Candidates for many seniors: one matrix-matrix search over the resident index."""
+    try:
+        index = get_vector_index()
+        results = index.search_batch(embeddings, MAX_CANDIDATES, threshold)
+    except Exception as e:
+        logger.error(f"Vector index unavailable, querying pgvector per senior: {e}")
+        store = get_feature_store()
+        return [
+            query_similar_caregivers(list(embedding), threshold, include_metadata=store is None)
+            for embedding in embeddings
+        ]
+    return [
+        [index_candidate(caregiver_id, similarity) for caregiver_id, similarity in matches]
+        for matches in results
+    ]
+
+
+@functions_framework.http
+def process_matching_batch(request):
+    """
+    Match many seniors in one invocation.
+    
+    Request body (all optional):
+    {
+        "limit": 500,                 # at most BATCH_MAX_SENIORS
+        "senior_ids": ["senior_1"],   # explicit seniors, or
+        "all_seniors": true,          # re-match every senior, one page per call
+        "start_after": "senior_499"   # cursor returned by the previous page
+    }
+    Without senior_ids/all_seniors, pending matching_queue documents are drained.
+    
+    Similarity is one matrix-matrix search over the resident vector index, all
+    (senior, candidate) pairs are scored with one model call, and results are
+    written with a BulkWriter. Driving-distance refinement is not applied.
+    
+    Claimed queue documents never stay in 'processing': requests for missing
+    seniors or seniors without an embedding are marked 'error' (reported as
+    'missing' and 'skipped'), and if a later stage fails, every claimed
+    request not yet retired is marked 'error' and the call returns 500.
+    """
+    start_time = time.perf_counter()
+    body = request.get_json(silent=True) or {}
+    
+    stage_start = time.perf_counter()
+    snapshots, queue_ids, next_cursor = load_batch_seniors(body)
+    try:
+        report = _match_batch_seniors(snapshots, queue_ids, next_cursor, start_time, stage_start)
+    except Exception as e:
+        logger.error(f"Error in batch matching: {e}", exc_info=True)
+        fail_queue_documents(list(queue_ids.values()), str(e))
+        return (str(e), 500)
+    return (json.dumps(report), 200, {'Content-Type': 'application/json'})
+
+
+def _match_batch_seniors(
+    snapshots: List[DocumentSnapshot],
+    queue_ids: Dict[str, str],
+    next_cursor: Optional[str],
+    start_time: float,
+    load_start: float,
+) -> Dict:
+    """The stages of process_matching_batch after the seniors are loaded; returns its report."""
+    timings = {}
+    seniors, skipped, missing = [], [], []
+    for snapshot in snapshots:
+        if not snapshot.exists:
+            missing.append(snapshot.id)
+            continue
+        senior_data = snapshot.to_dict() or {}
+        if senior_data.get('embedding'):
+            seniors.append((snapshot.id, senior_data))
+        else:
+            skipped.append(snapshot.id)
+    timings['load'] = time.perf_counter() - load_start
+    
+    # Queue documents for these seniors would otherwise be drained again every run
+    errors = [(senior_id, 'Senior not found') for senior_id in missing] + \
+        [(senior_id, 'No embedding found for senior') for senior_id in skipped]
+    if any(senior_id in queue_ids for senior_id, _ in errors):
+        batch = db.batch()
+        for senior_id, message in errors:
+            if senior_id in queue_ids:
+                batch.update(db.collection('matching_queue').document(queue_ids[senior_id]), {
+                    'status': 'error',
+                    'error_message': message,
+                    'updated_at': firestore.SERVER_TIMESTAMP,
+                })
+        batch.commit()
+        # Settled: a failure further on must not overwrite their error_message
+        for senior_id, _ in errors:
+            queue_ids.pop(senior_id, None)
+    
+    if not seniors:
+        return {'seniors': 0, 'skipped': len(skipped), 'missing': len(missing), 'next_cursor': next_cursor}
+    
+    # Similarity: all seniors against all caregivers at once
+    stage_start = time.perf_counter()
+    embeddings = np.array([data['embedding'] for _, data in seniors], dtype=np.float32)
+    candidate_lists = find_candidates_batch(embeddings, SIMILARITY_THRESHOLD)
+    attach_missing_metadata(
+        [c for candidates in candidate_lists for c in candidates if 'metadata' not in c],
+        get_feature_store(),
+    )
+    timings['similarity'] = time.perf_counter() - stage_start
+    
+    # Enrichment is vectorized per senior; remember how long each senior took
+    stage_start = time.perf_counter()
+    per_senior_seconds = []
+    enriched_lists = []
+    for (senior_id, senior_data), candidates in zip(seniors, candidate_lists):
+        senior_start = time.perf_counter()
+        enriched_lists.append(enrich_candidates(candidates, senior_data, None))
+        per_senior_seconds.append(time.perf_counter() - senior_start)
+    timings['enrich'] = time.perf_counter() - stage_start
+    
+    # Score every (senior, candidate) pair in one pass
+    stage_start = time.perf_counter()
+    score_candidates([c for enriched in enriched_lists for c in enriched])
+    for enriched in enriched_lists:
+        enriched.sort(key=lambda x: x['final_score'], reverse=True)
+    timings['score'] = time.perf_counter() - stage_start
+    
+    # Write all results with a BulkWriter
+    stage_start = time.perf_counter()
+    writer = db.bulk_writer()
+    for (senior_id, senior_data), enriched in zip(seniors, enriched_lists):
+        if senior_id in queue_ids:
+            writer.delete(db.collection('matching_queue').document(queue_ids[senior_id]))
+        if not enriched:
+            writer.update(db.collection('seniors').document(senior_id), {
+                'match_status': 'no_matches',
+                'match_count': 0,
+            })
+            continue
+        _write_matches(writer, senior_id, enriched, previous_match_ids(senior_id, senior_data))
+    writer.close()
+    timings['write'] = time.perf_counter() - stage_start
+    
+    # Only seniors who asked for matches are notified, not bulk re-matches
+    for (senior_id, _), enriched in zip(seniors, enriched_lists):
+        if senior_id in queue_ids and enriched:
+            send_push_notification(senior_id, len(enriched[:MAX_MATCHES]))
+    
+    # Shared stages are amortized evenly across seniors
+    shared_seconds = (timings['load'] + timings['similarity'] + timings['score'] + timings['write']) / len(seniors)
+    per_senior_ms = (np.array(per_senior_seconds) + shared_seconds) * 1000
+    elapsed = time.perf_counter() - start_time
+    report = {
+        'seniors': len(seniors),
+        'skipped': len(skipped),
+        'missing': len(missing),
+        'seconds': round(elapsed, 3),
+        'seniors_per_sec': round(len(seniors) / elapsed, 1),
+        'per_senior_ms_p50': round(float(np.percentile(per_senior_ms, 50)), 2),
+        'per_senior_ms_p99': round(float(np.percentile(per_senior_ms, 99)), 2),
+        'stages_seconds': {name: round(value, 3) for name, value in timings.items()},
+        'next_cursor': next_cursor,
+    }
+    logger.info(f"Batch matching: {report}")
+    return report
+
+
+def load_stored_matches(senior_ids: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Stored match lists of many seniors, best first, in two batched reads.
+    
+    The senior documents are read for their current match_caregiver_ids (the
+    cached senior matrix may be behind another instance's writes), then the
+    listed match documents.
+    """
+    senior_refs = [db.collection('seniors').document(senior_id) for senior_id in senior_ids]
+    refs = []
+    for snapshot in db.get_all(senior_refs, field_paths=['match_caregiver_ids']):
+        if not snapshot.exists:
+            continue
+        matches_ref = snapshot.reference.collection('matches')
+        refs.extend(matches_ref.document(caregiver_id)
+                    for caregiver_id in snapshot.to_dict().get('match_caregiver_ids') or [])
+    
+    stored: Dict[str, List[Tuple[int, Dict]]] = {senior_id: [] for senior_id in senior_ids}
+    for snapshot in (db.get_all(refs) if refs else []):
+        if not snapshot.exists:
+            continue
+        data = snapshot.to_dict()
+        stored[snapshot.reference.parent.parent.id].append((data.get('rank', 0), {
+            'caregiver_id': snapshot.id,
+            'final_score': data['score'],
+            'score_type': data.get('score_type'),
+            'model_version': data.get('model_version'),
+            'similarity': data.get('similarity'),
+            'features': data.get('features', {}),
+        }))
+    return {senior_id: [match for _, match in sorted(matches, key=lambda item: item[0])]
+            for senior_id, matches in stored.items()}
+
+
+@functions_framework.cloud_event
+def process_caregiver_update(cloud_event):
+    """
+    Incremental re-rank triggered by a caregiver write (create, update or delete).
+    
+    The caregiver is scored against all seniors at once (one vector against the
+    cached senior matrix) and spliced into each stored top-MAX_MATCHES list it
+    can enter (the list is not full or it beats the last score) or already
+    belongs to. The changed caregiver's match document is written in full; the
+    others whose rank shifted only get their rank updated, so fields clients
+    wrote on them (status, rating) are kept. A listed
+    caregiver that drops out of a full list queues a full recompute for that
+    senior, since the next-best candidate is unknown here.
+    
+    Unlike the forward path the MAX_CANDIDATES similarity cap is not applied and
+    location uses straight-line distance.
+    """
+    start_time = time.perf_counter()
+    event_data = cloud_event.data or {}
+    resource = event_data.get('value') or event_data.get('oldValue') or {}
+    caregiver_id = resource.get('name', '').split('/')[-1]
+    if not caregiver_id:
+        logger.error("Could not extract caregiver_id from event")
+        return
+    
+    caregiver = None
+    if event_data.get('value'):
+        caregiver = fetch_caregiver_embedding(caregiver_id)
+        if caregiver is None:
+            logger.warning(f"No embedding stored for caregiver {caregiver_id}, skipping reverse matching")
+            return
+    
+    # Keep the resident index in step without waiting for its next refresh
+    if vector_index_sync is not None and vector_index_sync.loaded:
+        if caregiver is None:
+            vector_index_sync.index.remove([caregiver_id])
+            vector_index_sync.updated_at.pop(caregiver_id, None)
+        else:
+            vector_index_sync.index.upsert([caregiver_id], [parse_vector(caregiver['embedding'])])
+            vector_index_sync.updated_at[caregiver_id] = caregiver['updated_at']
+    
+    seniors = get_senior_matrix()
+    if not len(seniors):
+        return
+    
+    # Similarity against every senior, then features and scores for the rows that matter
+    stage_start = time.perf_counter()
+    if caregiver is None:
+        similarities = np.zeros(len(seniors), dtype=np.float32)
+    else:
+        similarities = seniors.embeddings @ normalize_rows([parse_vector(caregiver['embedding'])])[0]
+    rows = candidate_rows(seniors, caregiver_id, similarities, SIMILARITY_THRESHOLD)
+    scores = np.zeros(len(rows), dtype=np.float64)
+    score_type = model_version = None
+    feature_matrix = None
+    if caregiver is not None and len(rows):
+        feature_matrix = caregiver_pair_features(
+            seniors, rows, similarities[rows], caregiver['metadata'] or {}, HaversineDistanceProvider()
+        )
+        scores, score_type, model_version = calculate_ml_scores(feature_matrix)
+    mask = list_may_change(seniors, caregiver_id, rows, scores, MAX_MATCHES)
+    score_seconds = time.perf_counter() - stage_start
+    
+    new_matches = {}
+    for pos in np.flatnonzero(mask):
+        row = int(rows[pos])
+        new_match = None
+        if caregiver is not None and similarities[row] > SIMILARITY_THRESHOLD:
+            new_match = {
+                'caregiver_id': caregiver_id,
+                'final_score': float(scores[pos]),
+                'score_type': score_type,
+                'model_version': model_version,
+                'similarity': float(similarities[row]),
+                'features': {name: float(value) for name, value in zip(FEATURE_COLUMNS, feature_matrix[pos])},
+            }
+        new_matches[seniors.ids[row]] = new_match
+    
+    # Splice against the stored lists and write only the ranks that moved
+    stage_start = time.perf_counter()
+    stored = load_stored_matches(list(new_matches))
+    writer = db.bulk_writer()
+    updated_seniors, changed_documents, recompute = 0, 0, []
+    for senior_id, new_match in new_matches.items():
+        updated, changed, needs_full_recompute = splice_match(
+            stored[senior_id], new_match, caregiver_id, MAX_MATCHES
+        )
+        seniors.record_matches(senior_id, updated)
+        if not changed:
+            continue
+        senior_ref = db.collection('seniors').document(senior_id)
+        matches_ref = senior_ref.collection('matches')
+        upserts, rank_moves, removals = match_document_writes(stored[senior_id], updated, caregiver_id)
+        for rank, match in upserts:
+            writer.set(
+                matches_ref.document(match['caregiver_id']), _match_document(senior_id, rank, match), merge=True
+            )
+        for moved_id, rank in rank_moves.items():
+            writer.update(matches_ref.document(moved_id), {'rank': rank})
+        for removed_id in removals:
+            writer.delete(matches_ref.document(removed_id))
+        writer.update(senior_ref, _match_summary(updated))
+        if needs_full_recompute:
+            writer.set(db.collection('matching_queue').document(senior_id), {
+                'seniorId': senior_id,
+                'status': 'pending',
+                'reason': 'caregiver_removed',
+                'createdAt': firestore.SERVER_TIMESTAMP,
+            })
+            recompute.append(senior_id)
+        updated_seniors += 1
+        changed_documents += len(upserts) + len(rank_moves) + len(removals)
+    writer.close()
+    write_seconds = time.perf_counter() - stage_start
+    
+    logger.info(
+        f"Reverse matching for caregiver {caregiver_id}: {len(seniors)} seniors, "
+        f"{len(rows)} scored, {len(new_matches)} checked, {updated_seniors} updated "
+        f"({changed_documents} match documents), {len(recompute)} queued for recompute; "
+        f"score={score_seconds * 1e3:.1f}ms write={write_seconds * 1e3:.1f}ms "
+        f"total={(time.perf_counter() - start_time) * 1e3:.1f}ms"
+    )
@@ -0,0 +1,48 @@
+-- Change feed for the in-process vector index (MATCHING_BACKEND=memory).
+--
+-- process_matching pages through caregiver_embeddings ordered by
+-- (updated_at, id) from its last watermark, and removes caregivers listed in
+-- caregiver_embedding_deletions since its last deletions watermark.
+
+ALTER TABLE caregiver_embeddings
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS caregiver_embeddings_updated_at_idx
+    ON caregiver_embeddings (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS caregiver_embedding_deletions (
+    id VARCHAR(255) PRIMARY KEY,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS caregiver_embedding_deletions_deleted_at_idx
+    ON caregiver_embedding_deletions (deleted_at);
+
+-- Bump updated_at on every write; a re-inserted caregiver is no longer deleted
+CREATE OR REPLACE FUNCTION caregiver_embeddings_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    DELETE FROM caregiver_embedding_deletions WHERE id = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS caregiver_embeddings_touch ON caregiver_embeddings;
+CREATE TRIGGER caregiver_embeddings_touch
+    BEFORE INSERT OR UPDATE ON caregiver_embeddings
+    FOR EACH ROW EXECUTE FUNCTION caregiver_embeddings_touch();
+
+-- Record deletions as tombstones
+CREATE OR REPLACE FUNCTION caregiver_embeddings_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO caregiver_embedding_deletions (id, deleted_at)
+    VALUES (OLD.id, clock_timestamp())
+    ON CONFLICT (id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS caregiver_embeddings_tombstone ON caregiver_embeddings;
+CREATE TRIGGER caregiver_embeddings_tombstone
+    AFTER DELETE ON caregiver_embeddings
+    FOR EACH ROW EXECUTE FUNCTION caregiver_embeddings_tombstone();
@@ -0,0 +1,25 @@
+-- ANN index for the pgvector similarity query (requires pgvector >= 0.5.0).
+--
+-- process_matching queries nearest neighbours with
+--     ORDER BY embedding <=> $1 LIMIT 50
+-- and applies the similarity threshold to those rows afterwards, which an
+-- HNSW index on cosine distance can serve. Search breadth is set per session
+-- by the function (PGVECTOR_EF_SEARCH, default 100; keep it >= 50).
+
+-- The IVFFlat index from the original setup was built without tuned lists
+DROP INDEX IF EXISTS caregiver_embeddings_embedding_idx;
+
+CREATE INDEX IF NOT EXISTS caregiver_embeddings_embedding_hnsw_idx
+    ON caregiver_embeddings
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+ANALYZE caregiver_embeddings;
+
+-- IVFFlat alternative for pgvector < 0.5.0 (build after the table is loaded;
+-- lists ~ rows / 1000, and set PGVECTOR_PROBES ~ sqrt(lists)):
+--
+-- CREATE INDEX caregiver_embeddings_embedding_ivfflat_idx
+--     ON caregiver_embeddings
+--     USING ivfflat (embedding vector_cosine_ops)
+--     WITH (lists = 100);
@@ -0,0 +1,248 @@
+"""
+Versioned, hot-reloadable ranking model cache.
+
+The production model is described by the config/matching_model document
+(model_version, model_path, ml_enabled) that retrain_ranking_model writes on
+deploy. ModelRegistry polls that document at most once per poll interval,
+loads a new version on a background thread and swaps it in atomically, so
+warm instances pick up deployments without ever serving a half-loaded model.
+Failed loads are retried with exponential backoff instead of on every
+request, and every loaded version is kept on local disk so a restarted
+instance serves the last known model without downloading it first.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import lightgbm as lgb
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = "current.json"
+UNVERSIONED = "unversioned"
+LOCAL_VERSIONS_KEPT = 2
+
+
+class LoadedModel(NamedTuple):
+    """A Booster, the version that produced it, and what scores with it."""
+    booster: lgb.Booster
+    version: str
+    # The Booster itself, or the result of the registry's prepare hook
+    predictor: Any
+
+
+class ModelRegistry:
+    """
+    Args:
+        fetch_config: Returns the config/matching_model document as a dict,
+            or None if it does not exist.
+        download: Returns the model text for a model_path, or None if missing.
+        default_path: model_path used when the config document has none.
+        local_dir: Directory for on-disk copies, or None to disable them.
+        poll_interval: Seconds between config polls on a healthy instance.
+        min_backoff, max_backoff: Retry delay bounds after a failed load.
+        clock: Monotonic time source (injectable for tests).
+        prepare: Builds the predictor for a freshly loaded Booster (e.g. a
+            compiled ensemble); runs once per version, before the swap.
+    """
+
+    def __init__(
+        self,
+        fetch_config: Callable[[], Optional[Dict]],
+        download: Callable[[str], Optional[str]],
+        default_path: Optional[str] = None,
+        local_dir: Optional[str] = None,
+        poll_interval: float = 60.0,
+        min_backoff: float = 5.0,
+        max_backoff: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        prepare: Optional[Callable[[lgb.Booster], Any]] = None,
+    ):
+        self.fetch_config = fetch_config
+        self.download = download
+        self.default_path = default_path
+        self.local_dir = local_dir
+        self.poll_interval = poll_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.prepare = prepare
+
+        self._current: Optional[LoadedModel] = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._retry_at = float("-inf")
+        self._failures = 0
+
+    def get(self) -> Optional[LoadedModel]:
+        """
+        The current model, or None to use the heuristic.
+
+        Only the first call of an instance can block (when there is no local
+        copy to start from); later calls return immediately and start a
+        background refresh when a poll is due.
+        """
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._current = self._load_local_pointer()
+                    self._initialized = True
+                    if self._current is None:
+                        self.refresh()
+                        return self._current
+        if self._refresh_due():
+            self._refresh_in_background()
+        return self._current
+
+    def refresh(self) -> bool:
+        """
+        Poll the config and load its model if the version changed.
+
+        Returns True if a different model (or the heuristic) is now served.
+        Concurrent calls are collapsed: if a refresh is running, this returns False.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked_at = self.clock()
+            config = self.fetch_config() or {}
+            if config.get('ml_enabled') is False:
+                changed = self._current is not None
+                self._current = None
+                self._point_to(None)
+                self._record_success()
+                return changed
+
+            version = str(config.get('model_version') or UNVERSIONED)
+            if self._current is not None and self._current.version == version:
+                self._record_success()
+                return False
+
+            path = config.get('model_path') or self.default_path
+            loaded = self._load_version(version, path)
+            self._current = loaded
+            self._record_success()
+            logger.info(f"Ranking model {version} loaded from {path}")
+            return True
+        except Exception as e:
+            self._record_failure(e)
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def stats(self) -> Dict:
+        return {
+            'version': self._current.version if self._current else None,
+            'failures': self._failures,
+            'seconds_since_poll': self.clock() - self._checked_at,
+        }
+
+    def _refresh_due(self) -> bool:
+        next_attempt = self._retry_at if self._failures else self._checked_at + self.poll_interval
+        return self.clock() >= next_attempt
+
+    def _refresh_in_background(self):
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def _record_success(self):
+        self._failures = 0
+        self._retry_at = float("-inf")
+
+    def _record_failure(self, error: Exception):
+        # Negative cache: no retry until the backoff expires, whatever the request rate
+        self._failures += 1
+        delay = min(self.max_backoff, self.min_backoff * 2 ** (self._failures - 1))
+        self._retry_at = self.clock() + delay
+        serving = self._current.version if self._current else "heuristic"
+        logger.error(
+            f"Error loading ranking model (attempt {self._failures}, retry in {delay:.0f}s, "
+            f"serving {serving}): {error}"
+        )
+
+    def _local_file(self, version: str) -> Optional[str]:
+        # Unversioned models may change under the same name, so they are never kept on disk
+        if not self.local_dir or version == UNVERSIONED:
+            return None
+        return os.path.join(self.local_dir, f"model-{re.sub(r'[^A-Za-z0-9_.-]', '_', version)}.txt")
+
+    def _loaded(self, booster: lgb.Booster, version: str) -> LoadedModel:
+        predictor = self.prepare(booster) if self.prepare else booster
+        return LoadedModel(booster, version, predictor)
+
+    def _load_version(self, version: str, path: Optional[str]) -> LoadedModel:
+        """Load a version from its local copy, or download it and keep a copy."""
+        local_file = self._local_file(version)
+        if local_file and os.path.exists(local_file):
+            loaded = self._loaded(lgb.Booster(model_file=local_file), version)
+            self._point_to(version, local_file)
+            return loaded
+
+        if not path:
+            raise FileNotFoundError("No model_path configured")
+        model_str = self.download(path)
+        if model_str is None:
+            raise FileNotFoundError(f"Model not found at {path}")
+        loaded = self._loaded(lgb.Booster(model_str=model_str), version)
+        if local_file:
+            self._save_local(local_file, version, model_str)
+        return loaded
+
+    def _save_local(self, local_file: str, version: str, model_str: str):
+        try:
+            os.makedirs(self.local_dir, exist_ok=True)
+            tmp = f"{local_file}.tmp"
+            with open(tmp, "w") as f:
+                f.write(model_str)
+            os.replace(tmp, local_file)
+            self._point_to(version, local_file)
+
+            # Keep only the newest few versions
+            copies = sorted(
+                (name for name in os.listdir(self.local_dir) if name.startswith("model-") and name.endswith(".txt")),
+                key=lambda name: os.path.getmtime(os.path.join(self.local_dir, name)),
+                reverse=True,
+            )
+            for name in copies[LOCAL_VERSIONS_KEPT:]:
+                os.remove(os.path.join(self.local_dir, name))
+        except OSError as e:
+            logger.warning(f"Could not keep a local copy of model {version}: {e}")
+
+    def _point_to(self, version: Optional[str], local_file: Optional[str] = None):
+        """Record which local copy a restarted instance should serve (None: none)."""
+        if not self.local_dir:
+            return
+        pointer = os.path.join(self.local_dir, CURRENT_POINTER)
+        try:
+            if version is None:
+                if os.path.exists(pointer):
+                    os.remove(pointer)
+                return
+            with open(f"{pointer}.tmp", "w") as f:
+                json.dump({'version': version, 'file': os.path.basename(local_file)}, f)
+            os.replace(f"{pointer}.tmp", pointer)
+        except OSError as e:
+            logger.warning(f"Could not update the local model pointer: {e}")
+
+    def _load_local_pointer(self) -> Optional[LoadedModel]:
+        """The last model this machine loaded, if a copy is on disk."""
+        if not self.local_dir:
+            return None
+        try:
+            with open(os.path.join(self.local_dir, CURRENT_POINTER)) as f:
+                pointer = json.load(f)
+            booster = lgb.Booster(model_file=os.path.join(self.local_dir, pointer['file']))
+            logger.info(f"Ranking model {pointer['version']} loaded from local copy")
+            return self._loaded(booster, pointer['version'])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable local model copy: {e}")
+            return None
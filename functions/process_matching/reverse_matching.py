@@ -0,0 +1,217 @@
+"""
+Reverse matching: re-rank existing seniors when one caregiver changes.
+
+Instead of recomputing every senior, the changed caregiver is scored against
+all seniors at once (one vector against the cached senior embedding matrix,
+with pair features computed column-wise) and spliced into each senior's stored
+top-MAX_MATCHES list only where it beats the current last score, or where it
+was already listed and its score changed.
+"""
+import time
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from availability import available_minutes, compile_availability, overlap_minutes, stack_masks
+from distance import DistanceProvider, distance_to_score, extract_coordinates
+from scoring import FEATURE_COLUMNS, price_compatibility_scores
+from vector_index import normalize_rows
+
+# Senior document fields needed for reverse matching
+SENIOR_FIELDS = [
+    'embedding',
+    'location',
+    'availability',
+    'conditions',
+    'budget',
+    'match_count',
+    'match_min_score',
+    'match_caregiver_ids',
+]
+
+
+class SeniorMatrix:
+    """Normalized senior embeddings plus the senior-side columns used by pair features."""
+
+    def __init__(self, seniors: Sequence[Tuple[str, Mapping]]):
+        seniors = [(senior_id, data) for senior_id, data in seniors if data.get('embedding')]
+        self.ids: List[str] = [senior_id for senior_id, _ in seniors]
+        self.data: List[Dict] = [dict(data) for _, data in seniors]
+        self.row = {senior_id: idx for idx, senior_id in enumerate(self.ids)}
+        self.embeddings = (
+            normalize_rows([data['embedding'] for data in self.data])
+            if seniors else np.zeros((0, 0), dtype=np.float32)
+        )
+        self.locations = extract_coordinates([data.get('location') for data in self.data])
+        self.availability = stack_masks([compile_availability(data.get('availability')) for data in self.data])
+        self.budgets = np.array([float(data.get('budget') or 0) for data in self.data], dtype=np.float64)
+        # Stored list state: size, last score (NaN if unknown) and who is listed where
+        self.match_counts = np.array([int(data.get('match_count') or 0) for data in self.data], dtype=np.int64)
+        self.min_scores = np.array(
+            [np.nan if data.get('match_min_score') is None else float(data['match_min_score']) for data in self.data],
+            dtype=np.float64,
+        )
+        self.listed_in: Dict[str, Set[int]] = defaultdict(set)
+        for idx, data in enumerate(self.data):
+            for caregiver_id in data.get('match_caregiver_ids') or []:
+                self.listed_in[caregiver_id].add(idx)
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def record_matches(self, senior_id: str, matches: List[Dict]):
+        """Keep the cached list state in sync after a splice is written."""
+        idx = self.row[senior_id]
+        for caregiver_id in self.data[idx].get('match_caregiver_ids') or []:
+            self.listed_in[caregiver_id].discard(idx)
+        caregiver_ids = [m['caregiver_id'] for m in matches]
+        for caregiver_id in caregiver_ids:
+            self.listed_in[caregiver_id].add(idx)
+        self.data[idx]['match_caregiver_ids'] = caregiver_ids
+        self.match_counts[idx] = len(matches)
+        self.min_scores[idx] = matches[-1]['final_score'] if matches else np.nan
+
+
+def caregiver_pair_features(
+    seniors: SeniorMatrix,
+    rows: np.ndarray,
+    similarities: np.ndarray,
+    caregiver_metadata: Mapping,
+    provider: DistanceProvider,
+) -> np.ndarray:
+    """
+    Feature matrix (len(rows), len(FEATURE_COLUMNS)) for one caregiver against the given senior rows.
+
+    Features mirror the forward path (enrich_candidate): location from the
+    senior's point of view, fraction of the senior's requested minutes covered,
+    fraction of the senior's conditions covered, price against each budget.
+    """
+    n = len(rows)
+    features = {name: np.zeros(n, dtype=np.float64) for name in FEATURE_COLUMNS}
+    features['similarity'] = np.asarray(similarities, dtype=np.float64)
+
+    # Location (distance is symmetric, so one provider call from the caregiver)
+    location_scores = np.full(n, 0.5, dtype=np.float64)
+    origin = extract_coordinates([caregiver_metadata.get('location')])[0]
+    destinations = seniors.locations[rows]
+    valid = ~np.isnan(destinations).any(axis=1)
+    if not np.isnan(origin).any() and valid.any():
+        location_scores[valid] = distance_to_score(provider.distances_km(tuple(origin), destinations[valid]))
+    features['location_score'] = location_scores
+
+    # Availability: overlap / senior's requested minutes
+    caregiver_mask = compile_availability(caregiver_metadata.get('availability'))
+    senior_masks = seniors.availability[rows]
+    requested = available_minutes(senior_masks).astype(np.float64)
+    overlap = overlap_minutes(caregiver_mask, senior_masks).astype(np.float64)
+    features['availability_score'] = np.divide(
+        overlap, requested, out=np.zeros(n, dtype=np.float64), where=requested > 0
+    )
+
+    # Specializations covering each senior's conditions
+    specializations = set(caregiver_metadata.get('specializations') or [])
+    if specializations:
+        for pos, row in enumerate(rows):
+            conditions = seniors.data[row].get('conditions') or []
+            if conditions:
+                features['specialization_score'][pos] = len(set(conditions) & specializations) / len(conditions)
+
+    features['price_score'] = price_compatibility_scores(
+        seniors.budgets[rows], float(caregiver_metadata.get('hourly_rate') or 0)
+    )
+    features['years_experience'][:] = float(caregiver_metadata.get('years_of_experience') or 0)
+    features['certification_count'][:] = len(caregiver_metadata.get('certifications') or [])
+
+    return np.column_stack([features[name] for name in FEATURE_COLUMNS])
+
+
+def candidate_rows(seniors: SeniorMatrix, caregiver_id: str, similarities: np.ndarray, threshold: float) -> np.ndarray:
+    """Senior rows worth scoring: above the similarity threshold, or already listing the caregiver."""
+    rows = set(np.flatnonzero(similarities > threshold).tolist()) | seniors.listed_in.get(caregiver_id, set())
+    return np.array(sorted(rows), dtype=np.int64)
+
+
+def list_may_change(
+    seniors: SeniorMatrix,
+    caregiver_id: str,
+    rows: np.ndarray,
+    scores: np.ndarray,
+    max_matches: int,
+) -> np.ndarray:
+    """
+    Mask over rows whose stored list may change: the caregiver is already
+    listed, the list is not full, or the caregiver beats its last score.
+    """
+    listed = seniors.listed_in.get(caregiver_id, set())
+    already_listed = np.array([row in listed for row in rows.tolist()], dtype=bool)
+    counts = seniors.match_counts[rows]
+    min_scores = seniors.min_scores[rows]
+    beats_last = np.isnan(min_scores) | (scores > np.nan_to_num(min_scores, nan=-np.inf))
+    return already_listed | (counts < max_matches) | beats_last
+
+
+def splice_match(
+    current: List[Dict],
+    new_match: Optional[Dict],
+    caregiver_id: str,
+    max_matches: int,
+) -> Tuple[List[Dict], bool, bool]:
+    """
+    Insert (or move, or drop) one caregiver in a senior's ranked match list.
+
+    Args:
+        current: Stored matches, best first (dicts with caregiver_id, final_score, ...).
+        new_match: The caregiver's new match, or None if it no longer qualifies.
+
+    Returns (new list, changed, needs_full_recompute). changed is False when
+    the stored list stays as it is (the caregiver does not make the list);
+    match_document_writes gives the writes otherwise. needs_full_recompute is set when a listed caregiver drops out of a full
+    list, since the next-best candidate is unknown without the full pipeline.
+    """
+    was_listed = any(m['caregiver_id'] == caregiver_id for m in current)
+    remaining = [m for m in current if m['caregiver_id'] != caregiver_id]
+
+    if new_match is None:
+        updated = remaining
+    else:
+        position = 0
+        while position < len(remaining) and remaining[position]['final_score'] >= new_match['final_score']:
+            position += 1
+        updated = remaining[:position] + [new_match] + remaining[position:]
+    updated = updated[:max_matches]
+
+    changed = (
+        [m['caregiver_id'] for m in current] != [m['caregiver_id'] for m in updated]
+        or any(m is new_match for m in updated)
+    )
+    still_listed = any(m['caregiver_id'] == caregiver_id for m in updated)
+    needs_full_recompute = was_listed and not still_listed and len(current) >= max_matches
+    return updated, changed, needs_full_recompute
+
+
+def match_document_writes(
+    current: List[Dict],
+    updated: List[Dict],
+    caregiver_id: str,
+) -> Tuple[List[Tuple[int, Dict]], Dict[str, int], List[str]]:
+    """
+    Match document writes that turn the stored list `current` into `updated`.
+
+    Returns (upserts, rank_moves, removals): the changed caregiver's (rank,
+    match) to write in full, the new rank of every other caregiver whose rank
+    shifted, and the caregivers that left the list. Shifted caregivers only
+    get their rank updated, so fields clients or training wrote on their match
+    documents (status, rating, ...) are kept.
+    """
+    old_ranks = {match['caregiver_id']: rank for rank, match in enumerate(current, start=1)}
+    upserts, rank_moves = [], {}
+    for rank, match in enumerate(updated, start=1):
+        if match['caregiver_id'] == caregiver_id:
+            upserts.append((rank, match))
+        elif old_ranks.get(match['caregiver_id']) != rank:
+            rank_moves[match['caregiver_id']] = rank
+    listed = {match['caregiver_id'] for match in updated}
+    removals = [listed_id for listed_id in old_ranks if listed_id not in listed]
+    return upserts, rank_moves, removals
@@ -0,0 +1,134 @@
+"""
+Batch scoring for matching candidates.
+
+All candidates for a senior are scored together: their features are stacked
+into one NumPy matrix, which is passed to a single LightGBM predict call or,
+when no model is available, to the vectorized heuristic.
+"""
+import logging
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Feature order must match training
+FEATURE_COLUMNS = [
+    'similarity',
+    'location_score',
+    'availability_score',
+    'specialization_score',
+    'price_score',
+    'years_experience',
+    'certification_count',
+]
+
+
+def build_feature_matrix(
+    features: Sequence[Dict],
+    columns: Sequence[str] = FEATURE_COLUMNS
+) -> np.ndarray:
+    """Stack per-candidate feature dicts into an (n_candidates, n_features) matrix."""
+    matrix = np.zeros((len(features), len(columns)), dtype=np.float64)
+    for row, candidate_features in enumerate(features):
+        for col, name in enumerate(columns):
+            matrix[row, col] = candidate_features.get(name, 0) or 0
+    return matrix
+
+
+def calculate_heuristic_score(
+    similarity,
+    location_score,
+    availability_score,
+    specialization_score,
+    price_score,
+    years_experience
+):
+    """
+    Calculate heuristic matching score.
+
+    Works on scalars or on NumPy arrays (one entry per candidate).
+    """
+    # Normalize experience (0-20 years -> 0-1)
+    experience_score = np.minimum(1.0, np.asarray(years_experience) / 20.0)
+
+    # Critical skills match (weighted specialization)
+    critical_skills_match = specialization_score
+
+    score = (
+        0.35 * similarity +
+        0.30 * critical_skills_match +
+        0.20 * location_score +
+        0.10 * availability_score +
+        0.05 * experience_score
+    )
+
+    return score
+
+
+def calculate_heuristic_scores(feature_matrix: np.ndarray) -> np.ndarray:
+    """Vectorized heuristic score for every row of a feature matrix."""
+    column = {name: feature_matrix[:, idx] for idx, name in enumerate(FEATURE_COLUMNS)}
+    return calculate_heuristic_score(
+        column['similarity'],
+        column['location_score'],
+        column['availability_score'],
+        column['specialization_score'],
+        column['price_score'],
+        column['years_experience'],
+    )
+
+
+def price_compatibility_scores(budgets, rates) -> np.ndarray:
+    """
+    Vectorized price compatibility; budgets and rates broadcast against each other.
+
+    Within budget scores 0.7-1.0 (cheaper is better), over budget is penalized
+    by the relative overage, and a missing budget or rate scores 0.5.
+    """
+    budgets, rates = np.broadcast_arrays(
+        np.asarray(budgets, dtype=np.float64), np.asarray(rates, dtype=np.float64)
+    )
+    safe_budgets = np.where(budgets == 0, 1.0, budgets)
+    within_budget = 1.0 - (rates / safe_budgets) * 0.3
+    over_budget = np.maximum(0.0, 1.0 - (rates - safe_budgets) / safe_budgets)
+    scores = np.where(rates <= budgets, within_budget, over_budget)
+    return np.where((rates == 0) | (budgets == 0), 0.5, scores)
+
+
+def align_to_model(model, feature_matrix: np.ndarray) -> np.ndarray:
+    """
+    Reorder FEATURE_COLUMNS to the model's own feature names.
+
+    Features the model was trained on but serving does not compute (e.g.
+    past_rating) are filled with 0, the default used in the training export.
+    Models without meaningful names (Column_0, ...) are used positionally.
+    """
+    names = model.feature_name()
+    if list(names) == FEATURE_COLUMNS or not set(names) & set(FEATURE_COLUMNS):
+        return feature_matrix
+    index = {name: col for col, name in enumerate(FEATURE_COLUMNS)}
+    aligned = np.zeros((len(feature_matrix), len(names)), dtype=np.float64)
+    for col, name in enumerate(names):
+        if name in index:
+            aligned[:, col] = feature_matrix[:, index[name]]
+    return aligned
+
+
+def predict_scores(model, feature_matrix: np.ndarray) -> np.ndarray:
+    """Score every row of a feature matrix with a single Booster.predict call."""
+    return np.asarray(model.predict(align_to_model(model, feature_matrix)), dtype=np.float64)
+
+
+def score_feature_matrix(model, feature_matrix: np.ndarray) -> Tuple[np.ndarray, str]:
+    """
+    Score a feature matrix with the ML model, falling back to the heuristic.
+
+    Returns (scores, score_type) where score_type is 'ml' or 'heuristic'.
+    """
+    if model is not None and len(feature_matrix):
+        try:
+            return predict_scores(model, feature_matrix), 'ml'
+        except Exception as e:
+            logger.error(f"Error calculating ML scores: {e}")
+    return calculate_heuristic_scores(feature_matrix), 'heuristic'
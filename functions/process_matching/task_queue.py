@@ -0,0 +1,116 @@
+"""
+Task queues for offloading matching work to the async worker.
+
+CloudTasksQueue posts JSON payloads to the process_matching_async HTTP
+function through Cloud Tasks (retries and rate limits come from the queue
+configuration, see setup_cloud_tasks.sh). LocalTaskQueue hands payloads to an
+in-process handler, for local runs and tests.
+"""
+import json
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from google.cloud import tasks_v2
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    """Interface: enqueue a JSON-serializable payload for the worker."""
+
+    def enqueue(self, payload: Dict) -> str:
+        raise NotImplementedError
+
+
+class CloudTasksQueue(TaskQueue):
+    """
+    Cloud Tasks backend.
+
+    Args:
+        client: tasks_v2.CloudTasksClient.
+        project, location, queue: Queue coordinates.
+        url: Worker URL the task POSTs to.
+        service_account_email: If set, tasks carry an OIDC token for this
+            account so the worker can require authentication.
+    """
+
+    def __init__(
+        self,
+        client,
+        project: str,
+        location: str,
+        queue: str,
+        url: str,
+        service_account_email: Optional[str] = None,
+    ):
+        self.client = client
+        self.queue_path = client.queue_path(project, location, queue)
+        self.url = url
+        self.service_account_email = service_account_email
+
+    def build_task(self, payload: Dict) -> Dict:
+        http_request = {
+            'http_method': tasks_v2.HttpMethod.POST,
+            'url': self.url,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(payload).encode(),
+        }
+        if self.service_account_email:
+            http_request['oidc_token'] = {
+                'service_account_email': self.service_account_email,
+                'audience': self.url,
+            }
+        return {'http_request': http_request}
+
+    def enqueue(self, payload: Dict) -> str:
+        response = self.client.create_task(
+            request={'parent': self.queue_path, 'task': self.build_task(payload)}
+        )
+        return response.name
+
+
+class LocalTaskQueue(TaskQueue):
+    """
+    In-process backend.
+
+    Args:
+        handler: Called with each payload (the worker's code path).
+        background: Run each task on a daemon thread as soon as it is
+            enqueued; otherwise tasks wait until drain() is called.
+    """
+
+    def __init__(self, handler: Callable[[Dict], object], background: bool = False):
+        self.handler = handler
+        self.background = background
+        self.pending = deque()
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def enqueue(self, payload: Dict) -> str:
+        # Round-trip through JSON so payloads behave as they would over HTTP
+        payload = json.loads(json.dumps(payload))
+        with self._lock:
+            self._counter += 1
+            name = f"local-task-{self._counter}"
+        if self.background:
+            threading.Thread(target=self._run, args=(name, payload), daemon=True).start()
+        else:
+            self.pending.append((name, payload))
+        return name
+
+    def drain(self) -> List[object]:
+        """Run queued tasks in order (including any they enqueue); returns handler results."""
+        results = []
+        while self.pending:
+            name, payload = self.pending.popleft()
+            results.append(self._run(name, payload))
+        return results
+
+    def _run(self, name: str, payload: Dict):
+        try:
+            return self.handler(payload)
+        except Exception as e:
+            logger.error(f"Local task {name} failed: {e}", exc_info=True)
+            return e
@@ -0,0 +1,117 @@
+"""
+Tests for the weekly availability masks (availability.py).
+
+Checks compiled minutes for regular, unaligned, overnight and empty
+schedules, overlap minutes and scores between one senior and many
+caregivers, and the CSV day/shift decoding used for the processed datasets:
+
+    python test_availability.py
+"""
+import numpy as np
+
+from availability import (
+    MASK_BYTES,
+    SLOTS_PER_DAY,
+    available_minutes,
+    availability_overlap_scores,
+    compile_availability,
+    csv_availability,
+    overlap_minutes,
+    parse_minutes,
+    stack_masks,
+)
+
+
+def schedule(**days):
+    """{'monday': ('08:00', '12:00'), ...} -> Firestore availability (one 'morning' slot per day)."""
+    return {
+        day: {'morning': {'available': True, 'start': start, 'end': end}}
+        for day, (start, end) in days.items()
+    }
+
+
+def day_bits(mask: np.ndarray, day_idx: int) -> np.ndarray:
+    return np.unpackbits(mask)[day_idx * SLOTS_PER_DAY:(day_idx + 1) * SLOTS_PER_DAY]
+
+
+def test_parse_minutes():
+    assert parse_minutes("08:30", 0) == 510
+    assert parse_minutes("23:59", 0) == 24 * 60
+    assert parse_minutes("late", 42) == 42 and parse_minutes(None, 7) == 7
+
+
+def test_compile_availability_minutes():
+    mask = compile_availability(schedule(monday=('08:00', '12:00'), friday=('14:00', '15:30')))
+    assert mask.shape == (MASK_BYTES,)
+    assert int(available_minutes(mask)) == 240 + 90
+    assert np.flatnonzero(day_bits(mask, 0)).tolist() == list(range(32, 48))
+
+    # Unavailable slots are ignored; missing times cover the whole day
+    assert int(available_minutes(compile_availability(
+        {'monday': {'morning': {'available': False, 'start': '08:00', 'end': '12:00'}}}
+    ))) == 0
+    assert int(available_minutes(compile_availability({'sunday': {'evening': {'available': True}}}))) == 24 * 60
+
+    # Unaligned times are rounded outward to whole 15-minute slots
+    assert int(available_minutes(compile_availability(schedule(monday=('08:10', '08:20'))))) == 30
+
+
+def test_overnight_range_runs_into_the_next_day():
+    mask = compile_availability(schedule(sunday=('22:00', '06:00')))
+    assert int(available_minutes(mask)) == 8 * 60
+    assert day_bits(mask, 6).sum() * 15 == 120
+    # Sunday night wraps to Monday morning
+    assert np.flatnonzero(day_bits(mask, 0)).tolist() == list(range(0, 24))
+
+    early_monday = compile_availability(schedule(monday=('05:00', '08:00')))
+    assert int(overlap_minutes(early_monday, mask[None, :])[0]) == 60
+
+
+def test_overlap_minutes_and_scores():
+    senior = compile_availability(schedule(monday=('10:00', '14:00')))
+    caregivers = stack_masks([
+        compile_availability(schedule(monday=('08:00', '12:00'))),
+        compile_availability(schedule(monday=('13:00', '18:00'))),
+        compile_availability(schedule(tuesday=('10:00', '14:00'))),
+        compile_availability(schedule(monday=('00:00', '23:59'))),
+    ])
+    assert overlap_minutes(senior, caregivers).tolist() == [120, 60, 0, 240]
+    assert availability_overlap_scores(senior, caregivers).tolist() == [0.5, 0.25, 0.0, 1.0]
+
+
+def test_empty_schedules():
+    empty = compile_availability(None)
+    assert int(available_minutes(empty)) == 0 and compile_availability({}).tolist() == empty.tolist()
+    assert stack_masks([]).shape == (0, MASK_BYTES)
+
+    caregivers = stack_masks([compile_availability(schedule(monday=('08:00', '12:00'))), empty])
+    # A senior without availability scores 0 against everyone, not NaN
+    assert availability_overlap_scores(empty, caregivers).tolist() == [0.0, 0.0]
+    senior = compile_availability(schedule(monday=('08:00', '12:00')))
+    assert availability_overlap_scores(senior, caregivers).tolist() == [1.0, 0.0]
+
+
+def test_csv_availability_matches_the_seed_script():
+    row = {'Lunes': '1', 'Martes': '0', 'Miercoles': '1', 'Jueves': '0', 'Viernes': '0',
+           'Sabado': '0', 'Domingo': '1', 'turno_val': '1'}
+    assert csv_availability(row, 'turno_val') == {
+        day: {'morning': {'available': True, 'start': '08:00', 'end': '12:00'}}
+        for day in ('monday', 'wednesday', 'sunday')
+    }
+    assert int(available_minutes(compile_availability(csv_availability(row, 'turno_val')))) == 3 * 240
+
+    # Missing and 0 codes default to the afternoon, like seedCaregiversFromCSV.ts
+    for code in ('0', '', None):
+        assert csv_availability({**row, 'turno_val': code}, 'turno_val')['monday'] == {
+            'afternoon': {'available': True, 'start': '12:00', 'end': '18:00'}
+        }
+    assert csv_availability({**row, 'hour_range': '3'}, 'hour_range')['sunday']['evening']['end'] == '22:00'
+    assert csv_availability({**row, 'turno_val': '7'}, 'turno_val') == {}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All availability tests passed")
@@ -0,0 +1,92 @@
+"""
+Tests for the distance providers (distance.py).
+
+Checks the haversine provider against known distances, that the driving
+provider splits destinations into Distance Matrix requests of at most 25 and
+puts each answer back in place, and that failed requests and non-OK elements
+come back unknown (NaN), so candidates keep their haversine score. The Maps
+client is stubbed; no network access needed:
+
+    python test_distance.py
+"""
+import inspect
+
+import numpy as np
+
+from conftest import StubGmapsClient, load_main
+from distance import (
+    DEFAULT_LOCATION_SCORE,
+    DrivingDistanceProvider,
+    HaversineDistanceProvider,
+    distance_to_score,
+    extract_coordinates,
+)
+from scoring import FEATURE_COLUMNS
+
+
+def test_haversine_provider_known_distances():
+    provider = HaversineDistanceProvider()
+    distances = provider.distances_km((0.0, 0.0), np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 180.0]]))
+    assert distances[0] == 0.0
+    assert abs(distances[1] - 111.195) < 0.01
+    assert abs(distances[2] - np.pi * 6371.0088) < 0.01
+
+    # Lima (Plaza Mayor) to Miraflores (Parque Kennedy), ~8.4 km
+    assert abs(provider.distances_km((-12.0453, -77.0311), [[-12.1211, -77.0297]])[0] - 8.43) < 0.05
+
+
+def test_scores_and_missing_coordinates():
+    scores = distance_to_score(np.array([0.0, 25.0, 80.0, np.nan]))
+    assert scores.tolist() == [1.0, 0.5, 0.0, DEFAULT_LOCATION_SCORE]
+
+    coords = extract_coordinates([{'lat': 1, 'lng': 2}, None, {'lat': 'x', 'lng': 2}, {'lng': 2}])
+    assert coords[0].tolist() == [1.0, 2.0]
+    assert np.isnan(coords[1:]).all()
+
+
+def test_driving_provider_batches_25_destinations_per_request():
+    client = StubGmapsClient()
+    provider = DrivingDistanceProvider(client, destinations_per_request=100)
+    destinations = np.column_stack([np.arange(60) / 1000, np.zeros(60)])
+
+    distances = provider.distances_km((0.0, 0.0), destinations)
+
+    assert [len(request) for request in client.requests] == [25, 25, 10]
+    assert client.requests[1][0] == f"{destinations[25][0]},{destinations[25][1]}"
+    assert np.allclose(distances, np.arange(60))
+
+
+def test_driving_provider_failures_are_unknown():
+    destinations = np.array([[0.001, 0.0], [0.002, 0.0], [0.003, 0.0]])
+
+    # One element without a route
+    client = StubGmapsClient(element_status={"0.002,0.0": 'ZERO_RESULTS'})
+    distances = DrivingDistanceProvider(client).distances_km((0.0, 0.0), destinations)
+    assert distances[0] == 1.0 and distances[2] == 3.0 and np.isnan(distances[1])
+
+    # Whole request rejected, or raising: every destination of that request
+    for client in (StubGmapsClient(response_status='OVER_QUERY_LIMIT'), StubGmapsClient(error=TimeoutError())):
+        distances = DrivingDistanceProvider(client, destinations_per_request=2).distances_km((0.0, 0.0), destinations)
+        assert np.isnan(distances).all() and len(client.requests) == 2
+
+
+def test_unknown_driving_distance_keeps_haversine_score(main):
+    candidates = [
+        {'caregiver_id': f"caregiver_{i}", 'location': {'lat': lat, 'lng': 0.0},
+         'features': {name: 0.5 for name in FEATURE_COLUMNS}}
+        for i, lat in enumerate([0.005, 0.010])
+    ]
+    client = StubGmapsClient(element_status={"0.01,0.0": 'NOT_FOUND'})
+
+    main.refine_with_driving_distance(candidates, {'lat': 0.0, 'lng': 0.0}, DrivingDistanceProvider(client), top_k=2)
+
+    assert candidates[0]['features']['location_score'] == float(distance_to_score(np.array([5.0]))[0])
+    assert candidates[1]['features']['location_score'] == 0.5
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test(load_main()) if "main" in inspect.signature(test).parameters else test()
+    print("\n All distance tests passed")
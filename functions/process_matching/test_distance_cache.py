@@ -0,0 +1,128 @@
+"""
+Tests for the geohash distance cache (distance_cache.py).
+
+Checks geohash encoding against reference values, LRU eviction, TTL expiry
+in both tiers, pruning of the SQLite tier, and that CachedDistanceProvider
+only sends misses to the wrapped provider. Local only (a temporary SQLite
+file, a counting provider and a patched clock):
+
+    python test_distance_cache.py
+"""
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+from distance import DistanceProvider
+from distance_cache import CachedDistanceProvider, DistanceCache, geohash_encode
+
+DAY = 24 * 3600
+
+
+class CountingProvider(DistanceProvider):
+    """Distance = destination latitude; destinations with latitude < 0 fail (NaN)."""
+
+    name = "counting"
+
+    def __init__(self):
+        self.calls = []
+
+    def distances_km(self, origin, destinations):
+        destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+        self.calls.append(len(destinations))
+        return np.where(destinations[:, 0] < 0, np.nan, destinations[:, 0])
+
+
+def clock(start: float = 1_000_000.0):
+    """Patch the cache's clock; returns the patcher and a mutable [now]."""
+    now = [start]
+    return mock.patch("distance_cache.time.time", side_effect=lambda: now[0]), now
+
+
+def disk_rows(path: str) -> list:
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT key FROM distance_cache ORDER BY key")]
+
+
+def test_geohash_reference_values():
+    assert geohash_encode(57.64911, 10.40744, precision=11) == "u4pruydqqvj"
+    assert geohash_encode(42.6, -5.6, precision=5) == "ezs42"
+    assert geohash_encode(0.0, 0.0, precision=1) == "s"
+    # Points ~10m apart share a precision-7 (~150m) cell; ~2km apart do not
+    assert geohash_encode(-12.12110, -77.02970) == geohash_encode(-12.12115, -77.02975)
+    assert geohash_encode(-12.1211, -77.0297) != geohash_encode(-12.1400, -77.0297)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = DistanceCache(path=None, max_memory_entries=2)
+    cache.put_many({"a": 1.0, "b": 2.0})
+    assert cache.get("a") == 1.0  # "a" is now the most recent
+    cache.put_many({"c": 3.0})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1.0 and cache.get("c") == 3.0
+    stats = cache.stats()
+    assert stats['memory_entries'] == 2 and stats['misses'] == 1 and stats['memory_hits'] == 3
+
+
+def test_entries_expire_after_ttl_in_both_tiers():
+    patcher, now = clock()
+    with tempfile.TemporaryDirectory() as tmp, patcher:
+        path = os.path.join(tmp, "cache.sqlite")
+        cache = DistanceCache(path=path, ttl_seconds=DAY)
+        cache.put_many({"a": 1.0})
+
+        # A new instance (cold memory tier) is served from disk, then from memory
+        restarted = DistanceCache(path=path, ttl_seconds=DAY)
+        assert restarted.get("a") == 1.0 and restarted.get("a") == 1.0
+        assert restarted.stats()['disk_hits'] == 1 and restarted.stats()['memory_hits'] == 1
+
+        now[0] += DAY + 1
+        assert cache.get("a") is None
+        assert DistanceCache(path=path, ttl_seconds=DAY).get("a") is None
+        # Expired in memory, then again on disk
+        assert cache.stats()['expired'] == 2
+
+
+def test_disk_tier_prunes_expired_and_oldest_rows():
+    patcher, now = clock()
+    with tempfile.TemporaryDirectory() as tmp, patcher:
+        path = os.path.join(tmp, "cache.sqlite")
+        # Prunes every max(1, 10 // 10) = 1 write
+        cache = DistanceCache(path=path, ttl_seconds=DAY, max_disk_entries=10)
+        cache.put_many({"expired": 1.0})
+        now[0] += DAY + 1
+        for i in range(12):
+            now[0] += 1
+            cache.put_many({f"key_{i:02d}": float(i)})
+
+        rows = disk_rows(path)
+        assert "expired" not in rows
+        assert rows == [f"key_{i:02d}" for i in range(2, 12)]
+
+
+def test_cached_provider_sends_only_misses():
+    provider = CountingProvider()
+    cached = CachedDistanceProvider(provider, DistanceCache(path=None))
+    origin = (-12.0464, -77.0428)
+    destinations = np.array([[1.0, 0.0], [2.0, 0.0], [-1.0, 0.0]])
+
+    first = cached.distances_km(origin, destinations)
+    assert first[:2].tolist() == [1.0, 2.0] and np.isnan(first[2])
+    assert provider.calls == [3]
+
+    # Same cells hit (a point a few metres away shares the cell); the failed lookup is retried
+    second = cached.distances_km(origin, np.array([[2.0, 0.0], [1.00001, 0.0], [-1.0, 0.0], [3.0, 0.0]]))
+    assert second[:2].tolist() == [2.0, 1.0] and np.isnan(second[2]) and second[3] == 3.0
+    assert provider.calls == [3, 2]
+    assert cached.cache.stats()['memory_hits'] == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All distance cache tests passed")
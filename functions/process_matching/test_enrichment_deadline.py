@@ -0,0 +1,131 @@
+"""
+Tests for bounded, deadline-limited enrichment.
+
+A fake Distance Matrix client answers some destinations instantly and stalls
+on others; enrichment must return within its stage deadline, with the stalled
+candidates keeping their haversine location score. No network access needed:
+
+    python test_enrichment_deadline.py
+"""
+import inspect
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+
+from conftest import StubGmapsClient, load_main
+from deadline import Deadline, run_bounded
+from distance import DrivingDistanceProvider
+
+SLOW_SECONDS = 3.0
+
+
+def stalling_client():
+    """Distance Matrix stand-in: destinations with latitude >= 41 stall for SLOW_SECONDS, the rest are 12 km."""
+    return StubGmapsClient(distance_km=12.0, stall_latitude=41, stall_seconds=SLOW_SECONDS, latency_seconds=0.02)
+
+
+def test_run_bounded_limits_concurrency_and_time():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(seconds):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(seconds)
+        with lock:
+            active[0] -= 1
+        return seconds
+
+    start = time.monotonic()
+    results, stats = run_bounded(work, [0.05] * 8 + [SLOW_SECONDS], max_concurrency=3, item_timeout=0.3)
+    elapsed = time.monotonic() - start
+
+    assert results[:8] == [0.05] * 8 and results[8] is None
+    assert stats == {'completed': 8, 'failed': 0, 'timed_out': 1, 'skipped': 0}, stats
+    assert peak[0] <= 3
+    assert elapsed < 1.0, elapsed
+
+
+def test_run_bounded_stops_at_deadline():
+    start = time.monotonic()
+    results, stats = run_bounded(
+        time.sleep, [SLOW_SECONDS] * 6, max_concurrency=2, deadline=Deadline(0.2)
+    )
+    elapsed = time.monotonic() - start
+    assert results == [None] * 6
+    assert stats['timed_out'] == 2 and stats['skipped'] == 4, stats
+    assert elapsed < 0.6, elapsed
+
+
+def test_driving_provider_marks_stalled_requests_unknown():
+    client = stalling_client()
+    provider = DrivingDistanceProvider(
+        client, destinations_per_request=1, max_concurrency=4, request_timeout=0.2, deadline=Deadline(1.0)
+    )
+    destinations = np.array([[40.40, -3.70], [41.50, -3.70], [40.45, -3.70], [41.60, -3.70]])
+
+    start = time.monotonic()
+    distances = provider.distances_km((40.41, -3.70), destinations)
+    elapsed = time.monotonic() - start
+
+    assert distances[0] == 12.0 and distances[2] == 12.0
+    assert np.isnan(distances[1]) and np.isnan(distances[3])
+    assert client.max_active <= 4
+    assert elapsed < 0.6, elapsed
+
+
+def test_enrichment_latency_is_bounded(main):
+    senior_data = {
+        'location': {'lat': 40.4168, 'lng': -3.7038},
+        'budget': 20,
+        'conditions': ['dementia'],
+    }
+    # Half the candidates sit where the fake client stalls
+    candidates = [
+        {
+            'id': f"caregiver_{i}",
+            'similarity': 0.8,
+            'metadata': {
+                'location': {'lat': 41.5 if i % 2 else 40.42, 'lng': -3.70},
+                'hourly_rate': 18,
+            },
+        }
+        for i in range(10)
+    ]
+    client = stalling_client()
+
+    with mock.patch.object(main, "DISTANCE_PROVIDER", "driving"), \
+            mock.patch.object(main, "DRIVING_DISTANCE_BATCH_SIZE", 1), \
+            mock.patch.object(main, "ENRICHMENT_MAX_CONCURRENCY", 4), \
+            mock.patch.object(main, "ENRICHMENT_ITEM_TIMEOUT_SECONDS", 5.0), \
+            mock.patch.object(main, "ENRICHMENT_STAGE_DEADLINE_SECONDS", 0.5), \
+            mock.patch.object(main, "distance_cache", main.DistanceCache(path=None)), \
+            mock.patch.object(main, "get_feature_store", return_value=None):
+        haversine = {
+            c['caregiver_id']: c['features']['location_score']
+            for c in main.enrich_candidates([dict(c) for c in candidates], senior_data, None)
+        }
+        start = time.monotonic()
+        enriched = main.enrich_candidates([dict(c) for c in candidates], senior_data, client, Deadline(30))
+        elapsed = time.monotonic() - start
+
+    # Bounded by the stage deadline, not by SLOW_SECONDS per stalled request
+    assert elapsed < 1.0, elapsed
+    assert len(enriched) == len(candidates)
+    for candidate in enriched:
+        index = int(candidate['caregiver_id'].split("_")[1])
+        if index % 2:
+            assert candidate['features']['location_score'] == haversine[candidate['caregiver_id']]
+        else:
+            assert abs(candidate['features']['location_score'] - main.distance_to_score(np.array([12.0]))[0]) < 1e-12
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test(load_main()) if "main" in inspect.signature(test).parameters else test()
+    print("\n All enrichment deadline tests passed")
@@ -0,0 +1,209 @@
+"""
+Tests for the caregiver feature store (feature_store.py).
+
+Checks that enrichment from the store gives the same features, with the same
+types, as enrichment from metadata; that caregivers edited after their row
+was built are scored from metadata instead; that incremental upserts record
+the new timestamps; and that a GCS snapshot download replaces the local copy
+only once complete. Local only (a temporary directory and a stubbed bucket):
+
+    python test_feature_store.py
+"""
+import inspect
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from conftest import load_main
+from feature_store import (
+    CaregiverFeatureStore,
+    load_feature_store,
+    upsert_caregivers,
+    write_feature_store,
+)
+
+BUILT = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+SENIOR = {
+    'location': {'lat': -12.0464, 'lng': -77.0428},
+    'availability': {'monday': {'morning': {'available': True, 'start': '08:00', 'end': '12:00'}}},
+    'conditions': ['dementia', 'diabetes'],
+    'budget': 30,
+}
+
+# Metadata as it comes out of jsonb: ints, floats, nulls and missing keys
+CAREGIVERS = {
+    'caregiver_int': {
+        'years_of_experience': 5,
+        'certifications': ['first_aid', 'nursing'],
+        'hourly_rate': 25,
+        'location': {'lat': -12.1211, 'lng': -77.0297},
+        'availability': {'monday': {'morning': {'available': True, 'start': '09:00', 'end': '13:00'}}},
+        'specializations': ['dementia'],
+    },
+    'caregiver_float': {
+        'years_of_experience': 2.5,
+        'certifications': [],
+        'hourly_rate': 35.5,
+        'location': {'lat': -12.0900, 'lng': -77.0500},
+        'availability': {},
+        'specializations': ['dementia', 'diabetes', 'mobility'],
+    },
+    'caregiver_sparse': {
+        'years_of_experience': None,
+        'certifications': None,
+        'specializations': None,
+    },
+}
+
+
+def build_store(directory: str) -> CaregiverFeatureStore:
+    ids = list(CAREGIVERS)
+    write_feature_store(directory, ids, [CAREGIVERS[cid] for cid in ids], [BUILT] * len(ids))
+    return CaregiverFeatureStore(directory)
+
+
+def candidates(updated_at=BUILT, with_metadata=False):
+    return [
+        dict({'id': cid, 'similarity': 0.9 - 0.1 * i, 'updated_at': updated_at},
+             **({'metadata': CAREGIVERS[cid]} if with_metadata else {}))
+        for i, cid in enumerate(CAREGIVERS)
+    ]
+
+
+class StubBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def download_to_filename(self, path):
+        if os.path.basename(self.name) in self.bucket.failing:
+            raise ConnectionError(f"download of {self.name} interrupted")
+        with open(os.path.join(self.bucket.source, os.path.basename(self.name)), 'rb') as src, \
+                open(path, 'wb') as dst:
+            dst.write(src.read())
+
+
+class StubBucket:
+    """Serves the files of a local store directory as gs://bucket/prefix/<file>."""
+
+    def __init__(self, source, failing=()):
+        self.source = source
+        self.failing = set(failing)
+
+    def list_blobs(self, prefix):
+        return [StubBlob(self, prefix + filename) for filename in sorted(os.listdir(self.source))]
+
+
+def storage_client(bucket):
+    return mock.Mock(bucket=mock.Mock(return_value=bucket))
+
+
+def test_store_and_metadata_features_match(main):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = build_store(os.path.join(tmp, "store"))
+        from_store = main.enrich_candidates_from_store(candidates(), SENIOR, store)
+        from_metadata = main.enrich_candidates_from_metadata(candidates(with_metadata=True), SENIOR)
+
+    assert [c['caregiver_id'] for c in from_store] == [c['caregiver_id'] for c in from_metadata]
+    for store_candidate, metadata_candidate in zip(from_store, from_metadata):
+        store_features, metadata_features = store_candidate['features'], metadata_candidate['features']
+        assert store_features.keys() == metadata_features.keys()
+        for name, value in store_features.items():
+            assert type(value) is type(metadata_features[name]), (store_candidate['caregiver_id'], name)
+            # hourly_rate is stored as float32
+            assert abs(value - metadata_features[name]) < 1e-6, (store_candidate['caregiver_id'], name)
+
+    by_id = {c['caregiver_id']: c['features'] for c in from_store}
+    assert by_id['caregiver_int']['years_experience'] == 5.0
+    assert by_id['caregiver_int']['certification_count'] == 2
+    assert by_id['caregiver_sparse']['years_experience'] == 0.0
+
+
+def test_stale_rows_are_scored_from_metadata(main):
+    edited = dict(CAREGIVERS['caregiver_int'], years_of_experience=12)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = build_store(os.path.join(tmp, "store"))
+        assert store.is_current('caregiver_int', BUILT) and store.is_current('caregiver_int', None)
+        assert not store.is_current('caregiver_int', BUILT + timedelta(seconds=1))
+        assert not store.is_current('caregiver_new', None)
+
+        current = candidates()
+        current[0]['updated_at'] = BUILT + timedelta(minutes=5)
+        with mock.patch.object(main, "get_feature_store", return_value=store), \
+                mock.patch.object(main, "fetch_caregiver_metadata",
+                                  return_value={'caregiver_int': edited}) as fetch:
+            main.attach_missing_metadata(current, store)
+            enriched = main.enrich_candidates(current, SENIOR, gmaps_client=None)
+
+    fetch.assert_called_once_with(['caregiver_int'])
+    by_id = {c['caregiver_id']: c for c in enriched}
+    assert by_id['caregiver_int']['features']['years_experience'] == 12.0
+    assert by_id['caregiver_int']['metadata'] == edited
+    assert by_id['caregiver_float']['metadata'] == {}  # still served from the store
+
+
+def test_upsert_records_updated_at():
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "store")
+        build_store(directory)
+        later = BUILT + timedelta(hours=1)
+        upsert_caregivers(directory, {
+            'caregiver_int': dict(CAREGIVERS['caregiver_int'], specializations=['stroke']),
+            'caregiver_new': {'years_of_experience': 1},
+        }, {'caregiver_int': later, 'caregiver_new': later})
+
+        store = CaregiverFeatureStore(directory)
+        assert len(store) == 4 and 'stroke' in store.vocabulary
+        assert store.is_current('caregiver_int', later) and store.is_current('caregiver_new', later)
+        assert not store.is_current('caregiver_float', later)
+
+        # Rows written without a timestamp are only served when none is known
+        upsert_caregivers(directory, {'caregiver_float': CAREGIVERS['caregiver_float']})
+        store = CaregiverFeatureStore(directory)
+        assert store.is_current('caregiver_float') and not store.is_current('caregiver_float', BUILT)
+
+
+def test_gcs_download_replaces_local_copy_only_when_complete():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "published")
+        local_dir = os.path.join(tmp, "local", "caregiver_features")
+        build_store(source)
+
+        store = load_feature_store("gs://bucket/feature-store", local_dir, storage_client(StubBucket(source)))
+        assert len(store) == 3 and store.is_current('caregiver_int', BUILT)
+        before = sorted(os.listdir(local_dir))
+
+        # A newer snapshot whose download fails halfway leaves the old copy intact
+        write_feature_store(source, ['caregiver_other'], [{}])
+        failing = storage_client(StubBucket(source, failing={'location.npy'}))
+        try:
+            load_feature_store("gs://bucket/feature-store", local_dir, failing)
+            raise AssertionError("the failed download should raise")
+        except ConnectionError:
+            pass
+        assert sorted(os.listdir(local_dir)) == before
+        assert len(CaregiverFeatureStore(local_dir)) == 3
+        assert os.listdir(os.path.dirname(local_dir)) == ["caregiver_features"]
+
+        # A snapshot prefix without a manifest is rejected the same way
+        empty = os.path.join(tmp, "empty")
+        os.makedirs(empty)
+        try:
+            load_feature_store("gs://bucket/empty", local_dir, storage_client(StubBucket(empty)))
+            raise AssertionError("a snapshot without a manifest should raise")
+        except FileNotFoundError:
+            pass
+        assert len(CaregiverFeatureStore(local_dir)) == 3
+
+        store = load_feature_store("gs://bucket/feature-store", local_dir, storage_client(StubBucket(source)))
+        assert len(store) == 1 and 'caregiver_other' in store
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test(load_main()) if "main" in inspect.signature(test).parameters else test()
+    print("\n All feature store tests passed")
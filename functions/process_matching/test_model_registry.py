@@ -0,0 +1,180 @@
+"""
+Tests for the versioned ranking model cache (model_registry.py).
+
+Uses small LightGBM models trained in-process, an in-memory config document
+and a temporary directory for the local copies; no GCP access needed:
+
+    python test_model_registry.py
+"""
+import os
+import tempfile
+import time
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from model_registry import CURRENT_POINTER, ModelRegistry
+from scoring import FEATURE_COLUMNS, align_to_model, build_feature_matrix, predict_scores
+
+
+def train_model_str(columns, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.random((200, len(columns))), columns=columns)
+    y = X['similarity'] + 0.1 * rng.random(200)
+    params = {'objective': 'regression', 'num_leaves': 4, 'min_data_in_leaf': 5, 'verbose': -1, 'seed': seed}
+    return lgb.train(params, lgb.Dataset(X, y), num_boost_round=5).model_to_string()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStore:
+    """config/matching_model plus the model blobs it points to."""
+
+    def __init__(self):
+        self.config = None
+        self.blobs = {}
+        self.downloads = []
+
+    def deploy(self, version: str, seed: int = 0):
+        path = f"models/matching-model-{version}.txt"
+        self.blobs[path] = train_model_str(FEATURE_COLUMNS, seed)
+        self.config = {'model_version': version, 'model_path': path, 'ml_enabled': True}
+
+    def fetch_config(self):
+        return dict(self.config) if self.config else None
+
+    def download(self, path):
+        self.downloads.append(path)
+        return self.blobs.get(path)
+
+
+def make_registry(store, clock, local_dir=None):
+    return ModelRegistry(
+        store.fetch_config, store.download, local_dir=local_dir,
+        poll_interval=60, min_backoff=5, max_backoff=600, clock=clock,
+    )
+
+
+def test_first_load_and_hot_swap():
+    store, clock = FakeStore(), FakeClock()
+    store.deploy("v1", seed=1)
+    registry = make_registry(store, clock)
+
+    first = registry.get()
+    assert first.version == "v1" and store.downloads == ["models/matching-model-v1.txt"]
+
+    # Within the poll interval the config is not re-read
+    store.deploy("v2", seed=2)
+    clock.now = 30
+    assert registry.get() is first
+
+    # A due poll swaps on a background thread; callers keep the old model until then
+    clock.now = 61
+    registry.get()
+    for _ in range(100):
+        if registry.get().version == "v2":
+            break
+        time.sleep(0.01)
+    assert registry.get().version == "v2"
+
+    # Same version: nothing is downloaded again
+    clock.now = 200
+    assert registry.refresh() is False
+    assert len(store.downloads) == 2
+
+
+def test_failed_loads_back_off():
+    store, clock = FakeStore(), FakeClock()
+    store.config = {'model_version': "v1", 'model_path': "models/missing.txt"}
+    registry = make_registry(store, clock)
+
+    assert registry.get() is None
+    assert registry.stats()['failures'] == 1 and len(store.downloads) == 1
+
+    # Negative cache: requests inside the backoff do not retry
+    clock.now = 4
+    for _ in range(10):
+        assert registry.get() is None
+    assert len(store.downloads) == 1
+
+    clock.now = 5
+    assert registry.refresh() is False
+    assert registry.stats()['failures'] == 2
+    assert not registry._refresh_due()
+    clock.now = 5 + 10
+    assert registry._refresh_due()
+
+    store.deploy("v1")
+    assert registry.refresh() is True
+    assert registry.get().version == "v1" and registry.stats()['failures'] == 0
+
+
+def test_restart_serves_local_copy_without_download():
+    store, clock = FakeStore(), FakeClock()
+    store.deploy("v1", seed=1)
+    with tempfile.TemporaryDirectory() as local_dir:
+        make_registry(store, clock, local_dir).get()
+        assert os.path.exists(os.path.join(local_dir, CURRENT_POINTER))
+
+        store.downloads.clear()
+        store.config = None  # config unavailable at startup
+        restarted = make_registry(store, clock, local_dir)
+        clock.now = 1  # not yet due, so no background poll either
+        restarted._checked_at = clock.now
+        assert restarted.get().version == "v1"
+        assert store.downloads == []
+
+        # Only the newest copies are kept
+        for version in ("v2", "v3", "v4"):
+            store.deploy(version)
+            restarted.refresh()
+        copies = [name for name in os.listdir(local_dir) if name.startswith("model-")]
+        assert len(copies) == 2 and "model-v4.txt" in copies
+
+
+def test_ml_disabled_serves_heuristic():
+    store, clock = FakeStore(), FakeClock()
+    store.deploy("v1")
+    with tempfile.TemporaryDirectory() as local_dir:
+        registry = make_registry(store, clock, local_dir)
+        assert registry.get().version == "v1"
+        store.config['ml_enabled'] = False
+        assert registry.refresh() is True
+        assert registry.get() is None
+        assert not os.path.exists(os.path.join(local_dir, CURRENT_POINTER))
+
+
+def test_align_to_training_features():
+    # Models from retrain_ranking_model also use past_rating, which serving fills with 0
+    training_columns = FEATURE_COLUMNS + ['past_rating']
+    model = lgb.Booster(model_str=train_model_str(training_columns))
+    features = [
+        {'similarity': 0.9, 'location_score': 0.5, 'price_score': 1.0, 'years_experience': 3},
+        {'similarity': 0.2, 'availability_score': 0.4},
+    ]
+    matrix = build_feature_matrix(features)
+
+    aligned = align_to_model(model, matrix)
+    assert aligned.shape == (2, len(training_columns))
+    assert np.array_equal(aligned[:, :len(FEATURE_COLUMNS)], matrix) and not aligned[:, -1].any()
+
+    expected = model.predict(pd.DataFrame(aligned, columns=training_columns))
+    assert np.allclose(predict_scores(model, matrix), expected)
+
+    same = lgb.Booster(model_str=train_model_str(FEATURE_COLUMNS))
+    assert align_to_model(same, matrix) is matrix
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All model registry tests passed")
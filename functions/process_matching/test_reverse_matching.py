@@ -0,0 +1,169 @@
+"""
+Tests for reverse matching (reverse_matching.py).
+
+Checks that a caregiver is only spliced into lists it can enter, that a list
+is reported changed only when its caregivers or the caregiver's own match
+changed, that only the documents whose rank moved are written, and that the
+reverse pair features match the forward path for the same (senior,
+caregiver) pair.
+
+    python test_reverse_matching.py
+"""
+import numpy as np
+
+from availability import availability_overlap_scores, compile_availability, stack_masks
+from distance import HaversineDistanceProvider, distance_to_score, haversine_km
+from reverse_matching import (
+    SeniorMatrix,
+    caregiver_pair_features,
+    candidate_rows,
+    list_may_change,
+    match_document_writes,
+    splice_match,
+)
+from scoring import FEATURE_COLUMNS, price_compatibility_scores
+
+MAX_MATCHES = 10
+
+
+def make_list(count: int, prefix: str = "caregiver"):
+    return [
+        {'caregiver_id': f"{prefix}_{i}", 'final_score': 0.9 - i * 0.05}
+        for i in range(count)
+    ]
+
+
+def test_new_caregiver_beats_last_score():
+    current = make_list(MAX_MATCHES)
+    new_match = {'caregiver_id': "new", 'final_score': 0.82}
+    updated, changed, recompute = splice_match(current, new_match, "new", MAX_MATCHES)
+
+    assert [m['caregiver_id'] for m in updated][:4] == ["caregiver_0", "caregiver_1", "new", "caregiver_2"]
+    assert len(updated) == MAX_MATCHES
+    assert changed is True
+    assert not recompute
+
+
+def test_new_caregiver_below_last_score_changes_nothing():
+    current = make_list(MAX_MATCHES)
+    new_match = {'caregiver_id': "new", 'final_score': 0.1}
+    updated, changed, _ = splice_match(current, new_match, "new", MAX_MATCHES)
+    assert updated == current and changed is False
+
+
+def test_short_list_appends():
+    current = make_list(3)
+    updated, changed, _ = splice_match(current, {'caregiver_id': "new", 'final_score': 0.1}, "new", MAX_MATCHES)
+    assert updated[-1]['caregiver_id'] == "new" and changed is True
+
+
+def test_listed_caregiver_rescored_in_place():
+    current = make_list(5)
+    new_match = {'caregiver_id': "caregiver_2", 'final_score': 0.79}
+    updated, changed, _ = splice_match(current, new_match, "caregiver_2", MAX_MATCHES)
+    assert [m['caregiver_id'] for m in updated] == [m['caregiver_id'] for m in current]
+    assert changed is True
+
+
+def test_removed_from_full_list_needs_recompute():
+    current = make_list(MAX_MATCHES)
+    updated, changed, recompute = splice_match(current, None, "caregiver_8", MAX_MATCHES)
+    assert len(updated) == MAX_MATCHES - 1
+    assert changed is True
+    assert recompute
+
+    _, _, recompute = splice_match(make_list(4), None, "caregiver_1", MAX_MATCHES)
+    assert not recompute
+
+    # Dropping a caregiver that was never listed leaves the list alone
+    updated, changed, recompute = splice_match(current, None, "other", MAX_MATCHES)
+    assert updated == current and changed is False and not recompute
+
+
+def test_shifted_caregivers_only_get_a_rank_update():
+    current = make_list(MAX_MATCHES)
+    new_match = {'caregiver_id': "new", 'final_score': 0.82}
+    updated, _, _ = splice_match(current, new_match, "new", MAX_MATCHES)
+    upserts, rank_moves, removals = match_document_writes(current, updated, "new")
+    assert upserts == [(3, new_match)]
+    assert rank_moves == {f"caregiver_{i}": i + 2 for i in range(2, MAX_MATCHES - 1)}
+    assert removals == [f"caregiver_{MAX_MATCHES - 1}"]
+
+    # Re-scored in place: only its own document is written
+    rescored = {'caregiver_id': "caregiver_2", 'final_score': 0.79}
+    updated, _, _ = splice_match(current, rescored, "caregiver_2", MAX_MATCHES)
+    assert match_document_writes(current, updated, "caregiver_2") == ([(3, rescored)], {}, [])
+
+
+def test_only_lists_that_can_change_are_selected():
+    full = make_list(MAX_MATCHES)
+    seniors = SeniorMatrix([
+        ("full", {'embedding': [1.0, 0.0], 'match_count': MAX_MATCHES,
+                  'match_min_score': full[-1]['final_score'],
+                  'match_caregiver_ids': [m['caregiver_id'] for m in full]}),
+        ("short", {'embedding': [1.0, 0.0], 'match_count': 2, 'match_min_score': 0.9,
+                   'match_caregiver_ids': ["a", "b"]}),
+        ("listing", {'embedding': [0.0, 1.0], 'match_count': MAX_MATCHES, 'match_min_score': 0.8,
+                     'match_caregiver_ids': ["caregiver_new"]}),
+        ("never_matched", {'embedding': [1.0, 0.0]}),
+        ("no_embedding", {}),
+    ])
+    assert seniors.ids == ["full", "short", "listing", "never_matched"]
+
+    similarities = seniors.embeddings @ np.array([1.0, 0.0], dtype=np.float32)
+    rows = candidate_rows(seniors, "caregiver_new", similarities, 0.6)
+    assert rows.tolist() == [0, 1, 2, 3]
+
+    # Below the full list's last score: only the short, listing and empty lists may change
+    scores = np.full(len(rows), 0.3)
+    mask = list_may_change(seniors, "caregiver_new", rows, scores, MAX_MATCHES)
+    assert [seniors.ids[row] for row in rows[mask]] == ["short", "listing", "never_matched"]
+
+    seniors.record_matches("listing", [])
+    assert 2 not in seniors.listed_in["caregiver_new"]
+    assert candidate_rows(seniors, "caregiver_new", similarities, 0.6).tolist() == [0, 1, 3]
+
+
+def test_pair_features_match_forward_path():
+    senior_availability = {'monday': {'start': '08:00', 'end': '12:00'}}
+    caregiver_availability = {'monday': {'start': '10:00', 'end': '18:00'}}
+    seniors = SeniorMatrix([
+        ("senior", {
+            'embedding': [1.0, 0.0],
+            'location': {'lat': 40.4168, 'lng': -3.7038},
+            'availability': senior_availability,
+            'conditions': ['dementia', 'mobility'],
+            'budget': 20,
+        }),
+    ])
+    caregiver = {
+        'location': {'lat': 40.4500, 'lng': -3.6900},
+        'availability': caregiver_availability,
+        'specializations': ['dementia'],
+        'hourly_rate': 18,
+        'years_of_experience': 6,
+        'certifications': ['cpr', 'first_aid'],
+    }
+    features = caregiver_pair_features(
+        seniors, np.array([0]), np.array([0.8]), caregiver, HaversineDistanceProvider()
+    )[0]
+    by_name = dict(zip(FEATURE_COLUMNS, features))
+
+    expected_availability = availability_overlap_scores(
+        compile_availability(senior_availability),
+        stack_masks([compile_availability(caregiver_availability)]),
+    )[0]
+    assert abs(by_name['availability_score'] - expected_availability) < 1e-12
+    assert by_name['specialization_score'] == 0.5
+    assert abs(by_name['price_score'] - price_compatibility_scores(20, 18)) < 1e-12
+    assert by_name['years_experience'] == 6 and by_name['certification_count'] == 2
+    expected_location = distance_to_score(haversine_km(40.4168, -3.7038, np.array([40.45]), np.array([-3.69])))[0]
+    assert abs(by_name['location_score'] - expected_location) < 1e-12 and expected_location != 0.5
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All reverse matching tests passed")
@@ -0,0 +1,144 @@
+"""
+Tests for store_matches against the Firestore emulator.
+
+Counts the RPCs issued by store_matches: replacing a senior's matches must be
+exactly one commit, with no reads. Skipped unless FIRESTORE_EMULATOR_HOST is set:
+
+    gcloud emulators firestore start --host-port=localhost:8086
+    FIRESTORE_EMULATOR_HOST=localhost:8086 python test_store_matches.py
+"""
+import os
+from collections import Counter
+from unittest import mock
+
+import pytest
+
+from conftest import load_main
+
+COUNTED_RPCS = ("commit", "batch_write", "batch_get_documents", "run_query", "list_documents")
+
+requires_emulator = pytest.mark.skipif(
+    not os.environ.get("FIRESTORE_EMULATOR_HOST"), reason="FIRESTORE_EMULATOR_HOST not set"
+)
+
+
+def load_emulator_main():
+    """main.py with a real Firestore client (talking to the emulator) and stubbed Tasks/Storage clients."""
+    main = load_main(stub_firestore=False)
+    assert not isinstance(main.db, mock.Mock), "main.db is not a real Firestore client"
+    return main
+
+
+@pytest.fixture
+def main():
+    return load_emulator_main()
+
+
+def count_rpcs(client) -> Counter:
+    """Wrap the client's Firestore API methods and count calls."""
+    calls = Counter()
+    api = client._firestore_api
+    for name in COUNTED_RPCS:
+        original = getattr(api, name)
+
+        def counted(*args, _name=name, _original=original, **kwargs):
+            calls[_name] += 1
+            return _original(*args, **kwargs)
+
+        setattr(api, name, counted)
+    return calls
+
+
+def make_matches(count: int, prefix: str = "caregiver"):
+    return [
+        {
+            'caregiver_id': f"{prefix}_{i}",
+            'final_score': 1.0 - i * 0.05,
+            'score_type': 'heuristic',
+            'similarity': 0.9 - i * 0.01,
+            'features': {'similarity': 0.9 - i * 0.01},
+        }
+        for i in range(count)
+    ]
+
+
+def stored(main, senior_id: str) -> dict:
+    matches_ref = main.db.collection('seniors').document(senior_id).collection('matches')
+    return {doc.id: doc.to_dict() for doc in matches_ref.stream()}
+
+
+@requires_emulator
+def test_replaces_matches_in_one_commit(main):
+    senior_id = "senior_store_matches"
+    senior_ref = main.db.collection('seniors').document(senior_id)
+    senior_ref.set({'name': 'Test'})
+    main.store_matches(senior_id, make_matches(10, "old"), senior_data={'match_caregiver_ids': []})
+
+    calls = count_rpcs(main.db)
+    main.store_matches(senior_id, make_matches(7), senior_data=senior_ref.get().to_dict())
+    assert dict(calls) == {"commit": 1}, calls
+
+    matches = stored(main, senior_id)
+    assert sorted(matches) == sorted(f"caregiver_{i}" for i in range(7))
+    assert matches['caregiver_0']['rank'] == 1
+    assert matches['caregiver_6']['rank'] == 7
+
+    senior = senior_ref.get().to_dict()
+    assert senior['match_status'] == 'ready'
+    assert senior['match_count'] == 7
+    assert senior['match_caregiver_ids'] == [f"caregiver_{i}" for i in range(7)]
+    assert abs(senior['match_min_score'] - 0.7) < 1e-9
+
+
+@requires_emulator
+def test_removes_legacy_match_documents_once(main):
+    senior_id = "senior_legacy_matches"
+    senior_ref = main.db.collection('seniors').document(senior_id)
+    senior_ref.set({'name': 'Legacy'})
+    for i in range(3):
+        senior_ref.collection('matches').add({'caregiver_id': f"legacy_{i}", 'rank': i + 1})
+
+    calls = count_rpcs(main.db)
+    main.store_matches(senior_id, make_matches(2), senior_data=senior_ref.get().to_dict())
+    assert dict(calls) == {"list_documents": 1, "commit": 1}, calls
+    assert sorted(stored(main, senior_id)) == ["caregiver_0", "caregiver_1"]
+
+
+@requires_emulator
+def test_client_fields_survive_rematch(main):
+    senior_id = "senior_kept_status"
+    senior_ref = main.db.collection('seniors').document(senior_id)
+    senior_ref.set({'name': 'Kept'})
+    main.store_matches(senior_id, make_matches(3), senior_data={'match_caregiver_ids': []})
+    # What MatchCard writes, and a rating used as a training label
+    matches_ref = senior_ref.collection('matches')
+    matches_ref.document("caregiver_1").update({'status': 'interested', 'rating': 5})
+
+    main.store_matches(senior_id, list(reversed(make_matches(3))), senior_data=senior_ref.get().to_dict())
+    kept = stored(main, senior_id)["caregiver_1"]
+    assert kept['status'] == 'interested' and kept['rating'] == 5
+    assert kept['rank'] == 2
+
+
+@requires_emulator
+def test_no_matches_clears_previous(main):
+    senior_id = "senior_cleared_matches"
+    senior_ref = main.db.collection('seniors').document(senior_id)
+    senior_ref.set({'name': 'Cleared'})
+    main.store_matches(senior_id, make_matches(5), senior_data={'match_caregiver_ids': []})
+
+    main.store_matches(senior_id, [], senior_data=senior_ref.get().to_dict())
+    assert stored(main, senior_id) == {}
+    senior = senior_ref.get().to_dict()
+    assert senior['match_count'] == 0 and senior['match_min_score'] is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+                print("  skipped (FIRESTORE_EMULATOR_HOST not set)")
+                continue
+            test(load_emulator_main())
+    print("\n All store_matches tests passed")
@@ -0,0 +1,282 @@
+"""
+Tests for the two-phase matching pipeline: time budgets, task queues, and the
+fast path handing off to the async worker through the local queue.
+
+Runs without GCP services (the Firestore, Tasks and Storage clients are mocked):
+
+    python test_task_queue.py
+"""
+import inspect
+import json
+import time
+from unittest import mock
+
+from google.api_core.exceptions import FailedPrecondition
+
+from conftest import load_main
+from deadline import Deadline, DeadlineExceeded
+from task_queue import CloudTasksQueue, LocalTaskQueue
+
+
+def test_deadline():
+    deadline = Deadline(0.05)
+    deadline.check("first")
+    assert 0 < deadline.remaining() <= 0.05
+    time.sleep(0.06)
+    assert deadline.expired and deadline.remaining() == 0.0
+    try:
+        deadline.check("second")
+    except DeadlineExceeded as e:
+        assert e.stage == "second"
+    else:
+        raise AssertionError("expected DeadlineExceeded")
+
+    unlimited = Deadline(None)
+    unlimited.check("any")
+    assert unlimited.remaining() == float("inf") and not unlimited.expired
+
+
+def test_local_queue_runs_tasks_in_order():
+    seen = []
+    queue = LocalTaskQueue(lambda payload: seen.append(payload["n"]) or payload["n"] * 2)
+    names = [queue.enqueue({"n": n}) for n in range(3)]
+    assert len(set(names)) == 3 and seen == []
+    assert queue.drain() == [0, 2, 4]
+    assert seen == [0, 1, 2] and not queue.pending
+
+
+def test_local_queue_isolates_failures():
+    def handler(payload):
+        if payload["fail"]:
+            raise RuntimeError("boom")
+        return "ok"
+
+    queue = LocalTaskQueue(handler)
+    queue.enqueue({"fail": True})
+    queue.enqueue({"fail": False})
+    first, second = queue.drain()
+    assert isinstance(first, RuntimeError) and second == "ok"
+
+
+def test_cloud_tasks_request():
+    client = mock.Mock()
+    client.queue_path.return_value = "projects/p/locations/l/queues/q"
+    client.create_task.return_value.name = "projects/p/locations/l/queues/q/tasks/1"
+    queue = CloudTasksQueue(client, "p", "l", "q", "https://worker", "worker@p.iam.gserviceaccount.com")
+
+    assert queue.enqueue({"senior_id": "s1"}).endswith("/tasks/1")
+    request = client.create_task.call_args.kwargs["request"]
+    http_request = request["task"]["http_request"]
+    assert request["parent"] == "projects/p/locations/l/queues/q"
+    assert http_request["url"] == "https://worker"
+    assert json.loads(http_request["body"]) == {"senior_id": "s1"}
+    assert http_request["oidc_token"]["audience"] == "https://worker"
+
+
+def queue_event(queue_id: str, senior_id: str, status: str = "queued"):
+    """The event for a queue document as onboarding writes it (ReviewStep / FamilyContactStep)."""
+    event = mock.Mock()
+    event.data = {"value": {
+        "name": f"projects/p/databases/(default)/documents/matching_queue/{queue_id}",
+        "fields": {
+            "seniorId": {"stringValue": senior_id},
+            "status": {"stringValue": status},
+            "createdAt": {"timestampValue": "2025-01-01T00:00:00Z"},
+        },
+    }}
+    return event
+
+
+def test_fast_path_offloads_when_budget_is_spent(main):
+    senior = mock.Mock(exists=True)
+    senior.to_dict.return_value = {"embedding": [0.1] * 4, "budget": 20, "match_caregiver_ids": []}
+    candidates = [
+        {"id": f"caregiver_{i}", "similarity": 0.7 + i * 0.01, "metadata": {"hourly_rate": 15 + i}}
+        for i in range(5)
+    ]
+    stored = []
+    queue = LocalTaskQueue(main.run_async_matching)
+
+    with mock.patch.object(main, "task_queue", queue), \
+            mock.patch.object(main, "FAST_PATH_BUDGET_SECONDS", 0.0), \
+            mock.patch.object(main, "load_ml_model", return_value=(None, None)), \
+            mock.patch.object(main, "get_feature_store", return_value=None), \
+            mock.patch.object(main, "find_candidates", side_effect=lambda *a: [dict(c) for c in candidates]), \
+            mock.patch.object(main, "store_matches",
+                              side_effect=lambda senior_id, matches, data=None, match_status="ready":
+                              stored.append((match_status, matches))), \
+            mock.patch.object(main, "send_push_notification"):
+        main.db.collection.return_value.document.return_value.get.return_value = senior
+        main.process_matching(queue_event("queue_1", "senior_1"))
+
+        # Fast path: embedding-only ranking, worker not yet run
+        assert len(stored) == 1 and len(queue.pending) == 1
+        status, partial = stored[0]
+        assert status == "partial"
+        assert [m["caregiver_id"] for m in partial] == [f"caregiver_{i}" for i in reversed(range(5))]
+        assert all(m["score_type"] == "similarity" for m in partial)
+
+        # Worker: same pipeline, full features and model/heuristic scores
+        [report] = queue.drain()
+        assert report["senior_id"] == "senior_1" and report["matches"] == 5
+        status, final = stored[1]
+        assert status == "ready"
+        assert all(m["score_type"] == "heuristic" and "price_score" in m["features"] for m in final)
+
+
+def test_queued_and_pending_requests_start_matching(main):
+    request = mock.Mock(exists=True, update_time="t1")
+    request.to_dict.return_value = {"seniorId": "senior_2", "status": "queued"}
+    main.db.collection.return_value.document.return_value.get.return_value = request
+    for status in ("queued", "pending"):
+        with mock.patch.object(main, "prepare_matching", return_value=None) as prepare:
+            main.process_matching(queue_event("queue_2", "senior_2", status))
+        prepare.assert_called_once_with("senior_2", "queue_2")
+
+
+def test_requests_with_nothing_to_rank_are_settled(main):
+    queue_ref = mock.Mock()
+    seniors = {}
+    main.db.collection.side_effect = lambda name: mock.Mock(**{
+        "document.side_effect": lambda doc_id: queue_ref if name == "matching_queue" else seniors[doc_id],
+    })
+    seniors["gone"] = mock.Mock(**{"get.return_value": mock.Mock(exists=False)})
+    seniors["no_embedding"] = mock.Mock(**{"get.return_value.to_dict.return_value": {"budget": 20}})
+    seniors["no_candidates"] = mock.Mock(**{"get.return_value.to_dict.return_value": {"embedding": [0.1]}})
+
+    # Missing senior or embedding: the claimed request is marked 'error'
+    for senior_id, message in [("gone", "Senior not found"), ("no_embedding", "No embedding found for senior")]:
+        queue_ref.reset_mock()
+        assert main.prepare_matching(senior_id, "queue_4") is None
+        update = queue_ref.update.call_args.args[0]
+        assert update["status"] == "error" and update["error_message"] == message
+
+    # No candidates: the senior is marked 'no_matches' and the request retired
+    queue_ref.reset_mock()
+    with mock.patch.object(main, "find_candidates", return_value=[]):
+        assert main.prepare_matching("no_candidates", "queue_4") is None
+    queue_ref.delete.assert_called_once_with()
+    queue_ref.update.assert_not_called()
+    assert seniors["no_candidates"].update.call_args.args[0]["match_status"] == "no_matches"
+
+
+def test_last_async_attempt_marks_the_request_failed(main):
+    request = mock.Mock()
+    request.get_json.return_value = {"queue_id": "queue_5", "senior_id": "senior_5"}
+    queue_ref = main.db.collection.return_value.document.return_value
+
+    with mock.patch.object(main, "run_async_matching", side_effect=RuntimeError("model failed")):
+        for retry_count, final in [("0", False), (str(main.ASYNC_MAX_ATTEMPTS - 1), True)]:
+            queue_ref.reset_mock()
+            request.headers = {"X-CloudTasks-TaskRetryCount": retry_count}
+            assert main.process_matching_async(request)[1] == 500
+            if final:
+                update = queue_ref.update.call_args.args[0]
+                assert update["status"] == "error" and update["error_message"] == "model failed"
+            else:
+                queue_ref.update.assert_not_called()
+
+
+def test_status_updates_do_not_restart_matching(main):
+    for status in ("processing", "error"):
+        with mock.patch.object(main, "prepare_matching") as prepare:
+            main.process_matching(queue_event("queue_2", "senior_2", status))
+        prepare.assert_not_called()
+
+
+def test_queue_document_is_claimed_once(main):
+    request = mock.Mock(exists=True, update_time="t1")
+    request.to_dict.return_value = {"seniorId": "senior_3", "status": "pending"}
+    # The second writer's precondition fails: the document changed after its read
+    request.reference.update.side_effect = [None, FailedPrecondition("changed")]
+    assert main.claim_queue_document(request, "trigger")
+    assert not main.claim_queue_document(request, "batch")
+    assert request.reference.update.call_args_list[0].args[0]["status"] == "processing"
+
+    claimed = mock.Mock(exists=True)
+    claimed.to_dict.return_value = {"seniorId": "senior_3", "status": "processing"}
+    assert not main.claim_queue_document(claimed, "batch")
+    claimed.reference.update.assert_not_called()
+
+
+def test_batch_drain_skips_requests_claimed_by_the_trigger(main):
+    docs = []
+    for queue_id, senior_id, status in [("queue_a", "senior_a", "queued"), ("queue_b", "senior_b", "queued")]:
+        doc = mock.Mock(exists=True, id=queue_id, update_time="t1")
+        doc.to_dict.return_value = {"seniorId": senior_id, "status": status}
+        docs.append(doc)
+    docs[1].reference.update.side_effect = FailedPrecondition("claimed by the trigger")
+    main.db.collection.return_value.where.return_value.limit.return_value.stream.return_value = docs
+    main.db.get_all.return_value = []
+
+    _, queue_ids, _ = main.load_batch_seniors({})
+    assert queue_ids == {"senior_a": "queue_a"}
+    status_filter = main.db.collection.return_value.where.call_args.kwargs["filter"]
+    assert "queued" in status_filter.value
+
+
+def batch_drain(main, seniors):
+    """Claimable queue documents queue_<x> for senior_<x> in seniors; returns {collection: {doc_id: ref}}."""
+    docs = []
+    for senior_id in seniors:
+        doc = mock.Mock(exists=True, id=senior_id.replace("senior", "queue"), update_time="t1")
+        doc.to_dict.return_value = {"seniorId": senior_id, "status": "queued"}
+        docs.append(doc)
+    refs = {"seniors": {}, "matching_queue": {}}
+    main.db.collection.side_effect = lambda name: mock.Mock(**{
+        "document.side_effect": lambda doc_id: refs[name].setdefault(doc_id, mock.Mock(id=doc_id)),
+        "where.return_value.limit.return_value.stream.return_value": docs,
+    })
+    return refs
+
+
+def snapshot(senior_id, data=None):
+    snap = mock.Mock(exists=data is not None, id=senior_id)
+    snap.to_dict.return_value = data
+    return snap
+
+
+def test_batch_drain_marks_missing_seniors_as_errors(main):
+    batch_drain(main, ["senior_gone", "senior_bare"])
+    main.db.get_all.return_value = [snapshot("senior_gone"), snapshot("senior_bare", {"budget": 20})]
+    request = mock.Mock(**{"get_json.return_value": {}})
+    body, status, _ = main.process_matching_batch(request)
+
+    assert status == 200
+    report = json.loads(body)
+    assert report["missing"] == 1 and report["skipped"] == 1 and report["seniors"] == 0
+    updates = {call.args[0].id: call.args[1] for call in main.db.batch.return_value.update.call_args_list}
+    assert updates["queue_gone"]["status"] == "error" and updates["queue_gone"]["error_message"] == "Senior not found"
+    assert updates["queue_bare"]["error_message"] == "No embedding found for senior"
+
+
+def test_batch_failure_does_not_strand_claimed_requests(main):
+    refs = batch_drain(main, ["senior_a", "senior_b"])
+    main.db.get_all.return_value = [snapshot("senior_a", {"embedding": [0.1]}), snapshot("senior_b", {"embedding": [0.2]})]
+    request = mock.Mock(**{"get_json.return_value": {}})
+    with mock.patch.object(main, "find_candidates_batch", side_effect=RuntimeError("index failed")):
+        body, status = main.process_matching_batch(request)
+
+    assert status == 500 and body == "index failed"
+    for queue_id in ("queue_a", "queue_b"):
+        update = refs["matching_queue"][queue_id].update.call_args.args[0]
+        assert update["status"] == "error" and update["error_message"] == "index failed"
+
+    # The senior read itself failing after the claim
+    main.db.get_all.side_effect = RuntimeError("read failed")
+    for ref in refs["matching_queue"].values():
+        ref.reset_mock()
+    try:
+        main.load_batch_seniors({})
+        raise AssertionError("the failed read should raise")
+    except RuntimeError:
+        pass
+    assert refs["matching_queue"]["queue_a"].update.call_args.args[0]["error_message"] == "read failed"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test(load_main()) if "main" in inspect.signature(test).parameters else test()
+    print("\n All task queue tests passed")
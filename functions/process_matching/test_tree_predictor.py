@@ -0,0 +1,99 @@
+"""
+Parity tests for the compiled tree-ensemble predictor (tree_predictor.py).
+
+Every compiled model must score exactly like Booster.predict, including
+missing values and the training-time features serving fills in:
+
+    python test_tree_predictor.py
+"""
+import lightgbm as lgb
+import numpy as np
+
+from scoring import FEATURE_COLUMNS, predict_scores
+from tree_predictor import UnsupportedModel, compile_booster
+
+TOLERANCE = 1e-9
+
+
+def make_data(rng: np.random.Generator, n: int, missing: float = 0.0):
+    X = rng.random((n, len(FEATURE_COLUMNS)))
+    X[:, 5] = rng.integers(0, 25, n)   # years_experience
+    X[:, 6] = rng.integers(0, 6, n)    # certification_count
+    if missing:
+        X[rng.random(X.shape) < missing] = np.nan
+        X[rng.random(X.shape) < missing] = 0.0
+    return X
+
+
+def train(params: dict, X: np.ndarray, label: np.ndarray, group=None, rounds: int = 40) -> lgb.Booster:
+    train_data = lgb.Dataset(X, label=label, group=group, feature_name=FEATURE_COLUMNS)
+    return lgb.train({'verbose': -1, 'num_leaves': 31, **params}, train_data, num_boost_round=rounds)
+
+
+def assert_parity(model: lgb.Booster, X: np.ndarray):
+    compiled = compile_booster(model)
+    diff = np.abs(compiled.predict(X) - model.predict(X)).max()
+    assert diff < TOLERANCE, diff
+
+
+def test_lambdarank_parity():
+    rng = np.random.default_rng(0)
+    X = make_data(rng, 2000)
+    model = train({'objective': 'lambdarank'}, X, rng.integers(1, 6, len(X)), group=[20] * 100)
+    for n in (1, 50, 1000):
+        assert_parity(model, make_data(rng, n))
+
+
+def test_missing_value_parity():
+    rng = np.random.default_rng(1)
+    X = make_data(rng, 2000, missing=0.1)
+    y = np.nan_to_num(X[:, 0]) + 0.3 * rng.random(len(X))
+    for params in ({'objective': 'regression'},
+                   {'objective': 'regression', 'zero_as_missing': True},
+                   {'objective': 'regression', 'use_missing': False}):
+        assert_parity(train(params, X, y), make_data(rng, 500, missing=0.2))
+
+
+def test_binary_and_stumps_parity():
+    rng = np.random.default_rng(2)
+    X = make_data(rng, 1000)
+    model = train({'objective': 'binary'}, X, (X[:, 0] > 0.5).astype(int))
+    assert_parity(model, make_data(rng, 200))
+
+    # Trees without splits (constant labels) are a single leaf
+    stumps = train({'objective': 'regression'}, X, np.ones(len(X)), rounds=3)
+    assert_parity(stumps, make_data(rng, 10))
+
+
+def test_predict_scores_aligns_training_features():
+    rng = np.random.default_rng(3)
+    columns = FEATURE_COLUMNS + ['past_rating']
+    X = np.hstack([make_data(rng, 1000), rng.random((1000, 1))])
+    model = lgb.train(
+        {'objective': 'regression', 'verbose': -1},
+        lgb.Dataset(X, label=X[:, 0] + X[:, -1], feature_name=columns),
+        num_boost_round=20,
+    )
+    features = make_data(rng, 50)
+    assert np.allclose(predict_scores(compile_booster(model), features), predict_scores(model, features),
+                       rtol=0, atol=TOLERANCE)
+
+
+def test_unsupported_models_are_rejected():
+    rng = np.random.default_rng(4)
+    X = make_data(rng, 600)
+    model = train({'objective': 'multiclass', 'num_class': 3}, X, rng.integers(0, 3, len(X)), rounds=2)
+    try:
+        compile_booster(model)
+    except UnsupportedModel:
+        pass
+    else:
+        raise AssertionError("expected UnsupportedModel")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All tree predictor tests passed")
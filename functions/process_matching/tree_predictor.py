@@ -0,0 +1,222 @@
+"""
+NumPy predictor for LightGBM tree ensembles.
+
+Ranking scores at most a few dozen candidates per request. CompiledEnsemble
+flattens a Booster once, when a model version is loaded, into the
+QuickScorer layout: every leaf of a tree is a bit (left to right), and every
+split that goes right clears the bits of its left subtree. The leaf a row
+reaches is the lowest bit still set once all of its right-going splits have
+been applied.
+
+Splits are grouped by feature and sorted by threshold, so the splits a value
+sends right are always a prefix of that list. Prefix ANDs of the masks are
+precomputed per feature, and scoring becomes one searchsorted and one table
+lookup per feature over all rows and trees at once, instead of a
+node-by-node walk.
+
+Only what the ranking models use is supported: numerical splits, one tree
+per iteration, up to 64 leaves per tree, and the identity or sigmoid output
+transform. compile_booster raises UnsupportedModel for anything else so
+callers can keep the Booster.
+"""
+from typing import Dict, List
+
+import lightgbm as lgb
+import numpy as np
+
+# Objectives whose raw score is the prediction
+IDENTITY_OBJECTIVES = {
+    'regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape',
+    'lambdarank', 'rank_xendcg',
+}
+# LightGBM treats |x| <= kZeroThreshold as zero for missing_type "Zero"
+ZERO_THRESHOLD = 1e-35
+MAX_LEAVES = 64
+# Upper bound on the prefix tables (bytes); larger models keep the Booster
+MAX_TABLE_BYTES = 64 * 1024 * 1024
+
+ALL_LEAVES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+class UnsupportedModel(ValueError):
+    """The Booster uses a feature CompiledEnsemble does not implement."""
+
+
+class FeatureSplits:
+    """
+    All splits of one feature across the ensemble.
+
+    thresholds: Split thresholds, ascending.
+    prefix_masks: (len(thresholds) + 1, n_trees) uint64; row k is the AND of
+        the masks of the first k splits, i.e. the leaves still reachable in
+        each tree for a value greater than exactly those k thresholds.
+    nan_masks, zero_masks: (n_trees,) leaves still reachable for a missing
+        value or a "zero" value, following each split's missing_type.
+    """
+
+    def __init__(self, thresholds, prefix_masks, nan_masks, zero_masks, has_zero_missing):
+        self.thresholds = thresholds
+        self.prefix_masks = prefix_masks
+        self.nan_masks = nan_masks
+        self.zero_masks = zero_masks
+        self.has_zero_missing = has_zero_missing
+
+
+class CompiledEnsemble:
+    """
+    Flattened tree ensemble with the Booster.predict/feature_name interface
+    used by scoring.predict_scores.
+    """
+
+    def __init__(
+        self,
+        feature_names: List[str],
+        splits: Dict[int, FeatureSplits],
+        leaf_values: np.ndarray,
+        sigmoid: float = None,
+        average_output: bool = False,
+    ):
+        self._feature_names = feature_names
+        self.splits = splits
+        self.leaf_values = leaf_values
+        self.sigmoid = sigmoid
+        self.average_output = average_output
+        self._leaf_offsets = np.arange(len(leaf_values)) * MAX_LEAVES
+        self._flat_values = leaf_values.ravel()
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.leaf_values)
+
+    def feature_name(self) -> List[str]:
+        return list(self._feature_names)
+
+    def predict(self, data) -> np.ndarray:
+        X = np.asarray(data, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self._feature_names):
+            raise ValueError(
+                f"Expected {len(self._feature_names)} features, got {X.shape[1]}"
+            )
+        if not len(X) or not self.num_trees:
+            return np.zeros(len(X), dtype=np.float64)
+
+        reachable = np.full((len(X), self.num_trees), ALL_LEAVES, dtype=np.uint64)
+        for feature, splits in self.splits.items():
+            values = X[:, feature]
+            masks = splits.prefix_masks[np.searchsorted(splits.thresholds, values, side='left')]
+            is_nan = np.isnan(values)
+            if is_nan.any():
+                masks[is_nan] = splits.nan_masks
+            if splits.has_zero_missing:
+                masks[np.abs(values) <= ZERO_THRESHOLD] = splits.zero_masks
+            reachable &= masks
+
+        # Exit leaf: lowest set bit (a power of two, so frexp gives its index exactly)
+        lowest = reachable & (~reachable + np.uint64(1))
+        leaves = np.frexp(lowest.astype(np.float64))[1] - 1
+        raw = self._flat_values[self._leaf_offsets + leaves].sum(axis=1)
+        if self.average_output:
+            raw /= self.num_trees
+        if self.sigmoid is not None:
+            return 1.0 / (1.0 + np.exp(-self.sigmoid * raw))
+        return raw
+
+
+def _output_transform(objective: str) -> Dict:
+    name, *params = objective.split()
+    if name in IDENTITY_OBJECTIVES:
+        return {'sigmoid': None}
+    if name == 'binary':
+        options = dict(param.split(':', 1) for param in params)
+        return {'sigmoid': float(options.get('sigmoid', 1.0))}
+    raise UnsupportedModel(f"Objective '{objective}' is not supported")
+
+
+def _goes_right_when_missing(split: Dict, zero: bool) -> bool:
+    """LightGBM's NumericalDecision for a NaN (zero=False) or zero (zero=True) value."""
+    missing_type = split['missing_type']
+    if missing_type == 'Zero' or (missing_type == 'NaN' and not zero):
+        return not split['default_left']
+    # NaN with missing_type None is scored as 0.0
+    return 0.0 > split['threshold']
+
+
+def compile_booster(booster: lgb.Booster) -> CompiledEnsemble:
+    """
+    Flatten a Booster (its best iteration, like Booster.predict) into a CompiledEnsemble.
+
+    Raises UnsupportedModel for categorical splits, linear trees, multiclass
+    models, trees with more than 64 leaves, very large ensembles or
+    objectives with other output transforms.
+    """
+    dump = booster.dump_model()
+    if dump.get('num_tree_per_iteration', 1) != 1:
+        raise UnsupportedModel("Multiclass models are not supported")
+    transform = _output_transform(dump.get('objective', 'regression'))
+
+    trees = dump['tree_info']
+    leaf_values = np.zeros((len(trees), MAX_LEAVES), dtype=np.float64)
+    # feature -> [(threshold, tree, mask, split)]
+    by_feature: Dict[int, List] = {}
+
+    for tree_index, tree in enumerate(trees):
+        if tree['num_leaves'] > MAX_LEAVES:
+            raise UnsupportedModel(f"Trees with more than {MAX_LEAVES} leaves are not supported")
+        next_leaf = 0
+
+        def add(node: Dict):
+            """Number leaves left to right; return the leaf range [first, end) under node."""
+            nonlocal next_leaf
+            if 'leaf_value' in node:
+                if 'leaf_coeff' in node:
+                    raise UnsupportedModel("Linear trees are not supported")
+                leaf_values[tree_index, next_leaf] = node['leaf_value']
+                next_leaf += 1
+                return next_leaf - 1, next_leaf
+            if node['decision_type'] != '<=':
+                raise UnsupportedModel("Categorical splits are not supported")
+            first, middle = add(node['left_child'])
+            _, end = add(node['right_child'])
+            left_leaves = ((1 << (middle - first)) - 1) << first
+            mask = np.uint64(((1 << MAX_LEAVES) - 1) ^ left_leaves)
+            by_feature.setdefault(node['split_feature'], []).append(
+                (node['threshold'], tree_index, mask, node)
+            )
+            return first, end
+
+        add(tree['tree_structure'])
+
+    split_count = sum(len(splits) for splits in by_feature.values())
+    if (split_count + len(by_feature)) * len(trees) * 8 > MAX_TABLE_BYTES:
+        raise UnsupportedModel(f"Ensemble too large to compile ({split_count} splits, {len(trees)} trees)")
+
+    splits = {}
+    for feature, feature_splits in sorted(by_feature.items()):
+        feature_splits.sort(key=lambda split: split[0])
+        prefix_masks = np.full((len(feature_splits) + 1, len(trees)), ALL_LEAVES, dtype=np.uint64)
+        nan_masks = np.full(len(trees), ALL_LEAVES, dtype=np.uint64)
+        zero_masks = np.full(len(trees), ALL_LEAVES, dtype=np.uint64)
+        for k, (_, tree_index, mask, split) in enumerate(feature_splits):
+            prefix_masks[k + 1] = prefix_masks[k]
+            prefix_masks[k + 1, tree_index] &= mask
+            if _goes_right_when_missing(split, zero=False):
+                nan_masks[tree_index] &= mask
+            if _goes_right_when_missing(split, zero=True):
+                zero_masks[tree_index] &= mask
+        splits[feature] = FeatureSplits(
+            thresholds=np.array([split[0] for split in feature_splits], dtype=np.float64),
+            prefix_masks=prefix_masks,
+            nan_masks=nan_masks,
+            zero_masks=zero_masks,
+            has_zero_missing=any(split[3]['missing_type'] == 'Zero' for split in feature_splits),
+        )
+
+    return CompiledEnsemble(
+        feature_names=dump['feature_names'],
+        splits=splits,
+        leaf_values=leaf_values,
+        sigmoid=transform['sigmoid'],
+        average_output=bool(dump.get('average_output', False)),
+    )
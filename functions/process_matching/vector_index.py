@@ -0,0 +1,370 @@
+"""
+Resident caregiver embedding index.
+
+An alternative to the pgvector round trip: all caregiver embeddings are held
+in the warm process_matching instance, L2-normalized, so cosine similarity is
+a dot product. Two index kinds share one interface:
+
+    exact  a contiguous float32 matrix; top-K is one matrix-vector product
+           plus argpartition (no approximation, no extra dependency)
+    hnsw   an HNSW graph from hnswlib (optional dependency) for very large
+           caregiver sets, at the cost of approximate recall
+
+The index is kept current by CaregiverIndexSync, which pages through the
+caregiver_embeddings change feed (updated_at, plus a deletions table, see
+migrations/001_caregiver_embeddings_updated_at.sql) starting from a watermark.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 384
+# Bound the (queries x caregivers) similarity block to ~128MB of float32
+MAX_SIMILARITY_BLOCK = 1 << 25
+
+Match = Tuple[str, float]
+
+
+def parse_vector(value) -> np.ndarray:
+    """Convert a pgvector value (adapter result, text '[0.1,0.2,...]' or a sequence) to float32."""
+    if isinstance(value, str):
+        return np.array(value.strip('[]').split(','), dtype=np.float32)
+    if hasattr(value, 'to_numpy'):
+        value = value.to_numpy()
+    return np.asarray(value, dtype=np.float32)
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """L2-normalize vectors into a float32 (n, d) array; zero vectors stay zero."""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """Base class: top-K cosine similarity search over caregiver embeddings."""
+
+    name = "base"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, caregiver_id: str) -> bool:
+        raise NotImplementedError
+
+    def upsert(self, ids: Sequence[str], vectors) -> None:
+        """Insert or replace embeddings for the given caregiver ids."""
+        raise NotImplementedError
+
+    def remove(self, ids: Sequence[str]) -> int:
+        """Remove caregivers; returns how many were present."""
+        raise NotImplementedError
+
+    def search_batch(self, queries, k: int, threshold: float = -1.0) -> List[List[Match]]:
+        """Top-k (id, similarity) per query, best first, keeping only similarity > threshold."""
+        raise NotImplementedError
+
+    def search(self, query, k: int, threshold: float = -1.0) -> List[Match]:
+        """Top-k (id, similarity) for one query embedding."""
+        return self.search_batch(np.asarray(query, dtype=np.float32)[None, :], k, threshold)[0]
+
+
+class ExactVectorIndex(VectorIndex):
+    """Brute-force search over a contiguous float32 matrix (exact results)."""
+
+    name = "exact"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS, initial_capacity: int = 1024):
+        super().__init__(dimensions)
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, caregiver_id: str) -> bool:
+        return caregiver_id in self._rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Live (n, d) view of the normalized embeddings."""
+        return self._matrix[:len(self._ids)]
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    def _reserve(self, size: int):
+        if size <= len(self._matrix):
+            return
+        capacity = max(size, 2 * len(self._matrix))
+        grown = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+        self._matrix = grown
+
+    def upsert(self, ids: Sequence[str], vectors) -> None:
+        if not len(ids):
+            return
+        normalized = normalize_rows(vectors)
+        with self._lock:
+            self._reserve(len(self._ids) + len(ids))
+            for caregiver_id, vector in zip(ids, normalized):
+                row = self._rows.get(caregiver_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[caregiver_id] = row
+                    self._ids.append(caregiver_id)
+                self._matrix[row] = vector
+
+    def remove(self, ids: Sequence[str]) -> int:
+        removed = 0
+        with self._lock:
+            for caregiver_id in ids:
+                row = self._rows.pop(caregiver_id, None)
+                if row is None:
+                    continue
+                # Keep the matrix dense: move the last row into the freed slot
+                last = len(self._ids) - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = moved_id
+                    self._rows[moved_id] = row
+                self._ids.pop()
+                removed += 1
+        return removed
+
+    def search_batch(self, queries, k: int, threshold: float = -1.0) -> List[List[Match]]:
+        queries = normalize_rows(queries)
+        with self._lock:
+            matrix = self.matrix
+            ids = list(self._ids)
+            if not len(ids) or k <= 0:
+                return [[] for _ in range(len(queries))]
+
+            k = min(k, len(ids))
+            block = max(1, MAX_SIMILARITY_BLOCK // len(ids))
+            results = []
+            for start in range(0, len(queries), block):
+                similarities = queries[start:start + block] @ matrix.T
+                results.extend(_top_k(similarities, k, threshold, ids))
+        return results
+
+
+def _top_k(similarities: np.ndarray, k: int, threshold: float, ids: List[str]) -> List[List[Match]]:
+    """Row-wise top-k of a (queries, caregivers) similarity block."""
+    if k < similarities.shape[1]:
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(similarities.shape[1]), similarities.shape)
+    top_scores = np.take_along_axis(similarities, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    return [
+        [(ids[col], float(score)) for col, score in zip(row_cols, row_scores) if score > threshold]
+        for row_cols, row_scores in zip(top, top_scores)
+    ]
+
+
+class HnswVectorIndex(VectorIndex):
+    """Approximate search with an hnswlib graph (requires the hnswlib package)."""
+
+    name = "hnsw"
+
+    def __init__(
+        self,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        max_elements: int = 10000,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 100,
+    ):
+        import hnswlib
+
+        super().__init__(dimensions)
+        self.ef_search = ef_search
+        self._index = hnswlib.Index(space='cosine', dim=dimensions)
+        self._index.init_index(max_elements=max_elements, M=m, ef_construction=ef_construction)
+        self._labels: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._next_label = 0
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, caregiver_id: str) -> bool:
+        return caregiver_id in self._labels
+
+    def upsert(self, ids: Sequence[str], vectors) -> None:
+        if not len(ids):
+            return
+        normalized = normalize_rows(vectors)
+        with self._lock:
+            labels = []
+            for caregiver_id in ids:
+                label = self._labels.get(caregiver_id)
+                if label is None:
+                    label = self._next_label
+                    self._next_label += 1
+                    self._labels[caregiver_id] = label
+                    self._ids[label] = caregiver_id
+                labels.append(label)
+            capacity = self._index.get_max_elements()
+            if self._next_label > capacity:
+                self._index.resize_index(max(self._next_label, 2 * capacity))
+            # Existing labels are updated in place by hnswlib
+            self._index.add_items(normalized, np.array(labels, dtype=np.int64))
+
+    def remove(self, ids: Sequence[str]) -> int:
+        removed = 0
+        with self._lock:
+            for caregiver_id in ids:
+                label = self._labels.pop(caregiver_id, None)
+                if label is None:
+                    continue
+                self._ids.pop(label, None)
+                self._index.mark_deleted(label)
+                removed += 1
+        return removed
+
+    def search_batch(self, queries, k: int, threshold: float = -1.0) -> List[List[Match]]:
+        queries = normalize_rows(queries)
+        with self._lock:
+            k = min(k, len(self._labels))
+            if k <= 0:
+                return [[] for _ in range(len(queries))]
+            self._index.set_ef(max(self.ef_search, k))
+            labels, distances = self._index.knn_query(queries, k=k)
+            return [
+                [
+                    (self._ids[int(label)], float(1.0 - distance))
+                    for label, distance in zip(row_labels, row_distances)
+                    if 1.0 - distance > threshold
+                ]
+                for row_labels, row_distances in zip(labels, distances)
+            ]
+
+
+def create_index(kind: str = "exact", dimensions: int = EMBEDDING_DIMENSIONS, **kwargs) -> VectorIndex:
+    """Create an index by kind; falls back to exact search if hnswlib is not installed."""
+    if kind == "hnsw":
+        try:
+            return HnswVectorIndex(dimensions, **kwargs)
+        except ImportError:
+            logger.warning("hnswlib is not installed, using exact vector index")
+    elif kind != "exact":
+        raise ValueError(f"Unknown vector index kind: {kind}")
+    return ExactVectorIndex(dimensions)
+
+
+class CaregiverIndexSync:
+    """
+    Keeps a VectorIndex in sync with caregiver_embeddings through its change feed.
+
+    Args:
+        index: The index to maintain.
+        fetch_changes: (since, after_id, limit) -> rows with 'id', 'embedding',
+            'updated_at', ordered by (updated_at, id) and strictly after
+            (since, after_id).
+        fetch_deletions: (since) -> rows with 'id', 'deleted_at'.
+        refresh_interval: Seconds between incremental refreshes.
+        overlap: Re-read this much of the feed before the watermark on each
+            refresh, so rows committed late with an earlier timestamp are not missed.
+        page_size: Rows per fetch_changes call.
+    """
+
+    EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        fetch_changes: Callable[[datetime, str, int], List[Dict]],
+        fetch_deletions: Callable[[datetime], List[Dict]],
+        refresh_interval: float = 60.0,
+        overlap: float = 60.0,
+        page_size: int = 5000,
+    ):
+        self.index = index
+        self.fetch_changes = fetch_changes
+        self.fetch_deletions = fetch_deletions
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.page_size = page_size
+        self.watermark: Optional[datetime] = None
+        self.deletions_watermark: Optional[datetime] = None
+        self.last_refresh = 0.0
+        # updated_at of each indexed caregiver, to tell whether other snapshots are stale
+        self.updated_at: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.watermark is not None
+
+    def maybe_refresh(self) -> Optional[Dict]:
+        """Refresh if the index was never loaded or the refresh interval has passed."""
+        if self.loaded and time.monotonic() - self.last_refresh < self.refresh_interval:
+            return None
+        return self.refresh()
+
+    def refresh(self) -> Dict:
+        """Apply deletions, then upserts, since the watermarks (a full load the first time)."""
+        with self._lock:
+            start = time.perf_counter()
+            full_load = not self.loaded
+
+            removed = 0
+            if not full_load:
+                deletions = self.fetch_deletions(self.deletions_watermark - self.overlap)
+                removed = self.index.remove([row['id'] for row in deletions])
+                for row in deletions:
+                    self.updated_at.pop(row['id'], None)
+                if deletions:
+                    self.deletions_watermark = max(
+                        self.deletions_watermark, max(row['deleted_at'] for row in deletions)
+                    )
+
+            since = self.EPOCH if full_load else self.watermark - self.overlap
+            watermark = self.watermark or self.EPOCH
+            after_id = ''
+            upserted = 0
+            while True:
+                rows = self.fetch_changes(since, after_id, self.page_size)
+                if not rows:
+                    break
+                self.index.upsert(
+                    [row['id'] for row in rows],
+                    np.vstack([parse_vector(row['embedding']) for row in rows]),
+                )
+                self.updated_at.update((row['id'], row['updated_at']) for row in rows)
+                upserted += len(rows)
+                since, after_id = rows[-1]['updated_at'], rows[-1]['id']
+                watermark = max(watermark, since)
+                if len(rows) < self.page_size:
+                    break
+
+            if full_load:
+                self.deletions_watermark = datetime.now(timezone.utc)
+            self.watermark = watermark
+            self.last_refresh = time.monotonic()
+            stats = {
+                'full_load': full_load,
+                'upserted': upserted,
+                'removed': removed,
+                'size': len(self.index),
+                'seconds': round(time.perf_counter() - start, 3),
+            }
+        logger.info(f"Vector index refresh ({self.index.name}): {stats}")
+        return stats
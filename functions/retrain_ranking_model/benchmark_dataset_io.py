@@ -0,0 +1,127 @@
+"""
+Benchmark: CSV text vs date-partitioned Parquet for the training dataset.
+
+The CSV path is the previous pipeline without the GCS transfer: rows
+collected as a list of dicts, csv.DictWriter into a StringIO, then
+pd.read_csv of the whole text. The Parquet path streams the same rows from
+a generator through write_partitions into a local directory, then reads
+the 30-day window back with only the training columns. Both produce the
+feature matrix, labels and senior groups that training uses.
+
+Usage:
+    python benchmark_dataset_io.py
+    python benchmark_dataset_io.py --sizes 10000
+"""
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from training_data import FEATURE_COLUMNS, load_training_table, open_dataset, write_partitions
+
+DEFAULT_SIZES = [10000, 1000000]
+DAYS = 30
+TRAINING_COLUMNS = ['senior_id', 'rating'] + FEATURE_COLUMNS
+
+
+def generate_rows(n: int, seed: int = 42):
+    """Synthetic rated matches spread over the last DAYS days, ~20 per senior."""
+    rng = np.random.default_rng(seed)
+    end = datetime(2024, 6, 30, tzinfo=timezone.utc)
+    offsets = np.sort(rng.uniform(0, DAYS * 86400, n))
+    values = rng.random((n, 5))
+    for i in range(n):
+        yield {
+            'senior_id': f"senior_{i // 20}",
+            'caregiver_id': f"caregiver_{i}",
+            'rating': int(rng.integers(1, 6)),
+            'similarity': float(values[i, 0]),
+            'location_score': float(values[i, 1]),
+            'availability_score': float(values[i, 2]),
+            'specialization_score': float(values[i, 3]),
+            'price_score': float(values[i, 4]),
+            'years_experience': int(i % 25),
+            'certification_count': int(i % 6),
+            'past_rating': 4.2,
+            'rated_at': end - timedelta(days=DAYS) + timedelta(seconds=float(offsets[i])),
+        }
+
+
+def training_arrays(df: pd.DataFrame):
+    return df[FEATURE_COLUMNS].to_numpy(), df['rating'].to_numpy(), df.groupby('senior_id').size().values
+
+
+def csv_export(n: int) -> str:
+    data = list(generate_rows(n))
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=data[0].keys())
+    writer.writeheader()
+    writer.writerows(data)
+    return output.getvalue()
+
+
+def csv_load(text: str):
+    return training_arrays(pd.read_csv(io.StringIO(text)))
+
+
+def parquet_export(n: int, root: str):
+    filesystem, base_dir = open_dataset(root)
+    write_partitions(generate_rows(n), filesystem, base_dir, "bench")
+
+
+def parquet_load(root: str):
+    filesystem, base_dir = open_dataset(root)
+    since = (datetime(2024, 6, 30) - timedelta(days=DAYS)).date()
+    table = load_training_table(filesystem, base_dir, since, columns=TRAINING_COLUMNS)
+    return training_arrays(table.to_pandas())
+
+
+def directory_size(root: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(root) for name in names
+    )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES))
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} | {'format':>7} | {'export':>9} | {'load':>9} | {'size':>9}")
+    print("-" * 56)
+    for n in (int(size) for size in args.sizes.split(",")):
+        text, csv_export_s = timed(csv_export, n)
+        (X_csv, y_csv, groups_csv), csv_load_s = timed(csv_load, text)
+        csv_bytes = len(text.encode())
+        del text
+
+        with tempfile.TemporaryDirectory() as root:
+            _, parquet_export_s = timed(parquet_export, n, root)
+            (X_pq, y_pq, groups_pq), parquet_load_s = timed(parquet_load, root)
+            parquet_bytes = directory_size(root)
+
+        # Same training inputs either way (Parquet rows come back grouped by senior)
+        assert np.allclose(X_csv[np.lexsort(X_csv.T)], X_pq[np.lexsort(X_pq.T)])
+        assert np.array_equal(np.sort(y_csv), np.sort(y_pq))
+        assert np.array_equal(np.sort(groups_csv), np.sort(groups_pq))
+
+        print(f"{n:>9} | {'csv':>7} | {csv_export_s:>8.2f}s | {csv_load_s:>8.2f}s | {csv_bytes / 1e6:>7.1f}MB")
+        print(f"{n:>9} | {'parquet':>7} | {parquet_export_s:>8.2f}s | {parquet_load_s:>8.2f}s | "
+              f"{parquet_bytes / 1e6:>7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
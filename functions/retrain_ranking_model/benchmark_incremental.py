@@ -0,0 +1,87 @@
+"""
+Benchmark: daily full retrain vs warm-start retraining.
+
+Simulates a rolling 30-day window of ratings. Each simulated day, the full
+retrain trains from scratch on the whole window, while the warm start
+continues the previous day's model on that day's ratings only (as between
+full rebuilds). Both are scored by NDCG@10 on the same validation seniors
+of the current window.
+
+Usage:
+    python benchmark_incremental.py
+    python benchmark_incremental.py --days 14 --seniors 2000
+"""
+import argparse
+import time
+
+import lightgbm as lgb
+import pyarrow as pa
+
+from dataset_builder import DATASET_PARAMS, query_blocks, split_by_senior
+from incremental import continue_training
+from ranking_metrics import evaluate_ranking
+from test_tuning import make_table
+
+WINDOW_DAYS = 30
+PARAMS = {
+    'objective': 'lambdarank', 'metric': 'ndcg', 'eval_at': [10], 'num_leaves': 31,
+    'learning_rate': 0.05, 'feature_fraction': 0.9, 'bagging_fraction': 0.8, 'bagging_freq': 5, 'verbose': -1,
+}
+
+
+def full_retrain(train, valid) -> lgb.Booster:
+    """The full path: 100 rounds from scratch with early stopping on validation."""
+    train_set = lgb.Dataset(train.X, label=train.y, group=train.groups,
+                            feature_name=list(train.feature_names), params=DATASET_PARAMS)
+    valid_set = lgb.Dataset(valid.X, label=valid.y, group=valid.groups, params=DATASET_PARAMS, reference=train_set)
+    return lgb.train(PARAMS, train_set, num_boost_round=100, valid_sets=[valid_set],
+                     callbacks=[lgb.early_stopping(10, first_metric_only=True, verbose=False)])
+
+
+def ndcg(model, blocks) -> float:
+    return evaluate_ranking(blocks.y, model.predict(blocks.X), blocks.groups, ks=(10,))['metrics']['ndcg@10']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seniors", type=int, default=500, help="seniors rating per day")
+    args = parser.parse_args()
+
+    daily = [make_table(n_seniors=args.seniors, per_senior=5, seed=day) for day in range(WINDOW_DAYS + args.days)]
+    splits = [split_by_senior(table) for table in daily]
+
+    def window(last_day):
+        days = splits[last_day - WINDOW_DAYS + 1:last_day + 1]
+        return (query_blocks(pa.concat_tables([train for train, _ in days])),
+                query_blocks(pa.concat_tables([valid for _, valid in days])))
+
+    train, valid = window(WINDOW_DAYS - 1)
+    warm = full_retrain(train, valid)
+    warm_str = warm.model_to_string(num_iteration=warm.best_iteration)
+
+    print(f"{'day':>4} | {'window rows':>11} | {'full s':>7} | {'full ndcg':>9} | "
+          f"{'warm s':>7} | {'warm ndcg':>9} | {'warm trees':>10}")
+    print("-" * 78)
+    totals = [0.0, 0.0]
+    for day in range(WINDOW_DAYS, WINDOW_DAYS + args.days):
+        train, valid = window(day)
+
+        start = time.perf_counter()
+        full = full_retrain(train, valid)
+        full_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = continue_training(warm_str, query_blocks(splits[day][0]), valid, PARAMS)
+        warm_str = warm.model_to_string(num_iteration=warm.best_iteration)
+        warm_s = time.perf_counter() - start
+
+        totals[0] += full_s
+        totals[1] += warm_s
+        print(f"{day - WINDOW_DAYS + 1:>4} | {len(train.y) + len(valid.y):>11} | {full_s:>7.2f} | "
+              f"{ndcg(full, valid):>9.4f} | {warm_s:>7.2f} | {ndcg(warm, valid):>9.4f} | {warm.best_iteration:>10}")
+    print(f"\nTotal training time: full {totals[0]:.2f}s, warm start {totals[1]:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: fixed-parameter training vs the parallel hyperparameter search.
+
+Trains the previous fixed configuration (100 rounds, early stopping) and
+runs the successive-halving search with 1 worker and with one worker per
+CPU on the same cached synthetic Datasets, then prints wall-clock time,
+validation NDCG@10 and the leaderboard of the parallel search.
+
+Usage:
+    python benchmark_tuning.py
+    python benchmark_tuning.py --seniors 5000 --trials 27
+"""
+import argparse
+import os
+import time
+
+import lightgbm as lgb
+
+from dataset_builder import DatasetBuilder, query_blocks, split_by_senior
+from test_tuning import make_table
+from tuning import BASE_PARAMS, EARLY_STOPPING_ROUNDS, VALID_METRIC, format_leaderboard, tune
+
+# The configuration train_lambdarank_local uses
+FIXED_PARAMS = {
+    'num_leaves': 31, 'learning_rate': 0.05, 'feature_fraction': 0.9, 'bagging_fraction': 0.8,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seniors", type=int, default=2000)
+    parser.add_argument("--trials", type=int, default=18)
+    parser.add_argument("--max-rounds", type=int, default=400)
+    args = parser.parse_args()
+
+    train, valid = split_by_senior(make_table(n_seniors=args.seniors, per_senior=20))
+    builder = DatasetBuilder()
+    train_set, valid_set = builder.build_pair(query_blocks(train), query_blocks(valid))
+    paths = (builder.binary_path(train_set), builder.binary_path(valid_set), builder.params)
+    print(f"{train.num_rows} train rows, {valid.num_rows} validation rows, {os.cpu_count()} CPUs\n")
+
+    start = time.perf_counter()
+    fixed = lgb.train(
+        {**BASE_PARAMS, **FIXED_PARAMS, 'num_threads': 0}, train_set, num_boost_round=100,
+        valid_sets=[valid_set], valid_names=['valid'],
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)],
+    )
+    rows = [("fixed params", time.perf_counter() - start, fixed.best_score['valid'][VALID_METRIC])]
+
+    worker_counts = sorted({1, os.cpu_count() or 1})
+    results = {}
+    for workers in worker_counts:
+        result = tune(*paths, n_trials=args.trials, max_rounds=args.max_rounds, workers=workers)
+        results[workers] = result
+        rows.append((f"search, {workers} worker(s)", result.wall_seconds, result.best.score))
+
+    print(f"{'run':>20} | {'wall s':>8} | {VALID_METRIC:>8}")
+    print("-" * 42)
+    for name, seconds, score in rows:
+        print(f"{name:>20} | {seconds:>8.2f} | {score:>8.4f}")
+
+    print(f"\nLeaderboard ({worker_counts[-1]} worker(s)):")
+    print(format_leaderboard(results[worker_counts[-1]]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+LambdaRank datasets: per-senior query blocks, a senior-grouped split, and
+cached lgb.Dataset binaries.
+
+LambdaRank needs each senior's candidates as one contiguous block, with
+group sizes in block order; query_blocks sorts rows by senior to guarantee
+that. The train/validation split assigns whole seniors by hashing their id,
+so no senior is on both sides and the same senior always lands on the same
+side across runs. Constructed Datasets (binned features, labels and query
+boundaries) are saved as LightGBM binaries keyed by a fingerprint of their
+inputs; a rerun on the same data loads them instead of binning again.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.fs as pafs
+
+from training_data import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_FRACTION = 0.2
+SPLIT_SALT = "matching-split-v1"
+# Second split of the training side, for model selection (independent of SPLIT_SALT)
+SELECTION_SALT = "matching-selection-v1"
+# Parameters fixed at Dataset construction. feature_pre_filter is off so
+# tuning can vary min_data_in_leaf on the same cached Dataset.
+DATASET_PARAMS = {
+    'max_bin': 255,
+    'min_data_in_bin': 3,
+    'bin_construct_sample_cnt': 200000,
+    'data_random_seed': 1,
+    'feature_pre_filter': False,
+    'verbose': -1,
+}
+
+
+class QueryBlocks(NamedTuple):
+    """Rows grouped into contiguous per-senior blocks."""
+    X: np.ndarray
+    y: np.ndarray
+    groups: np.ndarray       # block sizes, in row order
+    senior_ids: np.ndarray   # one id per block
+    feature_names: Tuple[str, ...]
+
+
+def query_blocks(table: pa.Table, feature_columns: Sequence[str] = FEATURE_COLUMNS) -> QueryBlocks:
+    """Sort rows by senior (stable) and return features, labels and block sizes."""
+    if table.num_rows:
+        table = table.take(pc.sort_indices(table, sort_keys=[('senior_id', 'ascending')]))
+    senior_ids = table['senior_id'].to_numpy(zero_copy_only=False)
+    starts = np.flatnonzero(np.concatenate([[True], senior_ids[1:] != senior_ids[:-1]]))[:len(senior_ids)]
+    groups = np.diff(np.append(starts, len(senior_ids)))
+    X = np.zeros((table.num_rows, len(feature_columns)))
+    for col, column in enumerate(feature_columns):
+        X[:, col] = table[column].to_numpy()
+    y = table['rating'].to_numpy().astype(np.float64)
+    return QueryBlocks(X, y, groups, senior_ids[starts], tuple(feature_columns))
+
+
+def validation_mask(senior_ids, fraction: float = VALIDATION_FRACTION, salt: str = SPLIT_SALT) -> np.ndarray:
+    """
+    True for rows whose senior belongs to the validation side.
+
+    A senior is in validation when md5(salt + id), read as a number in
+    [0, 1), is below `fraction`; the assignment does not depend on row order,
+    run or machine.
+    """
+    senior_ids = np.asarray(senior_ids, dtype=object)
+    unique_ids, inverse = np.unique(senior_ids, return_inverse=True)
+    buckets = np.array([
+        int.from_bytes(hashlib.md5(f"{salt}{senior_id}".encode()).digest()[:8], 'big') / 2 ** 64
+        for senior_id in unique_ids
+    ])
+    return (buckets < fraction)[inverse] if len(unique_ids) else np.zeros(0, dtype=bool)
+
+
+def split_by_senior(
+    table: pa.Table,
+    fraction: float = VALIDATION_FRACTION,
+    salt: str = SPLIT_SALT,
+) -> Tuple[pa.Table, pa.Table]:
+    """(train, validation) with every senior's rows on exactly one side."""
+    mask = validation_mask(table['senior_id'].to_numpy(zero_copy_only=False), fraction, salt)
+    mask = pa.array(mask, pa.bool_())
+    return table.filter(pc.invert(mask)), table.filter(mask)
+
+
+def fingerprint(blocks: QueryBlocks, params: Dict, reference_key: Optional[str] = None) -> str:
+    """Content key of a Dataset: its inputs, construction parameters and LightGBM version."""
+    digest = hashlib.sha256()
+    for array in (blocks.X, blocks.y, blocks.groups):
+        digest.update(str(array.shape).encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(repr(blocks.feature_names).encode())
+    digest.update(repr(sorted(params.items())).encode())
+    digest.update(lgb.__version__.encode())
+    digest.update((reference_key or "").encode())
+    return digest.hexdigest()[:32]
+
+
+class DatasetCache:
+    """
+    Dataset binaries under a pyarrow URI (local path or gs://...).
+
+    LightGBM reads and writes binaries only on local disk, so remote entries
+    are staged through local_dir.
+    """
+
+    def __init__(self, uri: str, local_dir: str = "/tmp/lgb_dataset_cache"):
+        self.filesystem, self.base_dir = pafs.FileSystem.from_uri(uri)
+        self.is_local = isinstance(self.filesystem, pafs.LocalFileSystem)
+        self.local_dir = self.base_dir if self.is_local else local_dir
+        os.makedirs(self.local_dir, exist_ok=True)
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.local_dir, f"{key}.bin")
+
+    def fetch(self, key: str) -> Optional[str]:
+        """Local path of a cached binary, downloading it if needed; None on a miss."""
+        path = self.local_path(key)
+        if os.path.exists(path):
+            return path
+        if self.is_local:
+            return None
+        remote = f"{self.base_dir}/{key}.bin"
+        if self.filesystem.get_file_info(remote).type == pafs.FileType.NotFound:
+            return None
+        pafs.copy_files(remote, path, source_filesystem=self.filesystem,
+                        destination_filesystem=pafs.LocalFileSystem())
+        return path
+
+    def store(self, key: str, dataset: lgb.Dataset):
+        path = self.local_path(key)
+        tmp = f"{path}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        dataset.save_binary(tmp)
+        os.replace(tmp, path)
+        if not self.is_local:
+            self.filesystem.create_dir(self.base_dir, recursive=True)
+            pafs.copy_files(path, f"{self.base_dir}/{key}.bin", source_filesystem=pafs.LocalFileSystem(),
+                            destination_filesystem=self.filesystem)
+
+
+class DatasetBuilder:
+    """
+    Builds (or loads from cache) constructed lgb.Datasets for query blocks.
+
+    Args:
+        cache: Where binaries are kept; None disables caching.
+        params: Dataset construction parameters (DATASET_PARAMS by default).
+    """
+
+    def __init__(self, cache: Optional[DatasetCache] = None, params: Optional[Dict] = None):
+        self.cache = cache
+        self.params = dict(DATASET_PARAMS if params is None else params)
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, blocks: QueryBlocks, reference: Optional[lgb.Dataset] = None) -> lgb.Dataset:
+        """
+        A constructed Dataset for `blocks`. Validation sets pass the training
+        Dataset as reference so both share its bin boundaries.
+        """
+        reference_key = getattr(reference, 'cache_key', None) if reference is not None else None
+        key = fingerprint(blocks, self.params, reference_key)
+
+        cached = self.cache.fetch(key) if self.cache else None
+        if cached:
+            dataset = lgb.Dataset(cached, params=self.params, reference=reference).construct()
+            self.hits += 1
+            logger.info(f"Loaded cached Dataset {key} ({dataset.num_data()} rows)")
+        else:
+            dataset = lgb.Dataset(
+                blocks.X, label=blocks.y, group=blocks.groups, feature_name=list(blocks.feature_names),
+                params=self.params, reference=reference, free_raw_data=False,
+            ).construct()
+            self.misses += 1
+            if self.cache:
+                self.cache.store(key, dataset)
+        dataset.cache_key = key
+        return dataset
+
+    def build_pair(self, train: QueryBlocks, valid: Optional[QueryBlocks] = None):
+        """(train Dataset, validation Dataset or None)."""
+        train_set = self.build(train)
+        valid_set = self.build(valid, reference=train_set) if valid is not None and len(valid.y) else None
+        return train_set, valid_set
+
+    def binary_path(self, dataset: lgb.Dataset) -> str:
+        """
+        Local binary of a Dataset built here, for other processes to load
+        (tuning workers). Without a cache it is written to the temp directory.
+        """
+        if self.cache:
+            return self.cache.local_path(dataset.cache_key)
+        path = os.path.join(tempfile.gettempdir(), f"lgb_dataset_{dataset.cache_key}.bin")
+        if not os.path.exists(path):
+            dataset.save_binary(path)
+        return path
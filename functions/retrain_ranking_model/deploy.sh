@@ -34,10 +34,14 @@ gcloud functions deploy ${FUNCTION_NAME} \
   --service-account=${SERVICE_ACCOUNT} \
   --set-env-vars="LOCATION=${REGION}" \
   --set-env-vars="TRAINING_DATA_BUCKET=${TRAINING_DATA_BUCKET:-caregiving-ml-training}" \
+  --set-env-vars="TRAINING_DATA_URI=${TRAINING_DATA_URI:-gs://caregiving-ml-training/training_data}" \
   --set-env-vars="ML_MODEL_BUCKET=${ML_MODEL_BUCKET:-caregiving-ml}" \
   --set-env-vars="ML_MODEL_PATH=${ML_MODEL_PATH:-models/matching-model-v1.txt}" \
   --set-env-vars="MIN_SAMPLES=${MIN_SAMPLES:-50}" \
   --set-env-vars="IMPROVEMENT_THRESHOLD=${IMPROVEMENT_THRESHOLD:-0.02}" \
+  --set-env-vars="TRAINING_MODE=${TRAINING_MODE:-vertex}" \
+  --set-env-vars="INCREMENTAL_TRAINING=${INCREMENTAL_TRAINING:-false}" \
+  --set-env-vars="FULL_REBUILD_INTERVAL_DAYS=${FULL_REBUILD_INTERVAL_DAYS:-7}" \
   --set-env-vars="VERTEX_AI_STAGING_BUCKET=${VERTEX_AI_STAGING_BUCKET:-YOUR_PROJECT-vertex-ai-staging}" \
   --max-instances=1 \
   --min-instances=0
@@ -0,0 +1,105 @@
+"""
+Incremental (warm-start) retraining of the ranking model.
+
+Between full rebuilds, a daily run does not retrain on the whole window: it
+loads the production Booster and keeps boosting (init_model) on the rows
+rated after the data the production model was trained through. The new
+trees start from the production model's scores, so each day costs rounds
+over one day of ratings instead of the full window.
+
+Warm-started models only ever add trees, and old ratings keep their weight
+in the early trees after they leave the window, so a full rebuild runs every
+FULL_REBUILD_INTERVAL_DAYS (or whenever the production model cannot be
+continued) to reset drift and model size.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import lightgbm as lgb
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dataset_builder import DATASET_PARAMS, QueryBlocks
+
+logger = logging.getLogger(__name__)
+
+FULL_REBUILD_INTERVAL_DAYS = 7
+INCREMENTAL_ROUNDS = 30
+EARLY_STOPPING_ROUNDS = 10
+
+
+def plan_training(
+    model_config: Optional[Dict],
+    last_full_rebuild_at: Optional[datetime],
+    now: datetime,
+    interval_days: int = FULL_REBUILD_INTERVAL_DAYS,
+) -> Tuple[str, str]:
+    """
+    ('full' or 'incremental', reason) for today's run.
+
+    Args:
+        model_config: The production model's config document (model_path,
+            trained_through), or None when no model is deployed.
+        last_full_rebuild_at: When a full retrain last ran, deployed or not.
+    """
+    if not model_config or not model_config.get('model_path'):
+        return 'full', "no production model"
+    if not model_config.get('trained_through'):
+        return 'full', "production model has no training watermark"
+    if last_full_rebuild_at is None:
+        return 'full', "no full rebuild recorded"
+    age = now - last_full_rebuild_at
+    if age >= timedelta(days=interval_days):
+        return 'full', f"last full rebuild {age.days} days ago (interval {interval_days})"
+    return 'incremental', f"last full rebuild {age.days} days ago"
+
+
+def rows_after(table: pa.Table, since: datetime) -> pa.Table:
+    """Rows rated strictly after `since` (the production model's training watermark)."""
+    return table.filter(pc.greater(table['rated_at'], pa.scalar(since, table.schema.field('rated_at').type)))
+
+
+def continue_training(
+    base_model_str: str,
+    train: QueryBlocks,
+    valid: QueryBlocks,
+    params: Dict,
+    rounds: int = INCREMENTAL_ROUNDS,
+) -> lgb.Booster:
+    """
+    Keep boosting the production model on `train` (the new rows only).
+
+    Early-stops on `valid`, the selection split: held out from training, but
+    not the validation split that decides deployment. The Datasets are built from raw rows
+    rather than the binary cache: LightGBM computes the base model's init
+    scores from the raw features.
+
+    Raises ValueError if the base model was trained on other features.
+    """
+    base = lgb.Booster(model_str=base_model_str)
+    if base.feature_name() != list(train.feature_names):
+        raise ValueError(f"Production model features {base.feature_name()} do not match {list(train.feature_names)}")
+
+    train_set = lgb.Dataset(
+        train.X, label=train.y, group=train.groups, feature_name=list(train.feature_names),
+        params=DATASET_PARAMS, free_raw_data=False,
+    )
+    valid_set = lgb.Dataset(
+        valid.X, label=valid.y, group=valid.groups, params=DATASET_PARAMS, reference=train_set,
+        free_raw_data=False,
+    )
+    booster = lgb.train(
+        params,
+        train_set,
+        num_boost_round=rounds,
+        init_model=base,
+        valid_sets=[valid_set],
+        valid_names=['valid'],
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, first_metric_only=True, verbose=False)],
+    )
+    logger.info(
+        f"Continued {base.num_trees()} trees on {len(train.y)} new rows: "
+        f"{booster.best_iteration - base.num_trees()} trees added"
+    )
+    return booster
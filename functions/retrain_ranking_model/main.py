@@ -5,16 +5,30 @@ Triggered by Cloud Scheduler daily.
 import os
 import json
 import logging
-import csv
-import io
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
 
 import functions_framework
 from google.cloud import firestore
 from google.cloud import storage
 from google.cloud import aiplatform
 from google.cloud import monitoring_v3
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dataset_builder import SELECTION_SALT, DatasetBuilder, DatasetCache, query_blocks, split_by_senior
+from incremental import continue_training, plan_training, rows_after
+from ranking_metrics import evaluate_ranking, summarize_distribution
+from tuning import format_leaderboard, tune
+from training_data import (
+    FEATURE_COLUMNS,
+    load_training_table,
+    open_dataset,
+    read_table,
+    stream_rated_matches,
+    write_partitions,
+    write_table,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,97 +47,130 @@ MODEL_BUCKET = os.environ.get("ML_MODEL_BUCKET", "caregiving-ml")
 MODEL_PATH = os.environ.get("ML_MODEL_PATH", "models/matching-model-v1.txt")
 MIN_SAMPLES = int(os.environ.get("MIN_SAMPLES", "50"))
 IMPROVEMENT_THRESHOLD = float(os.environ.get("IMPROVEMENT_THRESHOLD", "0.02"))
+# Parquet training datasets: gs://bucket/prefix in production, or a local directory
+TRAINING_DATA_URI = os.environ.get("TRAINING_DATA_URI", f"gs://{BUCKET_NAME}/training_data")
+MATCHES_DATASET = "rated_matches"
+TRAINING_COLUMNS = ['senior_id', 'rating'] + FEATURE_COLUMNS + ['rated_at']
+# Constructed lgb.Dataset binaries, keyed by content; empty disables the cache
+DATASET_CACHE_URI = os.environ.get("DATASET_CACHE_URI", f"{TRAINING_DATA_URI.rstrip('/')}/dataset_cache")
+VALIDATION_FRACTION = float(os.environ.get("VALIDATION_FRACTION", "0.2"))
+# Seniors of the training split held out for model selection (tuning, early
+# stopping), so the validation split stays untouched for the deploy decision
+SELECTION_FRACTION = float(os.environ.get("SELECTION_FRACTION", "0.2"))
+# "vertex": Vertex AI job with local fallback; "tune": CPU hyperparameter search in this function
+TRAINING_MODE = os.environ.get("TRAINING_MODE", "vertex")
+TUNING_TRIALS = int(os.environ.get("TUNING_TRIALS", "18"))
+TUNING_MAX_ROUNDS = int(os.environ.get("TUNING_MAX_ROUNDS", "400"))
+TUNING_WORKERS = int(os.environ.get("TUNING_WORKERS", "0")) or None  # 0: one per CPU
+# Warm-start the production model on new ratings between periodic full rebuilds
+INCREMENTAL_TRAINING = os.environ.get("INCREMENTAL_TRAINING", "false").lower() == "true"
+FULL_REBUILD_INTERVAL_DAYS = int(os.environ.get("FULL_REBUILD_INTERVAL_DAYS", "7"))
 VERTEX_AI_STAGING_BUCKET = os.environ.get("VERTEX_AI_STAGING_BUCKET", f"{PROJECT_ID}-vertex-ai-staging")
 
+LAMBDARANK_PARAMS = {
+    'objective': 'lambdarank',
+    'metric': 'ndcg',
+    'boosting_type': 'gbdt',
+    'num_leaves': 31,
+    'learning_rate': 0.05,
+    'feature_fraction': 0.9,
+    'bagging_fraction': 0.8,
+    'bagging_freq': 5,
+    'verbose': 0,
+}
+
 # Initialize Vertex AI
 aiplatform.init(project=PROJECT_ID, location=LOCATION)
 
+# Global Dataset builder, created on first use
+dataset_builder: Optional[DatasetBuilder] = None
+
+
+def get_dataset_builder() -> DatasetBuilder:
+    """Dataset builder backed by DATASET_CACHE_URI (no cache when it is empty)."""
+    global dataset_builder
+    if dataset_builder is None:
+        dataset_builder = DatasetBuilder(DatasetCache(DATASET_CACHE_URI) if DATASET_CACHE_URI else None)
+    return dataset_builder
 
-def query_training_data(days: int = 30) -> List[Dict]:
+
+def extract_training_data(days: int = 30) -> Dict[str, Any]:
     """
-    Query Firestore for completed matches with ratings from last N days.
-    
-    Expected structure:
-    - /seniors/{seniorId}/matches/{matchId} with rating field
-    - /matches/{matchId} with rating and completed_at fields
+    Append the ratings since the last run to the training dataset.
+
+    Reads matches rated since the stored watermark (or the last N days on the
+    first run) with one paginated collection-group query, streams them into
+    date-partitioned Parquet under TRAINING_DATA_URI and advances the
+    watermark in config/training_data once the files are written.
     """
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        watermark_ref = db.collection('config').document('training_data')
+        watermark_doc = watermark_ref.get()
+        watermark = watermark_doc.to_dict().get('watermark') if watermark_doc.exists else None
         
-        training_data = []
+        window_start = datetime.now(timezone.utc) - timedelta(days=days)
+        since = max(watermark, window_start) if watermark else window_start
         
-        # Query all seniors
-        seniors_ref = db.collection('seniors')
-        seniors = seniors_ref.stream()
+        filesystem, base_dir = open_dataset(TRAINING_DATA_URI)
+        run_id = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        stats = write_partitions(
+            stream_rated_matches(db, since), filesystem, f"{base_dir}/{MATCHES_DATASET}", run_id
+        )
         
-        for senior_doc in seniors:
-            senior_id = senior_doc.id
-            matches_ref = senior_doc.reference.collection('matches')
-            
-            # Query matches with ratings from last 30 days
-            matches = matches_ref.where('rating', '>', 0).where('rated_at', '>=', cutoff_date).stream()
-            
-            for match_doc in matches:
-                match_data = match_doc.to_dict()
-                
-                # Get match features
-                features = match_data.get('features', {})
-                
-                # Get senior data for grouping
-                senior_data = senior_doc.to_dict()
-                
-                training_sample = {
-                    'senior_id': senior_id,
-                    'caregiver_id': match_data.get('caregiver_id'),
-                    'rating': match_data.get('rating', 0),
-                    'similarity': features.get('similarity', 0),
-                    'location_score': features.get('location_score', 0),
-                    'availability_score': features.get('availability_score', 0),
-                    'specialization_score': features.get('specialization_score', 0),
-                    'price_score': features.get('price_score', 0),
-                    'years_experience': features.get('years_experience', 0),
-                    'certification_count': features.get('certification_count', 0),
-                    'past_rating': match_data.get('past_rating', 0),  # Average past rating
-                    'rated_at': match_data.get('rated_at'),
-                }
-                
-                training_data.append(training_sample)
+        if stats['watermark'] is not None:
+            watermark_ref.set({
+                'watermark': stats['watermark'],
+                'last_run_rows': stats['rows'],
+                'updated_at': firestore.SERVER_TIMESTAMP,
+            }, merge=True)
         
-        logger.info(f"Found {len(training_data)} training samples from last {days} days")
-        return training_data
+        logger.info(f"Extracted {stats['rows']} new ratings since {since.isoformat()}")
+        return stats
         
     except Exception as e:
-        logger.error(f"Error querying training data: {e}", exc_info=True)
+        logger.error(f"Error extracting training data: {e}", exc_info=True)
         raise
 
 
-def export_to_csv(data: List[Dict], filename: str) -> str:
-    """Export training data to CSV in Cloud Storage."""
+def query_training_data(days: int = 30) -> pa.Table:
+    """
+    Rated matches from the last N days, one row per (senior, caregiver).
+    
+    Extracts the new ratings first, then reads the window's partitions with
+    only the training columns. Rows are grouped by senior_id.
+    """
     try:
-        bucket = storage_client.bucket(BUCKET_NAME)
-        blob = bucket.blob(filename)
+        extract_training_data(days)
         
-        # Create CSV in memory
-        output = io.StringIO()
-        
-        if not data:
-            raise ValueError("No data to export")
+        filesystem, base_dir = open_dataset(TRAINING_DATA_URI)
+        cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+        training_data = load_training_table(
+            filesystem, f"{base_dir}/{MATCHES_DATASET}", cutoff_date, columns=TRAINING_COLUMNS
+        )
         
-        fieldnames = data[0].keys()
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+        logger.info(f"Found {training_data.num_rows} training samples from last {days} days")
+        return training_data
         
-        # Upload to Cloud Storage
-        blob.upload_from_string(output.getvalue(), content_type='text/csv')
+    except Exception as e:
+        logger.error(f"Error querying training data: {e}", exc_info=True)
+        raise
+
+
+def export_split(data: pa.Table, filename: str) -> str:
+    """Write one split of this run's training data as Parquet; returns its URI."""
+    try:
+        if not data.num_rows:
+            raise ValueError("No data to export")
         
-        gcs_path = f"gs://{BUCKET_NAME}/{filename}"
-        logger.info(f"Exported {len(data)} samples to {gcs_path}")
+        uri = f"{TRAINING_DATA_URI.rstrip('/')}/runs/{filename}"
+        filesystem, path = open_dataset(uri)
+        write_table(data, filesystem, path)
         
-        return gcs_path
+        logger.info(f"Exported {data.num_rows} samples to {uri}")
+        return uri
         
     except Exception as e:
-        logger.error(f"Error exporting to CSV: {e}", exc_info=True)
+        logger.error(f"Error exporting training data: {e}", exc_info=True)
         raise
 
 
@@ -171,116 +218,132 @@ def train_lambdarank_local(training_data_path: str) -> str:
     This is used if Vertex AI job creation fails.
     """
     try:
-        import pandas as pd
         import lightgbm as lgb
         
-        # Download training data
-        bucket = storage_client.bucket(BUCKET_NAME)
-        blob = bucket.blob(training_data_path.split('/')[-1])
-        data_content = blob.download_as_text()
+        # Contiguous per-senior query blocks from the training columns of the Parquet split
+        blocks = query_blocks(read_table(training_data_path, columns=TRAINING_COLUMNS))
         
-        # Parse CSV
-        df = pd.read_csv(io.StringIO(data_content))
-        
-        # Prepare features
-        feature_cols = [
-            'similarity', 'location_score', 'availability_score',
-            'specialization_score', 'price_score', 'years_experience',
-            'certification_count', 'past_rating'
-        ]
-        
-        X = df[feature_cols]
-        y = df['rating']
-        group = df.groupby('senior_id').size().values
-        
-        # Create LightGBM dataset
-        train_data = lgb.Dataset(X, label=y, group=group)
+        # Create LightGBM dataset (loaded from the cache when this data was built before)
+        train_data = get_dataset_builder().build(blocks)
         
         # Train LambdaRank model
-        params = {
-            'objective': 'lambdarank',
-            'metric': 'ndcg',
-            'boosting_type': 'gbdt',
-            'num_leaves': 31,
-            'learning_rate': 0.05,
-            'feature_fraction': 0.9,
-            'bagging_fraction': 0.8,
-            'bagging_freq': 5,
-            'verbose': 0,
-        }
-        
         model = lgb.train(
-            params,
+            LAMBDARANK_PARAMS,
             train_data,
             num_boost_round=100,
             valid_sets=[train_data],
             callbacks=[lgb.early_stopping(10), lgb.log_evaluation(10)]
         )
         
-        # Save model to Cloud Storage
-        model_bucket = storage_client.bucket(MODEL_BUCKET)
-        model_blob = model_bucket.blob(f"{MODEL_PATH}.new")
+        # Save model as text (LightGBM format) to Cloud Storage
+        return upload_candidate_model(model.model_to_string())
         
-        # Save model as text (LightGBM format)
-        model_str = model.model_to_string()
-        model_blob.upload_from_string(model_str, content_type='text/plain')
+    except Exception as e:
+        logger.error(f"Error in local training: {e}", exc_info=True)
+        raise
+
+
+def tune_lambdarank_local(training_data_path: str, selection_data_path: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Train with a CPU hyperparameter search (successive halving over random
+    configurations, trials in a process pool) and upload the best model.
+    
+    Both splits are built once through the Dataset cache; every trial loads
+    the same binaries and early-stops on selection NDCG@10. The selection
+    split is held out from training but is not the validation split, which
+    stays unseen until the deploy decision.
+    
+    Returns (model path, tuning report).
+    """
+    builder = get_dataset_builder()
+    train_set, valid_set = builder.build_pair(
+        query_blocks(read_table(training_data_path, columns=TRAINING_COLUMNS)),
+        query_blocks(read_table(selection_data_path, columns=TRAINING_COLUMNS)),
+    )
+    result = tune(
+        builder.binary_path(train_set),
+        builder.binary_path(valid_set),
+        builder.params,
+        n_trials=TUNING_TRIALS,
+        max_rounds=TUNING_MAX_ROUNDS,
+        workers=TUNING_WORKERS,
+    )
+    logger.info(
+        f"Tuning finished in {result.wall_seconds:.1f}s on {result.workers} workers, "
+        f"best ndcg@10 {result.best.score:.4f} with {result.best.params}\n{format_leaderboard(result)}"
+    )
+    return upload_candidate_model(result.best.model_str), result.summary()
+
+
+def train_incremental(base_model_path: str, new_data: pa.Table, selection_data_path: str) -> str:
+    """
+    Warm start: continue boosting the production model on the ratings it has
+    not seen, early-stopping on the selection split (never the validation
+    split that decides deployment). Uploaded next to the full-retrain
+    candidate so both can be evaluated.
+    """
+    try:
+        model_bucket = storage_client.bucket(MODEL_BUCKET)
+        base_model_str = model_bucket.blob(_blob_name(base_model_path)).download_as_text()
         
-        logger.info(f"Model trained and saved to gs://{MODEL_BUCKET}/{MODEL_PATH}.new")
-        return f"gs://{MODEL_BUCKET}/{MODEL_PATH}.new"
+        model = continue_training(
+            base_model_str,
+            query_blocks(new_data),
+            query_blocks(read_table(selection_data_path, columns=TRAINING_COLUMNS)),
+            {**LAMBDARANK_PARAMS, 'eval_at': [10]},
+        )
+        return upload_candidate_model(model.model_to_string(num_iteration=model.best_iteration), suffix=".incremental")
         
     except Exception as e:
-        logger.error(f"Error in local training: {e}", exc_info=True)
+        logger.error(f"Error in incremental training: {e}", exc_info=True)
         raise
 
 
+def upload_candidate_model(model_str: str, suffix: str = ".new") -> str:
+    """Upload a trained model (LightGBM text format) next to the production one, for evaluation."""
+    model_bucket = storage_client.bucket(MODEL_BUCKET)
+    model_blob = model_bucket.blob(f"{MODEL_PATH}{suffix}")
+    model_blob.upload_from_string(model_str, content_type='text/plain')
+    
+    logger.info(f"Model trained and saved to gs://{MODEL_BUCKET}/{MODEL_PATH}{suffix}")
+    return f"gs://{MODEL_BUCKET}/{MODEL_PATH}{suffix}"
+
+
 def evaluate_model(model_path: str, validation_data_path: str) -> Dict[str, float]:
     """Evaluate model on validation set and return metrics."""
     try:
-        import pandas as pd
         import lightgbm as lgb
         import numpy as np
         
-        # Download validation data
-        bucket = storage_client.bucket(BUCKET_NAME)
-        blob = bucket.blob(validation_data_path.split('/')[-1])
-        data_content = blob.download_as_text()
-        
-        df = pd.read_csv(io.StringIO(data_content))
-        
-        # Prepare features
-        feature_cols = [
-            'similarity', 'location_score', 'availability_score',
-            'specialization_score', 'price_score', 'years_experience',
-            'certification_count', 'past_rating'
-        ]
-        
-        X = df[feature_cols]
-        y = df['rating']
-        groups = df.groupby('senior_id').size().values
+        # Contiguous per-senior query blocks from the evaluation columns of the Parquet split
+        blocks = query_blocks(read_table(validation_data_path, columns=TRAINING_COLUMNS))
+        X, y, groups = blocks.X, blocks.y, blocks.groups
         
         # Load model
         model_bucket = storage_client.bucket(MODEL_BUCKET)
-        model_blob = model_bucket.blob(model_path.split('/')[-1])
+        model_blob = model_bucket.blob(_blob_name(model_path))
         model_str = model_blob.download_as_text()
         model = lgb.Booster(model_str=model_str)
         
         # Predict
         predictions = model.predict(X)
         
-        # Calculate NDCG@10
-        ndcg_10 = calculate_ndcg_at_k(y, predictions, groups, k=10)
+        # Ranking metrics: NDCG@{1,5,10}, MAP and MRR, per senior and averaged
+        ranking = evaluate_ranking(y, predictions, groups)
         
         # Calculate other metrics
         mse = np.mean((predictions - y) ** 2)
         mae = np.mean(np.abs(predictions - y))
         
         metrics = {
-            'ndcg@10': ndcg_10,
+            **ranking['metrics'],
             'mse': float(mse),
             'mae': float(mae),
         }
         
         logger.info(f"Model evaluation metrics: {metrics}")
+        for name in ('ndcg@10', 'map', 'mrr'):
+            logger.info(f"Per-senior {name} distribution: {summarize_distribution(ranking['per_group'][name])}")
         return metrics
         
     except Exception as e:
@@ -291,82 +354,103 @@ def evaluate_model(model_path: str, validation_data_path: str) -> Dict[str, floa
 def calculate_ndcg_at_k(y_true: List[float], y_pred: List[float], groups: List[int], k: int = 10) -> float:
     """Calculate NDCG@k for ranking."""
     try:
-        import numpy as np
-        
-        ndcg_scores = []
-        start_idx = 0
-        
-        for group_size in groups:
-            end_idx = start_idx + group_size
-            
-            group_true = np.array(y_true[start_idx:end_idx])
-            group_pred = np.array(y_pred[start_idx:end_idx])
-            
-            # Get top k indices
-            top_k_indices = np.argsort(group_pred)[::-1][:k]
-            top_k_true = group_true[top_k_indices]
-            
-            # Calculate DCG
-            dcg = np.sum(top_k_true / np.log2(np.arange(2, len(top_k_true) + 2)))
-            
-            # Calculate IDCG (ideal DCG)
-            ideal_order = np.sort(group_true)[::-1][:k]
-            idcg = np.sum(ideal_order / np.log2(np.arange(2, len(ideal_order) + 2)))
-            
-            # NDCG
-            ndcg = dcg / idcg if idcg > 0 else 0.0
-            ndcg_scores.append(ndcg)
-            
-            start_idx = end_idx
-        
-        return float(np.mean(ndcg_scores))
+        return evaluate_ranking(y_true, y_pred, groups, ks=(k,))['metrics'][f'ndcg@{k}']
         
     except Exception as e:
         logger.error(f"Error calculating NDCG: {e}", exc_info=True)
         return 0.0
 
 
-def get_current_model_metrics() -> float:
-    """Get current production model's NDCG@10 from Firestore config."""
+def get_current_model_config() -> Optional[Dict[str, Any]]:
+    """The production model's Firestore config, or None if no model is deployed."""
     try:
-        config_ref = db.collection('config').document('matching_model')
-        config_doc = config_ref.get()
+        config_doc = db.collection('config').document('matching_model').get()
+        return config_doc.to_dict() if config_doc.exists else None
         
-        if config_doc.exists:
-            config = config_doc.to_dict()
-            return config.get('ndcg@10', 0.0)
-        else:
-            return 0.0
-            
     except Exception as e:
-        logger.error(f"Error getting current model metrics: {e}")
+        logger.error(f"Error getting current model config: {e}")
+        return None
+
+
+def production_ndcg(model_config: Optional[Dict[str, Any]], validation_data_path: str) -> float:
+    """
+    NDCG@10 of the production model on this run's validation split.
+    
+    The stored ndcg@10 was measured on an earlier run's split, so it is not
+    comparable with a candidate's score. 0.0 when no model is deployed or it
+    cannot be loaded (matching then runs on the heuristic).
+    """
+    if not model_config or not model_config.get('model_path'):
         return 0.0
+    try:
+        return evaluate_model(model_config['model_path'], validation_data_path)['ndcg@10']
+    except Exception as e:
+        logger.error(f"Error evaluating production model {model_config['model_path']}: {e}")
+        return 0.0
+
+
+def get_last_full_rebuild() -> Optional[datetime]:
+    """When a full retrain last ran (deployed or not), from config/training_data."""
+    state_doc = db.collection('config').document('training_data').get()
+    return state_doc.to_dict().get('last_full_rebuild_at') if state_doc.exists else None
+
+
+def record_full_rebuild():
+    db.collection('config').document('training_data').set({
+        'last_full_rebuild_at': datetime.now(timezone.utc),
+    }, merge=True)
 
 
-def deploy_model(model_path: str, metrics: Dict[str, float]):
-    """Deploy new model to production."""
+def _blob_name(model_path: str) -> str:
+    """Object name within MODEL_BUCKET for a gs://bucket/name path (or a bare name)."""
+    prefix = f"gs://{MODEL_BUCKET}/"
+    return model_path[len(prefix):] if model_path.startswith(prefix) else model_path
+
+
+def versioned_model_path(model_version: str) -> str:
+    """Immutable object name for one model version, next to MODEL_PATH."""
+    directory = os.path.dirname(MODEL_PATH)
+    name = f"matching-model-{model_version}.txt"
+    return f"{directory}/{name}" if directory else name
+
+
+def deploy_model(model_path: str, metrics: Dict[str, float], training: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Deploy new model to production.
+    
+    The model is copied to an immutable versioned path, which the config
+    document points to; process_matching instances poll config/matching_model
+    and hot-swap to the new version. MODEL_PATH is also updated for readers
+    that load the fixed path. `training` (training_mode, trained_through) is
+    stored with it for the next incremental run. Returns the new model version.
+    """
     try:
-        # Copy new model to production path
+        model_version = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         model_bucket = storage_client.bucket(MODEL_BUCKET)
-        new_model_blob = model_bucket.blob(model_path.split('/')[-1])
-        prod_model_blob = model_bucket.blob(MODEL_PATH)
+        new_model_blob = model_bucket.blob(_blob_name(model_path))
+        versioned_path = versioned_model_path(model_version)
         
-        # Copy to production
+        # Versioned copy first, so the config never points at a missing object
+        model_bucket.copy_blob(new_model_blob, model_bucket, versioned_path)
         model_bucket.copy_blob(new_model_blob, model_bucket, MODEL_PATH)
         
         # Update Firestore config
         config_ref = db.collection('config').document('matching_model')
         config_ref.set({
-            'model_path': MODEL_PATH,
-            'model_version': datetime.utcnow().strftime('%Y%m%d_%H%M%S'),
+            'model_path': versioned_path,
+            'model_version': model_version,
             'ndcg@10': metrics['ndcg@10'],
+            'map': metrics['map'],
+            'mrr': metrics['mrr'],
             'mse': metrics['mse'],
             'mae': metrics['mae'],
             'ml_enabled': True,
             'deployed_at': firestore.SERVER_TIMESTAMP,
+            **(training or {}),
         }, merge=True)
         
-        logger.info(f"Model deployed to production: {MODEL_PATH}")
+        logger.info(f"Model {model_version} deployed to production: {versioned_path}")
+        return model_version
         
     except Exception as e:
         logger.error(f"Error deploying model: {e}", exc_info=True)
@@ -424,66 +508,143 @@ def retrain_ranking_model(request):
         training_data = query_training_data(days=30)
         
         # Step 2: Check if we have enough data
-        if len(training_data) < MIN_SAMPLES:
-            logger.warning(f"Insufficient data for retraining: {len(training_data)} < {MIN_SAMPLES}")
+        if training_data.num_rows < MIN_SAMPLES:
+            logger.warning(f"Insufficient data for retraining: {training_data.num_rows} < {MIN_SAMPLES}")
             return {
                 'status': 'insufficient_data',
-                'sample_count': len(training_data),
+                'sample_count': training_data.num_rows,
                 'min_required': MIN_SAMPLES,
             }, 200
         
-        # Step 3: Split into train/validation (80/20)
-        split_idx = int(len(training_data) * 0.8)
-        train_data = training_data[:split_idx]
-        val_data = training_data[split_idx:]
-        
-        # Step 4: Export to CSV
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        train_filename = f"training_data_{timestamp}.csv"
-        val_filename = f"validation_data_{timestamp}.csv"
-        
-        train_path = export_to_csv(train_data, train_filename)
-        val_path = export_to_csv(val_data, val_filename)
+        # Step 3: Split into train/validation by senior (deterministic hash, 80/20)
+        train_data, val_data = split_by_senior(training_data, VALIDATION_FRACTION)
+        if not train_data.num_rows or not val_data.num_rows:
+            logger.warning(
+                f"Cannot split {training_data.num_rows} samples by senior: "
+                f"{train_data.num_rows} train, {val_data.num_rows} validation"
+            )
+            return {
+                'status': 'insufficient_data',
+                'sample_count': training_data.num_rows,
+                'min_required': MIN_SAMPLES,
+            }, 200
         
-        # Step 5: Train model
-        job_name = f"lambdarank-training-{timestamp}"
-        model_path = create_vertex_ai_training_job(train_path, job_name)
+        # Hold out seniors of the training split for model selection; validation only decides deployment
+        train_data, selection_data = split_by_senior(train_data, SELECTION_FRACTION, SELECTION_SALT)
+        if not train_data.num_rows or not selection_data.num_rows:
+            logger.warning(
+                f"Cannot hold out a selection split: {train_data.num_rows} train, "
+                f"{selection_data.num_rows} selection"
+            )
+            return {
+                'status': 'insufficient_data',
+                'sample_count': training_data.num_rows,
+                'min_required': MIN_SAMPLES,
+            }, 200
         
-        # If Vertex AI job was created, wait for completion
-        # For now, we'll use the local training fallback
-        if not model_path.startswith('gs://'):
-            # Local training already completed
-            pass
+        # Step 4: Export to Parquet
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        train_filename = f"training_data_{timestamp}.parquet"
+        selection_filename = f"selection_data_{timestamp}.parquet"
+        val_filename = f"validation_data_{timestamp}.parquet"
+        
+        train_path = export_split(train_data, train_filename)
+        selection_path = export_split(selection_data, selection_filename)
+        val_path = export_split(val_data, val_filename)
+        
+        # Step 5: Full retrain, or warm start from the production model between full rebuilds
+        current_config = get_current_model_config()
+        training_mode, reason = 'full', "incremental training disabled"
+        new_data = None
+        if INCREMENTAL_TRAINING:
+            training_mode, reason = plan_training(
+                current_config, get_last_full_rebuild(), datetime.now(timezone.utc), FULL_REBUILD_INTERVAL_DAYS
+            )
+            if current_config and current_config.get('model_path') and current_config.get('trained_through'):
+                new_data = rows_after(train_data, current_config['trained_through'])
+        logger.info(f"Training mode: {training_mode} ({reason})")
+        training_info = {
+            'training_mode': training_mode,
+            'trained_through': pc.max(train_data['rated_at']).as_py(),
+        }
+        tuning, comparison = None, None
+        
+        if training_mode == 'incremental':
+            # New ratings accumulate (trained_through only advances on deploy) until there are enough
+            if new_data.num_rows < MIN_SAMPLES:
+                logger.info(f"Not enough new ratings for a warm start: {new_data.num_rows} < {MIN_SAMPLES}")
+                return {
+                    'status': 'success',
+                    'model_deployed': False,
+                    'training_mode': training_mode,
+                    'new_sample_count': new_data.num_rows,
+                    'message': 'Not enough new ratings since the production model',
+                }, 200
+            model_path = train_incremental(current_config['model_path'], new_data, selection_path)
+            
+            # Step 6: Evaluate the warm start and the model it continues on the same untouched
+            # validation split; early stopping saw only the selection split, so any gain counts
+            metrics = evaluate_model(model_path, val_path)
+            current_ndcg = production_ndcg(current_config, val_path)
+            threshold = 0.0
         else:
-            # Wait for Vertex AI job to complete (in production, use async polling)
-            logger.info("Waiting for Vertex AI training job to complete...")
-            # This would be implemented with async polling in production
-        
-        # Step 6: Evaluate model
-        metrics = evaluate_model(model_path, val_path)
-        current_ndcg = get_current_model_metrics()
+            if TRAINING_MODE == "tune":
+                model_path, tuning = tune_lambdarank_local(train_path, selection_path)
+            else:
+                job_name = f"lambdarank-training-{timestamp}"
+                model_path = create_vertex_ai_training_job(train_path, job_name)
+            record_full_rebuild()
+            
+            # If Vertex AI job was created, wait for completion
+            # For now, we'll use the local training fallback
+            if not model_path.startswith('gs://'):
+                # Local training already completed
+                pass
+            else:
+                # Wait for Vertex AI job to complete (in production, use async polling)
+                logger.info("Waiting for Vertex AI training job to complete...")
+                # This would be implemented with async polling in production
+            
+            # Step 6: Evaluate the candidate and the production model on the same untouched validation split
+            metrics = evaluate_model(model_path, val_path)
+            current_ndcg = production_ndcg(current_config, val_path)
+            threshold = IMPROVEMENT_THRESHOLD
+            
+            # On rebuild days, measure what a warm start would have reached on the same validation split
+            if new_data is not None and new_data.num_rows >= MIN_SAMPLES:
+                incremental_path = train_incremental(current_config['model_path'], new_data, selection_path)
+                incremental_ndcg = evaluate_model(incremental_path, val_path)['ndcg@10']
+                comparison = {
+                    'full_ndcg': metrics['ndcg@10'],
+                    'incremental_ndcg': incremental_ndcg,
+                    'gap': metrics['ndcg@10'] - incremental_ndcg,
+                }
+                logger.info(f"Full retrain vs warm start: {comparison}")
         
         # Step 7: Compare and deploy if improved
         improvement = metrics['ndcg@10'] - current_ndcg
         
-        if improvement > IMPROVEMENT_THRESHOLD:
+        if improvement > threshold:
             # Deploy new model
-            deploy_model(model_path, metrics)
+            model_version = deploy_model(model_path, metrics, training_info)
             
             # Log metrics
-            model_version = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
             log_metrics_to_monitoring(metrics, model_version)
             
             return {
                 'status': 'success',
                 'model_deployed': True,
+                'model_version': model_version,
                 'improvement': improvement,
                 'metrics': metrics,
                 'current_ndcg': current_ndcg,
                 'new_ndcg': metrics['ndcg@10'],
+                'training_mode': training_mode,
+                'incremental_comparison': comparison,
+                'tuning': tuning,
             }, 200
         else:
-            logger.info(f"New model did not improve performance: {improvement} <= {IMPROVEMENT_THRESHOLD}")
+            logger.info(f"New model did not improve performance: {improvement} <= {threshold}")
             
             # Log metrics anyway
             model_version = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
@@ -497,6 +658,9 @@ def retrain_ranking_model(request):
                 'current_ndcg': current_ndcg,
                 'new_ndcg': metrics['ndcg@10'],
                 'message': 'New model did not improve performance',
+                'training_mode': training_mode,
+                'incremental_comparison': comparison,
+                'tuning': tuning,
             }, 200
             
     except Exception as e:
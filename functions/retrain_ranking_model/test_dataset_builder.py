@@ -0,0 +1,108 @@
+"""
+Tests for senior-grouped LambdaRank datasets (dataset_builder.py).
+
+Checks that interleaved rows become contiguous query blocks, that the
+hash split never puts a senior on both sides and is stable across runs,
+and that cached Dataset binaries train the same model as a fresh build:
+
+    python test_dataset_builder.py
+"""
+import tempfile
+
+import lightgbm as lgb
+import numpy as np
+import pyarrow as pa
+
+from dataset_builder import (
+    SELECTION_SALT,
+    DatasetBuilder,
+    DatasetCache,
+    query_blocks,
+    split_by_senior,
+    validation_mask,
+)
+from training_data import FEATURE_COLUMNS
+
+PARAMS = {'objective': 'lambdarank', 'num_leaves': 7, 'min_data_in_leaf': 5, 'verbose': -1}
+
+
+def make_table(n_seniors: int = 200, per_senior: int = 10, seed: int = 0) -> pa.Table:
+    """Rows interleaved across seniors, as a rated_at-ordered read returns them."""
+    rng = np.random.default_rng(seed)
+    n = n_seniors * per_senior
+    columns = {
+        'senior_id': [f"senior_{i % n_seniors}" for i in range(n)],
+        'rating': pa.array(rng.integers(1, 6, n), pa.float32()),
+    }
+    for column in FEATURE_COLUMNS:
+        columns[column] = rng.random(n)
+    return pa.table(columns)
+
+
+def test_query_blocks_are_contiguous():
+    table = make_table(n_seniors=5, per_senior=4)
+    blocks = query_blocks(table)
+    assert blocks.groups.tolist() == [4] * 5 and blocks.groups.sum() == len(blocks.y)
+    assert blocks.senior_ids.tolist() == sorted(f"senior_{i}" for i in range(5))
+
+    # Every block holds exactly its senior's rows, in their original order
+    senior_0 = np.flatnonzero(np.array(table['senior_id'].to_pylist()) == "senior_0")
+    assert np.array_equal(blocks.X[:4], np.column_stack([table[c].to_numpy()[senior_0] for c in FEATURE_COLUMNS]))
+
+
+def test_split_by_senior_is_disjoint_and_stable():
+    table = make_table()
+    train, valid = split_by_senior(table, 0.2)
+    train_ids, valid_ids = set(train['senior_id'].to_pylist()), set(valid['senior_id'].to_pylist())
+    assert not train_ids & valid_ids
+    assert train.num_rows + valid.num_rows == table.num_rows
+    assert 0.1 < len(valid_ids) / 200 < 0.3
+
+    # Same seniors on the same side whatever the row order or the other rows
+    shuffled = table.take(np.random.default_rng(1).permutation(table.num_rows))
+    assert set(split_by_senior(shuffled, 0.2)[1]['senior_id'].to_pylist()) == valid_ids
+    assert validation_mask(["senior_7"], 0.2).tolist() == ["senior_7" in valid_ids]
+
+
+def test_selection_split_holds_out_training_seniors():
+    table = make_table()
+    train, valid = split_by_senior(table, 0.2)
+    fit, selection = split_by_senior(train, 0.2, SELECTION_SALT)
+    fit_ids, selection_ids = set(fit['senior_id'].to_pylist()), set(selection['senior_id'].to_pylist())
+    valid_ids = set(valid['senior_id'].to_pylist())
+
+    # Three disjoint groups of seniors; a salt independent of the validation one keeps selection non-empty
+    assert not fit_ids & selection_ids and not (fit_ids | selection_ids) & valid_ids
+    assert fit.num_rows + selection.num_rows == train.num_rows
+    assert 0.1 < len(selection_ids) / len(fit_ids | selection_ids) < 0.3
+    assert split_by_senior(train, 0.2)[1].num_rows == 0
+
+
+def test_cached_dataset_trains_the_same_model():
+    train, valid = split_by_senior(make_table())
+    train_blocks, valid_blocks = query_blocks(train), query_blocks(valid)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first = DatasetBuilder(DatasetCache(cache_dir))
+        train_set, valid_set = first.build_pair(train_blocks, valid_blocks)
+        fresh = lgb.train(PARAMS, train_set, num_boost_round=10, valid_sets=[valid_set])
+        assert (first.hits, first.misses) == (0, 2)
+
+        # A rerun (new builder, same data) loads both binaries
+        rerun = DatasetBuilder(DatasetCache(cache_dir))
+        train_set, valid_set = rerun.build_pair(query_blocks(train), query_blocks(valid))
+        cached = lgb.train(PARAMS, train_set, num_boost_round=10, valid_sets=[valid_set])
+        assert (rerun.hits, rerun.misses) == (2, 0)
+        assert cached.model_to_string() == fresh.model_to_string()
+        assert cached.best_score == fresh.best_score
+
+        # Different data misses the cache
+        rerun.build(query_blocks(make_table(seed=1)))
+        assert rerun.misses == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All dataset builder tests passed")
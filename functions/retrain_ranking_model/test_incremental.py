@@ -0,0 +1,70 @@
+"""
+Tests for incremental warm-start retraining (incremental.py).
+
+Checks when a run falls back to a full rebuild, that only ratings after the
+production model's watermark are selected, and that a warm start keeps the
+production trees and adds new ones:
+
+    python test_incremental.py
+"""
+from datetime import datetime, timedelta, timezone
+
+import lightgbm as lgb
+import numpy as np
+import pyarrow as pa
+
+from dataset_builder import query_blocks, split_by_senior
+from incremental import continue_training, plan_training, rows_after
+from test_tuning import make_table
+
+NOW = datetime(2025, 3, 10, 2, 0, tzinfo=timezone.utc)
+PARAMS = {'objective': 'lambdarank', 'metric': 'ndcg', 'eval_at': [10], 'num_leaves': 7, 'verbose': -1}
+
+
+def test_plan_training():
+    model = {'model_path': 'models/matching-model-1.txt', 'trained_through': NOW - timedelta(days=1)}
+    assert plan_training(None, NOW, NOW)[0] == 'full'
+    assert plan_training({'model_path': 'm.txt'}, NOW, NOW)[0] == 'full'
+    assert plan_training(model, None, NOW)[0] == 'full'
+    assert plan_training(model, NOW - timedelta(days=2), NOW, interval_days=7)[0] == 'incremental'
+    assert plan_training(model, NOW - timedelta(days=7), NOW, interval_days=7)[0] == 'full'
+
+
+def test_rows_after_watermark():
+    times = [NOW - timedelta(hours=h) for h in (30, 20, 10, 0)]
+    table = pa.table({
+        'senior_id': ['a', 'b', 'a', 'c'],
+        'rated_at': pa.array(times, pa.timestamp('us', tz='UTC')),
+    })
+    assert rows_after(table, NOW - timedelta(hours=20))['senior_id'].to_pylist() == ['a', 'c']
+    assert rows_after(table, NOW).num_rows == 0
+
+
+def test_warm_start_keeps_production_trees():
+    train, valid = split_by_senior(make_table(n_seniors=300))
+    old, new = query_blocks(train.slice(0, 1200)), query_blocks(train.slice(1200))
+    valid = query_blocks(valid)
+    base = lgb.train(
+        PARAMS, lgb.Dataset(old.X, label=old.y, group=old.groups, feature_name=list(old.feature_names)),
+        num_boost_round=20,
+    )
+
+    model = continue_training(base.model_to_string(), new, valid, PARAMS, rounds=15)
+    assert base.num_trees() < model.best_iteration <= base.num_trees() + 15
+    # The first trees are the production model's
+    assert np.allclose(model.predict(valid.X, num_iteration=base.num_trees()), base.predict(valid.X))
+
+    renamed = new._replace(feature_names=tuple(f"f{i}" for i in range(len(new.feature_names))))
+    try:
+        continue_training(base.model_to_string(), renamed, valid, PARAMS)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All incremental training tests passed")
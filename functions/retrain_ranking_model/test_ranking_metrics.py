@@ -0,0 +1,102 @@
+"""
+Parity tests for the vectorized ranking metrics (ranking_metrics.py).
+
+NDCG@k is checked against the per-group loop previously used by
+evaluate_model; MAP and MRR against straightforward per-group definitions:
+
+    python test_ranking_metrics.py
+"""
+import numpy as np
+
+from ranking_metrics import evaluate_ranking, summarize_distribution
+
+TOLERANCE = 1e-12
+
+
+def loop_ndcg_at_k(y_true, y_pred, groups, k: int = 10) -> float:
+    """The original calculate_ndcg_at_k from main.py, one group at a time."""
+    ndcg_scores = []
+    start_idx = 0
+    for group_size in groups:
+        end_idx = start_idx + group_size
+        group_true = np.array(y_true[start_idx:end_idx])
+        group_pred = np.array(y_pred[start_idx:end_idx])
+        top_k_indices = np.argsort(group_pred)[::-1][:k]
+        top_k_true = group_true[top_k_indices]
+        dcg = np.sum(top_k_true / np.log2(np.arange(2, len(top_k_true) + 2)))
+        ideal_order = np.sort(group_true)[::-1][:k]
+        idcg = np.sum(ideal_order / np.log2(np.arange(2, len(ideal_order) + 2)))
+        ndcg_scores.append(dcg / idcg if idcg > 0 else 0.0)
+        start_idx = end_idx
+    return float(np.mean(ndcg_scores))
+
+
+def loop_map_mrr(y_true, y_pred, groups, relevant_rating: float = 4):
+    aps, rrs = [], []
+    start = 0
+    for size in groups:
+        true = np.asarray(y_true[start:start + size])
+        order = np.argsort(-np.asarray(y_pred[start:start + size]), kind='stable')
+        relevant = true[order] >= relevant_rating
+        hits = np.flatnonzero(relevant)
+        aps.append(np.mean([(i + 1) / (pos + 1) for i, pos in enumerate(hits)]) if len(hits) else 0.0)
+        rrs.append(1.0 / (hits[0] + 1) if len(hits) else 0.0)
+        start += size
+    return float(np.mean(aps)), float(np.mean(rrs))
+
+
+def make_groups(rng: np.random.Generator, n_groups: int, max_size: int = 30):
+    groups = rng.integers(1, max_size + 1, n_groups)
+    n = int(groups.sum())
+    y_true = rng.integers(0, 6, n).astype(float)
+    y_pred = rng.normal(size=n)  # continuous, so no ties
+    return y_true, y_pred, groups
+
+
+def test_ndcg_parity_with_loop():
+    rng = np.random.default_rng(0)
+    y_true, y_pred, groups = make_groups(rng, 500)
+    result = evaluate_ranking(y_true, y_pred, groups, ks=(1, 3, 5, 10, 50))
+    for k in (1, 3, 5, 10, 50):
+        assert abs(result['metrics'][f'ndcg@{k}'] - loop_ndcg_at_k(y_true, y_pred, groups, k)) < TOLERANCE
+
+
+def test_map_mrr_parity():
+    rng = np.random.default_rng(1)
+    y_true, y_pred, groups = make_groups(rng, 300)
+    metrics = evaluate_ranking(y_true, y_pred, groups)['metrics']
+    expected_map, expected_mrr = loop_map_mrr(y_true, y_pred, groups)
+    assert abs(metrics['map'] - expected_map) < TOLERANCE
+    assert abs(metrics['mrr'] - expected_mrr) < TOLERANCE
+
+
+def test_edge_groups():
+    # Single row, all-zero ratings, no relevant rating, perfect and reversed order
+    y_true = [3, 0, 0, 2, 1, 5, 4, 1]
+    y_pred = [0.1, 0.5, 0.2, 0.9, 0.8, 0.1, 0.2, 0.3]
+    groups = [1, 2, 2, 3]
+    result = evaluate_ranking(y_true, y_pred, groups, ks=(10,))
+    per_group = result['per_group']
+    assert per_group['ndcg@10'][0] == 1.0 and per_group['ndcg@10'][1] == 0.0
+    assert per_group['ndcg@10'][2] == 1.0
+    assert per_group['map'].tolist()[:3] == [0.0, 0.0, 0.0]
+    assert abs(per_group['mrr'][3] - 1 / 2) < TOLERANCE
+    assert abs(per_group['map'][3] - (1 / 2 + 2 / 3) / 2) < TOLERANCE
+
+    summary = summarize_distribution(per_group['ndcg@10'])
+    assert summary['zero_share'] == 0.25 and summary['p90'] == 1.0
+
+    try:
+        evaluate_ranking(y_true, y_pred, [4, 5])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for mismatched group sizes")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All ranking metrics tests passed")
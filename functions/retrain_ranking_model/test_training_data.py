@@ -0,0 +1,150 @@
+"""
+Tests for training data extraction and the Parquet dataset (training_data.py).
+
+An in-memory stand-in for the collection-group query checks cursor paging;
+datasets are written to a temporary local directory, so no GCP access is
+needed:
+
+    python test_training_data.py
+"""
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from training_data import (
+    FEATURE_COLUMNS,
+    load_training_table,
+    match_row,
+    open_dataset,
+    stream_rated_matches,
+    write_partitions,
+)
+
+START = datetime(2024, 3, 1, 22, 0, tzinfo=timezone.utc)
+
+
+def match_doc(senior_id: str, caregiver_id: str, hours: float, rating: float = 4, parent: str = 'seniors'):
+    senior_ref = SimpleNamespace(id=senior_id, parent=SimpleNamespace(id=parent))
+    data = {
+        'caregiver_id': caregiver_id,
+        'rating': rating,
+        'rated_at': START + timedelta(hours=hours),
+        'features': {'similarity': 0.8, 'price_score': 0.5, 'years_experience': 3},
+    }
+    return SimpleNamespace(
+        reference=SimpleNamespace(parent=SimpleNamespace(parent=senior_ref)),
+        to_dict=lambda: dict(data),
+    )
+
+
+class FakeCollectionGroup:
+    """Supports the where/order_by/limit/start_after chain used by stream_rated_matches."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.since = None
+        self.page_size = None
+        self.after = None
+        self.pages_read = 0
+
+    def where(self, filter):
+        assert filter.field_path == 'rated_at' and filter.op_string == '>='
+        self.since = filter.value
+        return self
+
+    def order_by(self, field):
+        assert field == 'rated_at'
+        return self
+
+    def limit(self, page_size):
+        self.page_size = page_size
+        return self
+
+    def start_after(self, doc):
+        page = FakeCollectionGroup(self.docs)
+        page.since, page.page_size, page.after, page.parent = self.since, self.page_size, doc, self
+        return page
+
+    def stream(self):
+        root = getattr(self, 'parent', self)
+        root.pages_read += 1
+        docs = sorted(
+            (doc for doc in self.docs if doc.to_dict()['rated_at'] >= self.since),
+            key=lambda doc: doc.to_dict()['rated_at'],
+        )
+        if self.after is not None:
+            docs = docs[docs.index(self.after) + 1:]
+        return iter(docs[:self.page_size])
+
+
+def fake_db(docs):
+    group = FakeCollectionGroup(docs)
+    return SimpleNamespace(collection_group=lambda name: group), group
+
+
+def test_stream_pages_with_cursor():
+    docs = [match_doc(f"senior_{i % 3}", f"caregiver_{i}", hours=i) for i in range(25)]
+    docs.append(match_doc("senior_0", "unrated", hours=30, rating=0))
+    docs.append(match_doc("other", "caregiver_x", hours=31, parent='archive'))
+    db, group = fake_db(docs)
+
+    rows = list(stream_rated_matches(db, START + timedelta(hours=5), page_size=4))
+    assert [row['caregiver_id'] for row in rows] == [f"caregiver_{i}" for i in range(5, 25)]
+    assert rows[0]['senior_id'] == "senior_2" and rows[0]['similarity'] == 0.8
+    assert group.pages_read == 6
+
+
+def test_partitions_and_window():
+    rows = [
+        match_row(f"senior_{i % 4}", {
+            'caregiver_id': f"caregiver_{i}", 'rating': 1 + i % 5,
+            'rated_at': START + timedelta(hours=i), 'features': {'similarity': i / 100},
+        })
+        for i in range(60)
+    ]
+    with tempfile.TemporaryDirectory() as root:
+        filesystem, base_dir = open_dataset(root)
+        stats = write_partitions(iter(rows), filesystem, base_dir, "run1", batch_rows=7)
+        assert stats['rows'] == 60 and stats['watermark'] == rows[-1]['rated_at']
+        # 22:00 on March 1st + 59h spans four dates
+        assert sorted(os.listdir(root)) == [f"rated_date=2024-03-0{day}" for day in range(1, 5)]
+
+        table = load_training_table(filesystem, base_dir, date(2024, 3, 3), columns=['senior_id', 'rating'] + FEATURE_COLUMNS)
+        assert table.column_names == ['senior_id', 'rating'] + FEATURE_COLUMNS
+        # Rows from March 3rd on: hours 26..59
+        assert table.num_rows == 34
+        senior_ids = table['senior_id'].to_pylist()
+        assert senior_ids == sorted(senior_ids)
+
+
+def test_incremental_runs_keep_latest_rating():
+    first = [
+        match_row("senior_1", {'caregiver_id': f"caregiver_{i}", 'rating': 3, 'rated_at': START + timedelta(hours=i)})
+        for i in range(3)
+    ]
+    # Second run re-reads the watermark row and a caregiver re-rated later
+    second = [
+        first[-1],
+        match_row("senior_1", {'caregiver_id': "caregiver_0", 'rating': 5, 'rated_at': START + timedelta(hours=5)}),
+    ]
+    with tempfile.TemporaryDirectory() as root:
+        filesystem, base_dir = open_dataset(root)
+        write_partitions(iter(first), filesystem, base_dir, "run1")
+        write_partitions(iter(second), filesystem, base_dir, "run2")
+        assert write_partitions(iter([]), filesystem, base_dir, "run3")['watermark'] is None
+
+        table = load_training_table(filesystem, base_dir, date(2024, 3, 1), columns=['caregiver_id', 'rating'])
+        ratings = dict(zip(table['caregiver_id'].to_pylist(), table['rating'].to_pylist()))
+        assert ratings == {"caregiver_0": 5, "caregiver_1": 3, "caregiver_2": 3}
+
+        empty = load_training_table(filesystem, f"{base_dir}/missing", date(2024, 3, 1), columns=['rating'])
+        assert empty.num_rows == 0 and empty.column_names == ['rating']
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All training data tests passed")
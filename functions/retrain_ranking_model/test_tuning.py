@@ -0,0 +1,82 @@
+"""
+Tests for the CPU hyperparameter search (tuning.py).
+
+Runs a small successive-halving search in a two-process pool on cached
+synthetic Datasets, and checks the rung budgets, that only the best 1/eta
+configurations are promoted, and that the returned model is the best
+final-rung trial:
+
+    python test_tuning.py
+"""
+import lightgbm as lgb
+import numpy as np
+import pyarrow as pa
+
+from dataset_builder import DatasetBuilder, query_blocks, split_by_senior
+from training_data import FEATURE_COLUMNS
+from tuning import format_leaderboard, rung_budgets, sample_params, tune
+
+
+def make_table(n_seniors: int = 150, per_senior: int = 8, seed: int = 0) -> pa.Table:
+    """Ratings that follow the first two features, so trials can learn something."""
+    rng = np.random.default_rng(seed)
+    n = n_seniors * per_senior
+    columns = {'senior_id': [f"senior_{i // per_senior}" for i in range(n)]}
+    for column in FEATURE_COLUMNS:
+        columns[column] = rng.random(n)
+    signal = columns[FEATURE_COLUMNS[0]] + columns[FEATURE_COLUMNS[1]] + 0.3 * rng.random(n)
+    columns['rating'] = pa.array(np.clip(np.round(signal * 2.5), 1, 5), pa.float32())
+    return pa.table(columns)
+
+
+def test_rung_budgets():
+    assert rung_budgets(50, 400, 3) == [50, 150, 400]
+    assert rung_budgets(10, 90, 3) == [10, 30, 90]
+    assert rung_budgets(100, 100, 3) == [100]
+
+
+def test_sample_params_in_range():
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        params = sample_params(rng)
+        assert 7 <= params['num_leaves'] <= 127
+        assert 0.01 <= params['learning_rate'] <= 0.3
+        assert 0.5 <= params['feature_fraction'] <= 1.0
+        assert 0.5 <= params['bagging_fraction'] <= 1.0
+    assert sample_params(np.random.default_rng(3)) == sample_params(np.random.default_rng(3))
+
+
+def test_successive_halving_returns_best_final_model():
+    train, valid = split_by_senior(make_table())
+    builder = DatasetBuilder()
+    train_set, valid_set = builder.build_pair(query_blocks(train), query_blocks(valid))
+    result = tune(
+        builder.binary_path(train_set), builder.binary_path(valid_set), builder.params,
+        n_trials=6, min_rounds=10, max_rounds=30, eta=3, workers=2,
+    )
+
+    # 6 configurations at 10 rounds, the best 2 promoted to 30
+    assert len(result.leaderboard) == 6
+    assert [t.rung for t in result.leaderboard] == [1, 1, 0, 0, 0, 0]
+    assert all(t.rounds == 30 for t in result.leaderboard[:2])
+    finals = result.leaderboard[:2]
+    assert result.best == max(finals, key=lambda t: t.score)
+
+    # Only final-rung trials carry a model; the best one predicts with its best iteration
+    assert all(t.model_str is None for t in result.leaderboard[2:])
+    model = lgb.Booster(model_str=result.best.model_str)
+    assert model.num_trees() == result.best.best_iteration
+    assert 0 < result.best.score <= 1
+
+    summary = result.summary(top=3)
+    assert summary['best_params'] == result.best.params and len(summary['leaderboard']) == 3
+    assert summary['workers'] == 2 and summary['wall_seconds'] > 0
+    assert len(format_leaderboard(result).splitlines()) == 7
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            print(f"Running {name}...")
+            test()
+    print("\n All tuning tests passed")
@@ -0,0 +1,206 @@
+"""
+Training data extraction and columnar storage for the ranking model.
+
+Rated matches are read with one collection-group query over every senior's
+matches subcollection, ordered by rated_at and paged with a cursor, so the
+job never holds more than one page of documents. Rows stream into Parquet
+files partitioned by rating date (hive layout, rated_date=YYYY-MM-DD) on any
+pyarrow filesystem: GCS in production, a local directory for development
+and benchmarks. Each daily run appends only the ratings newer than the
+stored watermark; training then reads the partitions of its window, with
+only the columns it needs.
+"""
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = [
+    'similarity', 'location_score', 'availability_score',
+    'specialization_score', 'price_score', 'years_experience',
+    'certification_count', 'past_rating',
+]
+
+SCHEMA = pa.schema([
+    ('senior_id', pa.string()),
+    ('caregiver_id', pa.string()),
+    ('rating', pa.float32()),
+    ('similarity', pa.float64()),
+    ('location_score', pa.float64()),
+    ('availability_score', pa.float64()),
+    ('specialization_score', pa.float64()),
+    ('price_score', pa.float64()),
+    ('years_experience', pa.int32()),
+    ('certification_count', pa.int32()),
+    ('past_rating', pa.float32()),
+    ('rated_at', pa.timestamp('us', tz='UTC')),
+])
+
+PARTITION_FIELD = 'rated_date'
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.date32())]), flavor='hive')
+PAGE_SIZE = 1000
+WRITE_BATCH_ROWS = 10000
+COMPRESSION = 'zstd'
+
+
+def match_row(senior_id: str, match_data: Dict) -> Dict:
+    """One training row from a rated match document."""
+    features = match_data.get('features') or {}
+    return {
+        'senior_id': senior_id,
+        'caregiver_id': match_data.get('caregiver_id'),
+        'rating': match_data.get('rating', 0),
+        'similarity': features.get('similarity', 0),
+        'location_score': features.get('location_score', 0),
+        'availability_score': features.get('availability_score', 0),
+        'specialization_score': features.get('specialization_score', 0),
+        'price_score': features.get('price_score', 0),
+        'years_experience': features.get('years_experience', 0),
+        'certification_count': features.get('certification_count', 0),
+        'past_rating': match_data.get('past_rating', 0),  # Average past rating
+        'rated_at': match_data.get('rated_at'),
+    }
+
+
+def stream_rated_matches(db, since: datetime, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+    """
+    Yield a training row for every match rated at or after `since`.
+
+    Uses a single collection_group('matches') query ordered by rated_at and
+    resumes each page after the last document of the previous one. Only
+    matches stored under /seniors/{seniorId}/matches are used.
+    """
+    query = (
+        db.collection_group('matches')
+        .where(filter=FieldFilter('rated_at', '>=', since))
+        .order_by('rated_at')
+        .limit(page_size)
+    )
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(page.stream())
+        for match_doc in docs:
+            senior_ref = match_doc.reference.parent.parent
+            if senior_ref is None or senior_ref.parent.id != 'seniors':
+                continue
+            match_data = match_doc.to_dict()
+            if not match_data.get('rating', 0) > 0:
+                continue
+            yield match_row(senior_ref.id, match_data)
+        if len(docs) < page_size:
+            return
+        last_doc = docs[-1]
+
+
+def open_dataset(uri: str) -> Tuple[pafs.FileSystem, str]:
+    """(filesystem, base path) for a dataset URI: gs://bucket/prefix or a local path."""
+    return pafs.FileSystem.from_uri(uri)
+
+
+def _batched(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_partitions(
+    rows: Iterable[Dict],
+    filesystem: pafs.FileSystem,
+    base_dir: str,
+    run_id: str,
+    batch_rows: int = WRITE_BATCH_ROWS,
+) -> Dict:
+    """
+    Stream rows into date-partitioned Parquet files.
+
+    Each run writes one file per rating date it touches
+    ({base_dir}/rated_date=YYYY-MM-DD/part-{run_id}.parquet), converting rows
+    to columns batch_rows at a time. Returns {'rows', 'partitions', 'watermark'},
+    where watermark is the latest rated_at written (None if no rows).
+    """
+    writers: Dict[date, pq.ParquetWriter] = {}
+    row_count, watermark = 0, None
+    try:
+        for batch in _batched(rows, batch_rows):
+            table = pa.Table.from_pylist(batch, schema=SCHEMA)
+            days = pc.cast(table['rated_at'], pa.date32())
+            for day in pc.unique(days).to_pylist():
+                if day not in writers:
+                    directory = f"{base_dir}/{PARTITION_FIELD}={day.isoformat()}"
+                    filesystem.create_dir(directory, recursive=True)
+                    writers[day] = pq.ParquetWriter(
+                        f"{directory}/part-{run_id}.parquet", SCHEMA,
+                        filesystem=filesystem, compression=COMPRESSION,
+                    )
+                writers[day].write_table(table.filter(pc.equal(days, pa.scalar(day, pa.date32()))))
+            row_count += table.num_rows
+            batch_max = pc.max(table['rated_at']).as_py()
+            watermark = batch_max if watermark is None else max(watermark, batch_max)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    logger.info(f"Wrote {row_count} training rows to {len(writers)} partitions under {base_dir}")
+    return {'rows': row_count, 'partitions': len(writers), 'watermark': watermark}
+
+
+def load_training_table(
+    filesystem: pafs.FileSystem,
+    base_dir: str,
+    since: date,
+    columns: Optional[Sequence[str]] = None,
+) -> pa.Table:
+    """
+    Rows rated on or after `since`, grouped by senior.
+
+    Only the partitions in the window and the requested columns are read.
+    A match rated again (or read twice across a watermark boundary) keeps
+    its latest row. Rows are sorted by senior_id so every senior's
+    candidates are contiguous, as LambdaRank groups require.
+    """
+    try:
+        dataset = ds.dataset(base_dir, filesystem=filesystem, format='parquet', partitioning=PARTITIONING)
+    except FileNotFoundError:
+        return SCHEMA.empty_table().select(list(columns) if columns else SCHEMA.names)
+    wanted = list(columns) if columns else SCHEMA.names
+    read_columns = list(dict.fromkeys(['senior_id', 'caregiver_id', 'rated_at'] + wanted))
+    table = dataset.to_table(
+        columns=read_columns,
+        filter=ds.field(PARTITION_FIELD) >= pa.scalar(since, pa.date32()),
+    )
+    if not table.num_rows:
+        return table.select(wanted)
+
+    # Latest rating per (senior, caregiver): last row index after sorting by rated_at
+    table = table.sort_by([('rated_at', 'ascending')])
+    table = table.append_column('_row', pa.array(range(table.num_rows), pa.int64()))
+    latest = table.group_by(['senior_id', 'caregiver_id']).aggregate([('_row', 'max')])
+    table = table.take(latest['_row_max'])
+    return table.sort_by([('senior_id', 'ascending'), ('rated_at', 'ascending')]).select(wanted)
+
+
+def write_table(table: pa.Table, filesystem: pafs.FileSystem, path: str):
+    """Write one Parquet file (a train or validation split of a run)."""
+    parent = path.rsplit('/', 1)[0]
+    filesystem.create_dir(parent, recursive=True)
+    pq.write_table(table, path, filesystem=filesystem, compression=COMPRESSION)
+
+
+def read_table(uri: str, columns: Optional[Sequence[str]] = None) -> pa.Table:
+    """Read a Parquet file written by write_table, only the given columns."""
+    filesystem, path = open_dataset(uri)
+    return pq.read_table(path, filesystem=filesystem, columns=list(columns) if columns else None)
@@ -0,0 +1,198 @@
+"""
+CPU hyperparameter search for the LambdaRank trainer.
+
+Random configurations over num_leaves, learning_rate and the feature and
+bagging fractions are raced with successive halving: every configuration
+trains for a small round budget, the best 1/eta continue with eta times the
+budget, until one rung reaches max_rounds. Each trial early-stops on
+validation NDCG@10.
+
+Trials run in a process pool. Workers load the training and validation
+Datasets once, from the binaries written by dataset_builder, so no trial
+rebuilds features or bins. Each trial uses a single LightGBM thread, and
+the pool provides the parallelism.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import lightgbm as lgb
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_PARAMS = {
+    'objective': 'lambdarank',
+    'metric': 'ndcg',
+    'eval_at': [10],
+    'boosting_type': 'gbdt',
+    'bagging_freq': 5,
+    'num_threads': 1,
+    'seed': 7,
+    'verbose': -1,
+}
+VALID_METRIC = 'ndcg@10'
+EARLY_STOPPING_ROUNDS = 20
+
+# Worker-process state: Datasets loaded once per process
+_train_set: Optional[lgb.Dataset] = None
+_valid_set: Optional[lgb.Dataset] = None
+
+
+class Trial(NamedTuple):
+    trial_id: int
+    rung: int
+    rounds: int
+    params: Dict
+    score: float
+    best_iteration: int
+    seconds: float
+    model_str: Optional[str]
+
+
+class TuningResult(NamedTuple):
+    best: Trial
+    leaderboard: List[Trial]   # the latest rung of every configuration, best first
+    wall_seconds: float
+    workers: int
+
+    def summary(self, top: int = 5) -> Dict:
+        """JSON-friendly report: best params, timings and the top of the leaderboard."""
+        return {
+            'best_params': self.best.params,
+            'best_score': self.best.score,
+            'best_iteration': self.best.best_iteration,
+            'wall_seconds': round(self.wall_seconds, 2),
+            'workers': self.workers,
+            'trials': len(self.leaderboard),
+            'leaderboard': [
+                {'trial': t.trial_id, 'rung': t.rung, 'rounds': t.rounds, 'score': t.score,
+                 'best_iteration': t.best_iteration, 'seconds': round(t.seconds, 2), **t.params}
+                for t in self.leaderboard[:top]
+            ],
+        }
+
+
+def sample_params(rng: np.random.Generator) -> Dict:
+    """One random configuration (log-uniform leaves and learning rate)."""
+    return {
+        'num_leaves': int(round(math.exp(rng.uniform(math.log(7), math.log(127))))),
+        'learning_rate': float(math.exp(rng.uniform(math.log(0.01), math.log(0.3)))),
+        'feature_fraction': float(rng.uniform(0.5, 1.0)),
+        'bagging_fraction': float(rng.uniform(0.5, 1.0)),
+    }
+
+
+def _load_datasets(train_path: str, valid_path: str, dataset_params: Dict):
+    global _train_set, _valid_set
+    _train_set = lgb.Dataset(train_path, params=dataset_params).construct()
+    _valid_set = lgb.Dataset(valid_path, params=dataset_params, reference=_train_set).construct()
+
+
+def _run_trial(trial_id: int, rung: int, rounds: int, params: Dict, keep_model: bool) -> Trial:
+    start = time.perf_counter()
+    booster = lgb.train(
+        {**BASE_PARAMS, **params},
+        _train_set,
+        num_boost_round=rounds,
+        valid_sets=[_valid_set],
+        valid_names=['valid'],
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, first_metric_only=True, verbose=False)],
+    )
+    return Trial(
+        trial_id=trial_id,
+        rung=rung,
+        rounds=rounds,
+        params=params,
+        score=float(booster.best_score['valid'][VALID_METRIC]),
+        best_iteration=booster.best_iteration or rounds,
+        seconds=time.perf_counter() - start,
+        model_str=booster.model_to_string(num_iteration=booster.best_iteration) if keep_model else None,
+    )
+
+
+def rung_budgets(min_rounds: int, max_rounds: int, eta: int) -> List[int]:
+    """Round budget of each rung: min_rounds * eta**i, capped by (and ending at) max_rounds."""
+    budgets = [min_rounds]
+    while budgets[-1] < max_rounds:
+        budgets.append(min(budgets[-1] * eta, max_rounds))
+    return budgets
+
+
+def tune(
+    train_path: str,
+    valid_path: str,
+    dataset_params: Dict,
+    n_trials: int = 18,
+    min_rounds: int = 50,
+    max_rounds: int = 400,
+    eta: int = 3,
+    workers: Optional[int] = None,
+    seed: int = 0,
+) -> TuningResult:
+    """
+    Successive halving over n_trials random configurations.
+
+    Args:
+        train_path, valid_path: LightGBM Dataset binaries (valid built with
+            the training Dataset as reference).
+        dataset_params: Parameters the binaries were constructed with.
+
+    Returns the best trial of the final rung (with its model text) and the
+    leaderboard of every configuration at the last rung it reached.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    configs = {trial_id: sample_params(rng) for trial_id in range(n_trials)}
+    budgets = rung_budgets(min_rounds, max_rounds, eta)
+    latest: Dict[int, Trial] = {}
+
+    # spawn: LightGBM's OpenMP runtime is not fork-safe once the parent has trained
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context,
+        initializer=_load_datasets, initargs=(train_path, valid_path, dataset_params),
+    ) as pool:
+        alive = list(configs)
+        for rung, rounds in enumerate(budgets):
+            final = rung == len(budgets) - 1
+            futures = [
+                pool.submit(_run_trial, trial_id, rung, rounds, configs[trial_id], final)
+                for trial_id in alive
+            ]
+            results = sorted((future.result() for future in futures), key=lambda t: t.score, reverse=True)
+            for trial in results:
+                latest[trial.trial_id] = trial
+            logger.info(
+                f"Rung {rung}: {len(results)} trials x {rounds} rounds, best {VALID_METRIC} {results[0].score:.4f}"
+            )
+            alive = [t.trial_id for t in results[:max(1, len(results) // eta)]]
+
+    leaderboard = sorted(latest.values(), key=lambda t: (t.rung, t.score), reverse=True)
+    return TuningResult(
+        best=leaderboard[0],
+        leaderboard=leaderboard,
+        wall_seconds=time.perf_counter() - start,
+        workers=workers,
+    )
+
+
+def format_leaderboard(result: TuningResult, top: int = 10) -> str:
+    """Plain-text leaderboard for logs and the benchmark."""
+    lines = [
+        f"{'trial':>5} | {'rung':>4} | {'rounds':>6} | {VALID_METRIC:>8} | {'best it':>7} | "
+        f"{'leaves':>6} | {'lr':>6} | {'feat':>5} | {'bag':>5} | {'secs':>6}"
+    ]
+    for t in result.leaderboard[:top]:
+        p = t.params
+        lines.append(
+            f"{t.trial_id:>5} | {t.rung:>4} | {t.rounds:>6} | {t.score:>8.4f} | {t.best_iteration:>7} | "
+            f"{p['num_leaves']:>6} | {p['learning_rate']:>6.3f} | {p['feature_fraction']:>5.2f} | "
+            f"{p['bagging_fraction']:>5.2f} | {t.seconds:>6.2f}"
+        )
+    return "\n".join(lines)